@@ -1,32 +1,142 @@
 import os
 import re
-import shutil
-import pandas as pd
+import json
+import subprocess
 from pathlib import Path
-import easyocr
-from pdf2image import convert_from_path
 import cv2
 import numpy as np
 from datetime import datetime
 from collections import Counter
 import warnings
 import time
+from ocr_cache import OCRCache, file_sha256, DEFAULT_MAX_MB
+from ocr_service import OCRServiceClient, ServiceError, easyocr_engine, create_reader, DEFAULT_PORT
+from layout_templates import LayoutTemplates, page_fingerprint, learn_field_bands, crop_band
+import field_extraction
+from ocr_batching import BatchingRecognizer, batching_available, DEFAULT_BATCH_SIZE
+from profiles import get_profile, PROFILES, DEFAULT_PROFILE
+from journal import ProcessingJournal, input_key
+from filing import Filer, STRATEGIES, DEFAULT_STRATEGY
+from name_index import NameIndex
+from catalog import CatalogWriter, FORMATS as CATALOG_FORMATS, DEFAULT_FLUSH_ROWS
+from text_store import OCRTextStore
+from pipeline import StagedPipeline, Stage, DEFAULT_QUEUE_SIZE
+from tracing import Tracer, percentiles, PERCENTILES
+from tuning import thread_settings, apply_threads, load_tuning
+from ocr_backends import create_backends, MODES as OCR_MODES, DEFAULT_MODE as DEFAULT_OCR_MODE
+from page_triage import triage_page
+from image_buffers import BufferPool
+from renderers import Renderer, RENDERERS, DEFAULT_RENDERER
+from supervisor import Supervisor, serve, stage_reporter, parse_stage_timeouts, DEFAULT_STAGE_TIMEOUTS
+import cProfile
+import fnmatch
+import filecmp
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # Отключаем предупреждения для чистого вывода
 warnings.filterwarnings("ignore")
 
+# Оценка пиковой памяти на пиксель страницы: RGB от poppler, BGR копия,
+# серое изображение и 4 копии увеличенного в 2 раза изображения в enhanced
+PEAK_BYTES_PER_PIXEL = 24
+MIN_DPI = 100
+
+# Лестница разрешений рендеринга: выше - только если поля не нашлись
+DEFAULT_DPI_LADDER = (150, 200, 300)
+
+# Сколько документов одновременно поставляют области в пакетный распознаватель
+DEFAULT_OCR_THREADS = 4
+
+# Решения сортировки страниц, не похожих на сертификат: такие страницы распознаются последними
+NOT_CERTIFICATE = {'letter': "письмо", 'table': "таблицу"}
+
+# Медианная высота букв (пикселей), начиная с которой быстрая предобработка не увеличивает страницу
+MIN_TEXT_HEIGHT = 20
+
+def estimate_text_height(gray):
+    """Медианная высота связных компонент, похожих на буквы (пикселей; 0 - текста нет)"""
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    # Точки, линии рамки и крупные блоки - не буквы
+    letters = heights[(heights >= 4) & (heights <= gray.shape[0] // 10) & (widths <= heights * 3)]
+    return float(np.median(letters)) if len(letters) else 0.0
+
+def current_rss_mb():
+    """Текущий RSS процесса в МБ (None, если узнать нельзя)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
 class CertificateProcessorBalanced:
-    def __init__(self):
-        # Проверяем доступность CUDA
-        import torch
-        if torch.cuda.is_available():
-            print(f"[START] Используется GPU: {torch.cuda.get_device_name(0)}")
-            self.reader = easyocr.Reader(['ru'], gpu=True, verbose=False)
-        else:
-            print("[CPU] Используется CPU (GPU недоступен)")
-            self.reader = easyocr.Reader(['ru'], gpu=False, verbose=False)
-            
-        self.base_dir = Path.cwd()
+    # Варианты предобработки в порядке по умолчанию
+    PREPROCESS_VARIANTS = ("enhanced", "simple", "original")
+    # Реализации варианта enhanced (профили profiles.py): как раньше и быстрые (медианный / билатеральный фильтр)
+    PREPROCESS_PIPELINES = ("quality", "fast", "fast-bilateral")
+    
+    # Порядок стадий в таблице времени (остальные - по алфавиту после них)
+    TRACE_STAGES = ("file", "text_layer", "hash", "pdfinfo", "render", "triage", "preprocess", "ocr", "ocr_band",
+                    "page", "extract", "filing", "prefetch", "prepare")
+    
+    def __init__(self, base_dir=None, load_reader=True, workers=1, cascade=False,
+                 use_text_layer=True, use_cache=True, cache_max_mb=DEFAULT_MAX_MB,
+                 max_memory_mb=None, use_layout=False, dpi_ladder=DEFAULT_DPI_LADDER,
+                 batch_ocr=False, ocr_threads=DEFAULT_OCR_THREADS, batch_size=DEFAULT_BATCH_SIZE,
+                 profile=DEFAULT_PROFILE, resume=False, pipeline=False, render_threads=2,
+                 prep_threads=2, queue_size=DEFAULT_QUEUE_SIZE, cprofile=None,
+                 use_service=True, service_port=DEFAULT_PORT, filing=DEFAULT_STRATEGY,
+                 catalog_formats=("csv",), flush_rows=DEFAULT_FLUSH_ROWS, use_text_store=True,
+                 threads=None, ocr_mode=DEFAULT_OCR_MODE, use_triage=True, renderer=DEFAULT_RENDERER,
+                 file_timeout=None, stage_timeouts=None):
+        self.reader = None
+        self.ocr_service = None
+        self.use_service = use_service
+        self.service_port = service_port
+        
+        # Общий пакетный распознаватель создается на время обработки в потоках
+        self.batcher = None
+        self.batch_ocr = batch_ocr
+        self.ocr_threads = ocr_threads
+        self.batch_size = batch_size
+
+        self.base_dir = Path(base_dir) if base_dir else Path.cwd()
+        self.workers = workers
+        self.cascade = cascade
+        self.use_text_layer = use_text_layer
+        self.use_cache = use_cache
+        self.cache_max_mb = cache_max_mb
+        self.max_memory_mb = max_memory_mb
+        self.use_layout = use_layout
+        self.dpi_ladder = tuple(dpi_ladder)
+        self.profile = profile
+        self.preprocess_pipeline = get_profile(profile)['preprocess']
+        self.resume = resume
+        self.pipeline = pipeline
+        self.render_threads = render_threads
+        self.prep_threads = prep_threads
+        self.queue_size = queue_size
+        # Пустые страницы не распознаются, страницы после сертификата - тоже
+        self.use_triage = use_triage
+        # Буферы страниц и шагов предобработки используются повторно
+        self.buffers = BufferPool()
+        # Рендерер страниц: pypdfium2 в процессе, запасные - pdftoppm и pdf2image
+        self.renderer_choice = renderer
+        self.renderer = Renderer(renderer)
+        # Бюджет времени на файл и на стадии (секунд): с ним файлы распознают воркеры под надзором
+        self.file_timeout = file_timeout
+        self.stage_timeouts = dict(stage_timeouts or {})
+        # Имена файлов (шаблоны через запятую), которые профилируются cProfile
+        self.cprofile = cprofile
         self.input_dir = self.base_dir / "input"
         self.certificates_dir = self.base_dir / "сертификаты"
         self.debug_dir = self.base_dir / "debug"
@@ -35,19 +145,179 @@ class CertificateProcessorBalanced:
         # Создаем необходимые папки
         self.create_directories()
         
-        # Список для CSV
-        self.csv_data = []
+        # Потоки torch и OpenCV на процесс: профиль, поверх него - явно заданные (threads)
+        thread_spec = dict(get_profile(profile)['threads'], **(threads or {}))
+        self.threads = thread_settings(thread_spec, workers, load_tuning(self.debug_dir))
+        
+        # Движки OCR по порядку попыток: в режиме tiered EasyOCR - только если поля не нашлись
+        self.ocr_mode = ocr_mode
+        self.ocr_tiers = create_backends(ocr_mode, self)
+        
+        # Координатору пула процессов своя модель не нужна - OCR делают воркеры.
+        # Если запущена служба OCR, модель уже загружена в ней
+        if load_reader:
+            apply_threads(self.threads)
+            if any(backend.name == "easyocr" for backend in self.ocr_tiers):
+                self.connect_reader()
+        
+        # Каталог (debug/table.csv) пишется по мере раскладки файлов
+        self.catalog = None
+        self.catalog_formats = tuple(catalog_formats)
+        self.flush_rows = flush_rows
+        
+        # Распознанный текст всех документов (debug/ocr_text.store), пишет тот, кто раскладывает
+        self.text_store = None
+        self.use_text_store = use_text_store
+        
+        # Журнал разложенных файлов открывает только тот, кто раскладывает (не воркеры)
+        self.journal = None
+        self.filing_time = 0.0
+        self.filer = Filer(filing)
+        # Свободные имена в папках программ без перебора файлов на диске
+        self.names = NameIndex()
         
         # Статистика времени
         self.timing_stats = []
+        self.tracer = Tracer()
+        # Под надзором: секунд на файл от отправки воркеру до результата (с повтором) и просроченные файлы
+        self.file_latencies = Counter()
+        self.timeouts = []
+        
+        # Сколько раз каждый вариант предобработки пробовали и сколько раз с ним нашлись поля:
+        # Counter {(вариант, нашлись ли поля): попыток}
+        self.variant_stats_file = self.debug_dir / "variant_stats.json"
+        self.variant_stats = self.load_variant_stats()
+        self.run_variant_stats = Counter()
+        
+        # Кэш OCR: текст страниц по хэшу PDF, dpi, варианту и версии движка
+        self.ocr_engine = self.ocr_service.engine if self.ocr_service else easyocr_engine()
+        self.ocr_cache = None
+        if use_cache:
+            self.ocr_cache = OCRCache(self.debug_dir / "ocr_cache.sqlite", max_mb=cache_max_mb)
+    
+        # Шаблоны расположения полей, выученные на успешно разобранных страницах
+        self.layout_templates = None
+        if use_layout:
+            self.layout_templates = LayoutTemplates(self.debug_dir / "layout_templates.json")
+    
+    def worker_options(self):
+        """Параметры для создания такого же обработчика в процессе-воркере"""
+        return {
+            'base_dir': str(self.base_dir),
+            'cascade': self.cascade,
+            'use_text_layer': self.use_text_layer,
+            'use_cache': self.use_cache,
+            'cache_max_mb': self.cache_max_mb,
+            'max_memory_mb': self.max_memory_mb,
+            'use_layout': self.use_layout,
+            'dpi_ladder': self.dpi_ladder,
+            'profile': self.profile,
+            'cprofile': self.cprofile,
+            'use_text_store': self.use_text_store,
+            'use_service': self.use_service,
+            'service_port': self.service_port,
+            'threads': self.threads,
+            'ocr_mode': self.ocr_mode,
+            'use_triage': self.use_triage,
+            'renderer': self.renderer_choice,
+        }
         
     def create_directories(self):
         """Создает необходимые папки если их нет"""
         for directory in [self.certificates_dir, self.debug_dir, self.unknown_dir]:
             directory.mkdir(exist_ok=True)
+
+    def connect_reader(self):
+        """Подключается к службе OCR, а если она не запущена - загружает EasyOCR в этом процессе"""
+        if self.use_service:
+            self.ocr_service = OCRServiceClient.connect(port=self.service_port)
+        if self.ocr_service:
+            print(f"[FAST] Используется служба OCR (порт {self.service_port}), модель уже загружена")
+        else:
+            self.reader = create_reader(threads=self.threads)
+            print(f"[CPU] Потоков: torch {self.threads['torch']} (inter-op {self.threads['interop']}), "
+                  f"OpenCV {self.threads['opencv']}")
+
+    def warm_up(self):
+        """Прогревает модель, чтобы первый файл не платил за инициализацию"""
+        blank = np.full((64, 256), 255, dtype=np.uint8)
+        try:
+            self.readtext(blank, detail=0)
+        except Exception:
+            pass
+    
+    def readtext(self, image, detail=1):
+        """OCR изображения: через общий пакетный распознаватель, если он запущен"""
+        if self.batcher:
+            return self.batcher.readtext(image, detail=detail)
+        if self.ocr_service:
+            try:
+                return self.ocr_service.readtext(image, detail=detail)
+            except (OSError, ServiceError) as e:
+                # Служба остановлена или упала - дальше распознаем сами
+                print(f"[WARNING]  Служба OCR недоступна ({e}), загружается EasyOCR в этом процессе")
+                self.ocr_service = None
+                self.reader = create_reader(threads=self.threads)
+        return self.reader.readtext(image, detail=detail, paragraph=False)
     
+    def load_variant_stats(self):
+        """Загружает накопленные попытки вариантов предобработки
+        ({вариант: {tried, validated}}; старые счетчики побед не годятся и пропускаются)"""
+        stats = Counter()
+        if not self.variant_stats_file.exists():
+            return stats
+        try:
+            with open(self.variant_stats_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return stats
+        for name, counts in saved.items():
+            if isinstance(counts, dict):
+                validated = int(counts.get('validated', 0))
+                stats[(name, True)] += validated
+                stats[(name, False)] += max(0, int(counts.get('tried', 0)) - validated)
+        return stats
+    
+    def save_variant_stats(self):
+        """Сохраняет попытки вариантов с учетом текущего запуска"""
+        if not self.run_variant_stats:
+            return
+        total = self.variant_stats + self.run_variant_stats
+        saved = {name: {'tried': total[(name, True)] + total[(name, False)], 'validated': total[(name, True)]}
+                 for name in sorted({name for name, _ in total})}
+        with open(self.variant_stats_file, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, ensure_ascii=False, indent=2)
+    
+    def ordered_variants(self):
+        """Варианты предобработки: сначала те, с которыми поля находились в большей доле попыток
+        (доля сглажена: вариант без попыток стоит посередине, а не в начале или в конце)"""
+        stats = self.variant_stats + self.run_variant_stats
+        def success_rate(name):
+            return (stats[(name, True)] + 1) / (stats[(name, True)] + stats[(name, False)] + 2)
+        return sorted(self.PREPROCESS_VARIANTS, key=lambda name: -success_rate(name))
+    
+    def preprocess_variant(self, name, image):
+        """Готовит изображение для варианта предобработки"""
+        if name == "enhanced":
+            if self.preprocess_pipeline == "fast":
+                return self.preprocess_image_fast(image)
+            if self.preprocess_pipeline == "fast-bilateral":
+                return self.preprocess_image_fast(image, denoise="bilateral")
+            return self.preprocess_image_enhanced(image)
+        if name == "simple":
+            return self.preprocess_image_simple(image)
+        return image
+    
+    def has_required_fields(self, text):
+        """Проверяет, что из текста извлекаются ФИО и программа"""
+        return bool(self.extract_fio(text) and self.extract_program_name(text))
+    
+    def has_all_fields(self, text):
+        """Проверяет, что из текста извлекаются все поля: ФИО, программа, номер, дата и часы"""
+        return all(field_extraction.extract_fields(text).values())
+
     def preprocess_image_enhanced(self, image):
-        """Улучшенная предобработка (лучший вариант)"""
+        """Улучшенная предобработка (лучший вариант); результат - буфер из self.buffers"""
         # Конвертируем в оттенки серого
         if len(image.shape) == 3:
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
@@ -56,23 +326,57 @@ class CertificateProcessorBalanced:
         
         # Увеличиваем размер изображения для лучшего распознавания
         height, width = gray.shape
-        gray = cv2.resize(gray, (width * 2, height * 2), interpolation=cv2.INTER_CUBIC)
+        upscaled = self.buffers.acquire((height * 2, width * 2))
+        cv2.resize(gray, (width * 2, height * 2), dst=upscaled, interpolation=cv2.INTER_CUBIC)
         
-        # Убираем шум
-        denoised = cv2.fastNlMeansDenoising(gray)
+        # Убираем шум (на месте нельзя - нужен второй буфер)
+        denoised = self.buffers.acquire(upscaled.shape)
+        cv2.fastNlMeansDenoising(upscaled, dst=denoised)
+        self.buffers.release(upscaled)
         
-        # Увеличиваем контрастность
+        # Увеличиваем контрастность - на месте
         clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(denoised)
+        clahe.apply(denoised, dst=denoised)
+        
+        # Бинаризация с адаптивным порогом - на месте
+        cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                              cv2.THRESH_BINARY, 11, 2, dst=denoised)
         
-        # Бинаризация с адаптивным порогом
-        binary = cv2.adaptiveThreshold(enhanced, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                     cv2.THRESH_BINARY, 11, 2)
+        return denoised
+    
+    def preprocess_image_fast(self, image, denoise="median"):
+        """Быстрая предобработка: шум убирается до увеличения и дешевым фильтром;
+        результат - буфер из self.buffers"""
+        if len(image.shape) == 3:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = image
+        
+        # Фильтр на исходном размере - в 4 раза меньше пикселей, чем после увеличения
+        denoised = self.buffers.acquire(gray.shape)
+        if denoise == "bilateral":
+            cv2.bilateralFilter(gray, 5, 50, 50, dst=denoised)
+        else:
+            cv2.medianBlur(gray, 3, dst=denoised)
+        
+        # Крупный текст не увеличиваем: EasyOCR и так его читает
+        if estimate_text_height(denoised) < MIN_TEXT_HEIGHT:
+            height, width = denoised.shape
+            upscaled = self.buffers.acquire((height * 2, width * 2))
+            cv2.resize(denoised, (width * 2, height * 2), dst=upscaled, interpolation=cv2.INTER_CUBIC)
+            self.buffers.release(denoised)
+            denoised = upscaled
+        
+        # CLAHE и порог - на месте
+        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8,8))
+        clahe.apply(denoised, dst=denoised)
         
-        return binary
+        cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                              cv2.THRESH_BINARY, 11, 2, dst=denoised)
+        return denoised
     
     def preprocess_image_simple(self, image):
-        """Простая предобработка (запасной вариант)"""
+        """Простая предобработка (запасной вариант); результат - буфер из self.buffers"""
         # Конвертируем в оттенки серого
         if len(image.shape) == 3:
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
@@ -80,74 +384,532 @@ class CertificateProcessorBalanced:
             gray = image
         
         # Простое увеличение контрастности
-        enhanced = cv2.convertScaleAbs(gray, alpha=1.5, beta=30)
+        enhanced = self.buffers.acquire(gray.shape)
+        cv2.convertScaleAbs(gray, dst=enhanced, alpha=1.5, beta=30)
+        
+        # Гауссово размытие для сглаживания - на месте
+        cv2.GaussianBlur(enhanced, (1, 1), 0, dst=enhanced)
+        
+        return enhanced
+    
+    def extract_text_layer(self, pdf_path):
+        """Достает встроенный текстовый слой PDF через pdftotext (poppler)"""
+        try:
+            with self.tracer.span("text_layer"):
+                result = subprocess.run(['pdftotext', '-enc', 'UTF-8', str(pdf_path), '-'],
+                                        capture_output=True, timeout=30)
+        except FileNotFoundError:
+            print("[WARNING]  pdftotext не найден - проверка текстового слоя отключена")
+            self.use_text_layer = False
+            return ""
+        except subprocess.TimeoutExpired:
+            return ""
+        
+        if result.returncode != 0:
+            return ""
         
-        # Гауссово размытие для сглаживания
-        blurred = cv2.GaussianBlur(enhanced, (1, 1), 0)
+        # Приводим к виду OCR-текста: одна строка, слова через пробел
+        text = result.stdout.decode('utf-8', errors='replace')
+        return " ".join(text.split())
+    
+    def open_document(self, pdf_path, dpi, pdf_hash=None):
+        """Готовит документ к OCR: страницы рендерятся по одной и только при промахе кэша"""
+        start_time = time.time()
+        doc = {
+            'pdf_path': pdf_path,
+            'dpi': dpi,
+            'pdf_hash': None,
+            'page_count': None,
+            'page_size': None,
+            'current_page_no': None,
+            'current_page': None,
+            'page_boxes': {},
+            'fingerprint': None,
+            'layout_events': [],
+            'layout_hits': 0,
+            'layout_misses': 0,
+            'region_ocr_calls': 0,
+            'rendered_pages': 0,
+            'render_time': 0.0,
+            'pdf_time': 0.0,
+            'ocr_calls': 0,
+            'cache_hits': 0,
+            # Вызовы и время OCR по движкам
+            'engine_calls': Counter(),
+            'engine_time': Counter(),
+            'peak_rss_mb': current_rss_mb(),
+            # Заготовки стадий конвейера: отрендеренные страницы и предобработанные варианты
+            'prefetched_pages': {},
+            'prepared': {},
+            'prefetch_time': 0.0,
+        }
+        
+        if self.ocr_cache and pdf_hash:
+            doc['pdf_hash'] = pdf_hash
+        elif self.ocr_cache:
+            with self.tracer.span("hash"):
+                doc['pdf_hash'] = file_sha256(pdf_path)
+        
+        # Бюджет памяти: при необходимости снижаем dpi до рендеринга,
+        # чтобы ключ кэша соответствовал реальному разрешению
+        if self.max_memory_mb:
+            self.read_pdf_info(doc)
+            doc['dpi'] = self.fit_dpi_to_budget(doc)
+        
+        if self.ocr_cache:
+            doc['page_count'] = self.ocr_cache.get_page_count(doc['pdf_hash'], doc['dpi'])
+        
+        if doc['page_count'] is None:
+            self.read_pdf_info(doc)
+            if self.ocr_cache:
+                self.ocr_cache.put_document(doc['pdf_hash'], doc['dpi'], doc['page_count'], pdf_path.name)
+        
+        # Время подготовки до начала OCR (хэш, информация о PDF)
+        doc['pdf_time'] = time.time() - start_time
+        doc['render_time'] = doc['pdf_time']
+        return doc
+    
+    def read_pdf_info(self, doc):
+        """Число страниц и размер страницы (в пунктах) через рендерер"""
+        if doc['page_count'] is not None and doc['page_size'] is not None:
+            return
         
-        return blurred
+        with self.tracer.span("pdfinfo"):
+            doc['page_count'], doc['page_size'] = self.renderer.info(doc['pdf_path'])
+    
+    def budget_dpi(self, page_size, dpi):
+        """(максимальный dpi не выше dpi, при котором оценка пиковой памяти страницы укладывается
+        в бюджет, оценка памяти страницы при dpi в МБ)"""
+        width_pt, height_pt = page_size
+        pixels = (width_pt / 72 * dpi) * (height_pt / 72 * dpi)
+        estimated_mb = pixels * PEAK_BYTES_PER_PIXEL / 1024 / 1024
+        if estimated_mb <= self.max_memory_mb:
+            return dpi, estimated_mb
+        return max(MIN_DPI, int(dpi * (self.max_memory_mb / estimated_mb) ** 0.5)), estimated_mb
+    
+    def fit_dpi_to_budget(self, doc):
+        """Максимальный dpi, при котором оценка пиковой памяти страницы укладывается в бюджет"""
+        dpi = doc['dpi']
+        if not doc['page_size']:
+            return dpi
+        
+        fitted_dpi, estimated_mb = self.budget_dpi(doc['page_size'], dpi)
+        if fitted_dpi != dpi:
+            print(f"    [WARNING]  Страница ~{estimated_mb:.0f} МБ при {dpi} dpi > бюджета {self.max_memory_mb:.0f} МБ, "
+                  f"рендерим в {fitted_dpi} dpi")
+        return fitted_dpi
+        
+    def document_ladder(self, doc):
+        """Ступени dpi документа: ступени, которые бюджет памяти свел к уже пройденному dpi, выпадают -
+        иначе та же страница рендерилась и распознавалась бы заново"""
+        if not self.max_memory_mb or not doc['page_size']:
+            return self.dpi_ladder
+        ladder, fitted = [], set()
+        for dpi in self.dpi_ladder:
+            fitted_dpi = self.budget_dpi(doc['page_size'], dpi)[0]
+            if fitted_dpi not in fitted:
+                fitted.add(fitted_dpi)
+                ladder.append(dpi)
+        return tuple(ladder)
+    
+    def render_page(self, doc, page_no):
+        """Рендерит одну страницу PDF: оттенки серого, 8 бит, один канал"""
+        render_start = time.time()
+        
+        with self.tracer.span("render", page=page_no + 1, dpi=doc['dpi'], renderer=self.renderer.name):
+            # Конвертируем в изображение только нужную страницу
+            image = self.renderer.render(doc['pdf_path'], page_no, doc['dpi'], self.buffers)
+        
+        doc['rendered_pages'] += 1
+        doc['render_time'] += time.time() - render_start
+        self.sample_memory(doc)
+        return image
+    
+    def get_page_image(self, doc, page_no):
+        """Изображение страницы; в памяти держим только текущую страницу"""
+        if doc['current_page_no'] != page_no:
+            self.release_page(doc)
+            if page_no in doc['prefetched_pages']:
+                doc['current_page'] = doc['prefetched_pages'].pop(page_no)
+            else:
+                doc['current_page'] = self.render_page(doc, page_no)
+            doc['current_page_no'] = page_no
+        return doc['current_page']
+    
+    def release_page(self, doc):
+        """Освобождает буферы текущей страницы перед рендерингом следующей"""
+        self.buffers.release(doc['current_page'])
+        doc['current_page'] = None
+        doc['current_page_no'] = None
+        doc['page_boxes'] = {}
+        doc['fingerprint'] = None
     
-    def extract_text_from_pdf_balanced(self, pdf_path):
+    def sample_memory(self, doc):
+        """Обновляет пиковый RSS процесса за время обработки файла"""
+        rss = current_rss_mb()
+        if rss is not None:
+            doc['peak_rss_mb'] = max(doc['peak_rss_mb'] or 0.0, rss)
+    
+    def ocr_variant(self, doc, page_no, variant, backend):
+        """Текст страницы для варианта предобработки: из кэша или через OCR движком backend"""
+        if self.ocr_cache:
+            text = self.ocr_cache.get_page(doc['pdf_hash'], doc['dpi'], self.cache_variant(variant),
+                                           backend.engine, page_no)
+            if text is not None:
+                doc['cache_hits'] += 1
+                return text
+        
+        processed_image = doc['prepared'].pop((page_no, variant), None)
+        if processed_image is None:
+            page_image = self.get_page_image(doc, page_no)
+            with self.tracer.span("preprocess", variant=variant):
+                processed_image = self.preprocess_variant(variant, page_image)
+        self.sample_memory(doc)
+        
+        doc['ocr_calls'] += 1
+        doc['engine_calls'][backend.name] += 1
+        ocr_start = time.perf_counter()
+        with self.tracer.span("ocr", variant=variant, engine=backend.name):
+            result = backend.readtext(processed_image, detail=1)
+        doc['engine_time'][backend.name] += time.perf_counter() - ocr_start
+        # Вариант original - это сама страница, ее буфер освобождает release_page
+        if variant != "original":
+            self.buffers.release(processed_image)
+        text = " ".join(item[1] for item in result)
+        
+        # Рамки слов нужны для обучения шаблонов расположения полей
+        if self.layout_templates:
+            doc['page_boxes'][variant] = (result, processed_image.shape[0])
+        
+        if self.ocr_cache:
+            self.ocr_cache.put_page(doc['pdf_hash'], doc['dpi'], self.cache_variant(variant),
+                                    backend.engine, page_no, text)
+        return text
+    
+    def cache_variant(self, variant):
+        """Имя варианта в ключе кэша: enhanced разных реализаций дает разный текст"""
+        if variant == "enhanced" and self.preprocess_pipeline != "quality":
+            return f"{variant}-{self.preprocess_pipeline}"
+        return variant
+    
+    def ocr_layout_bands(self, doc, page_no, all_text, backend):
+        """Распознает только полосы полей знакомого шаблона; None - нужен OCR всей страницы"""
+        variant = self.ordered_variants()[0]
+        
+        # Страница уже распознана целиком и лежит в кэше - это дешевле полос
+        if self.ocr_cache and self.ocr_cache.get_page(doc['pdf_hash'], doc['dpi'], self.cache_variant(variant),
+                                                      backend.engine, page_no) is not None:
+            return None
+        
+        page_image = self.get_page_image(doc, page_no)
+        doc['fingerprint'] = page_fingerprint(page_image)
+        template = self.layout_templates.match(doc['fingerprint'])
+        if template is None:
+            return None
+        
+        band_texts = []
+        for band in template['bands']:
+            with self.tracer.span("preprocess", variant=variant):
+                processed_image = self.preprocess_variant(variant, crop_band(page_image, band))
+            doc['region_ocr_calls'] += 1
+            doc['engine_calls'][backend.name] += 1
+            ocr_start = time.perf_counter()
+            with self.tracer.span("ocr_band", variant=variant, engine=backend.name):
+                result = backend.readtext(processed_image, detail=0)
+            doc['engine_time'][backend.name] += time.perf_counter() - ocr_start
+            if variant != "original":
+                self.buffers.release(processed_image)
+            band_texts.append(" ".join(result))
+        text = " ".join(band_text for band_text in band_texts if band_text.strip())
+        
+        # Полосы засчитываются, только если нашлись все поля, которые шаблон умеет находить
+        optional_extractors = {
+            'cert_number': self.extract_certificate_number,
+            'cert_date': self.extract_date,
+            'hours': self.extract_hours,
+        }
+        valid = self.has_required_fields(all_text + text) and all(
+            optional_extractors[field](text) for field in template['fields'] if field in optional_extractors)
+        
+        self.record_layout_event(doc, {
+            'type': 'hit' if valid else 'miss',
+            'fingerprint': template['fingerprint'],
+        })
+        if valid:
+            doc['layout_hits'] += 1
+            print(f"    [FAST] Шаблон {template['id']}: распознано {len(template['bands'])} полос")
+            return text
+        
+        doc['layout_misses'] += 1
+        return None
+    
+    def learn_layout(self, doc, best_text, best_method):
+        """Запоминает полосы полей страницы, распознанной целиком"""
+        if not doc['fingerprint'] or best_method not in doc['page_boxes']:
+            return
+        
+        fields = field_extraction.extract_fields(best_text)
+        if not fields['fio'] or not fields['program_name']:
+            return
+        
+        boxes, image_height = doc['page_boxes'][best_method]
+        bands = learn_field_bands(boxes, image_height, fields)
+        if bands:
+            self.record_layout_event(doc, {
+                'type': 'learn',
+                'fingerprint': doc['fingerprint'],
+                'fields': bands,
+            })
+    
+    def record_layout_event(self, doc, event):
+        """Применяет событие обучения шаблонов и сохраняет его для координатора"""
+        self.layout_templates.apply_event(event)
+        doc['layout_events'].append(event)
+    
+    def release_document(self, doc):
+        """Возвращает в пул все буферы документа: текущую страницу и заготовки конвейера,
+        которые остались невостребованными (например, после остановки на странице сертификата)"""
+        self.release_page(doc)
+        for image in doc['prefetched_pages'].values():
+            self.buffers.release(image)
+        for image in doc['prepared'].values():
+            self.buffers.release(image)
+        doc['prefetched_pages'].clear()
+        doc['prepared'].clear()
+    
+    def prefetch_document(self, pdf_path):
+        """Стадия рендеринга конвейера: текстовый слой или первая страница первой ступени dpi.
+        Заранее рендерится одна страница: в очередях конвейера на документ - не больше страницы"""
+        job = {'text_layer': None, 'doc': None, 'spans': []}
+        with self.tracer.span("prefetch", cat="pipeline", file=pdf_path.name):
+            if self.use_text_layer:
+                job['text_layer'] = self.extract_text_layer(pdf_path)
+        
+            if not (job['text_layer'] and self.has_required_fields(job['text_layer'])):
+                doc = self.open_document(pdf_path, dpi=self.dpi_ladder[0])
+                variant = self.cache_variant(self.ordered_variants()[0])
+                # Страница из кэша OCR рендеринга не требует
+                if doc['page_count'] and not (self.ocr_cache and self.ocr_cache.get_page(
+                        doc['pdf_hash'], doc['dpi'], variant, self.ocr_tiers[0].engine, 0) is not None):
+                    doc['prefetched_pages'][0] = self.render_page(doc, 0)
+                doc['prefetch_time'] = doc['render_time'] - doc['pdf_time']
+                job['doc'] = doc
+        
+        # Документ больше не нужен рендереру этого потока (остальные ступени dpi - в потоке OCR)
+        self.renderer.close()
+        # Интервалы этого потока уходят вместе с заданием в поток OCR
+        job['spans'] = self.tracer.drain(pdf_path.name)
+        return job
+    
+    def prepare_document(self, job):
+        """Стадия предобработки конвейера: первый по порядку вариант отрендеренной страницы
+        (остальные варианты строятся в потоке OCR, только если понадобятся)"""
+        doc = job['doc']
+        # Знакомый шаблон распознается по полосам - целые страницы могут не понадобиться
+        if doc is None or self.layout_templates:
+            return job
+        
+        file_name = doc['pdf_path'].name
+        variant = self.ordered_variants()[0] if self.cascade else self.PREPROCESS_VARIANTS[0]
+        with self.tracer.span("prepare", cat="pipeline", file=file_name):
+            for page_no, image in doc['prefetched_pages'].items():
+                # Пустую страницу OCR пропустит - готовить для нее вариант незачем
+                if variant == "original" or (self.use_triage and triage_page(image)['decision'] == 'blank'):
+                    continue
+                with self.tracer.span("preprocess", page=page_no + 1, variant=variant):
+                    doc['prepared'][(page_no, variant)] = self.preprocess_variant(variant, image)
+        job['spans'].extend(self.tracer.drain(file_name))
+        return job
+    
+    def extract_text_from_pdf_balanced(self, pdf_path, prefetched=None):
         """Сбалансированное извлечение текста (2-3 попытки)"""
         start_time = time.time()
         
+        # Сертификаты из генератора издателя уже содержат текст - OCR не нужен
+        if self.use_text_layer:
+            text_layer = prefetched['text_layer'] if prefetched else self.extract_text_layer(pdf_path)
+            if text_layer and self.has_required_fields(text_layer):
+                pdf_hash = None
+                if self.ocr_cache:
+                    pdf_hash = file_sha256(pdf_path)
+                    self.ocr_cache.put_document(pdf_hash, 0, 0, pdf_path.name)
+                    self.ocr_cache.put_document_text(pdf_hash, 0, 'pdftotext', text_layer)
+                
+                total_time = time.time() - start_time
+                print(f"    [FAST] Использован текстовый слой PDF ({len(text_layer)} символов)")
+                
+                self.timing_stats.append({
+                    'file': pdf_path.name,
+                    'source': 'text_layer',
+                    'pdf_convert': total_time,
+                    'ocr_time': 0.0,
+                    'total_time': total_time,
+                    'text_length': len(text_layer),
+                    'ocr_calls': 0,
+                    'ocr_calls_saved': 0,
+                    'cache_hits': 0,
+                    # Хэш уже посчитан для кэша - хранилищу текста не нужно читать PDF заново
+                    'pdf_hash': pdf_hash,
+                    'variant_attempts': []
+                })
+                return text_layer
+        
+        # Открытые документы ступеней: их буферы возвращаются в пул, чем бы ни кончилось распознавание
+        opened = []
         try:
-            # Конвертируем PDF в изображения с хорошим качеством
-            images = convert_from_path(pdf_path, dpi=300)
-            pdf_time = time.time() - start_time
+            # Документ открывается отдельно для каждой ступени dpi - по мере надобности
+            docs = {}
+            if prefetched and prefetched['doc']:
+                docs[self.dpi_ladder[0]] = prefetched['doc']
+                opened.append(prefetched['doc'])
+            def rung_document(dpi):
+                if dpi not in docs:
+                    pdf_hash = next(iter(docs.values()))['pdf_hash'] if docs else None
+                    docs[dpi] = self.open_document(pdf_path, dpi=dpi, pdf_hash=pdf_hash)
+                    opened.append(docs[dpi])
+                return docs[dpi]
+            
+            page_count = rung_document(self.dpi_ladder[0])['page_count']
+            dpi_ladder = self.document_ladder(rung_document(self.dpi_ladder[0]))
             
             all_text = ""
             ocr_start = time.time()
             
-            for image in images:
-                # Конвертируем PIL в opencv формат
-                opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            ocr_calls_saved = 0
+            variant_attempts = []
+            rungs_tried = Counter()
+            rungs_validated = Counter()
+            engine_pages = Counter()
+            engine_hits = Counter()
+            triage_log = []
+            
+            # Страницы, не похожие на сертификат (письма, таблицы), - в конце и только если полей не хватает.
+            # Если сертификат уже нашелся, они распознаются по-дешевому (ищутся только дата, часы, номер),
+            # если нет - полностью: значит, сортировка ошиблась и сертификат среди них
+            deferred = []
+            def page_order():
+                for page_no in range(page_count):
+                    yield page_no, False
+                for index, page_no in enumerate(deferred):
+                    if self.has_all_fields(all_text):
+                        print(f"    [FAST] Все поля найдены, отложенные стр. не распознаются: "
+                              f"{', '.join(str(page + 1) for page in deferred[index:])}")
+                        return
+                    yield page_no, True
+            
+            for page_no, revisit in page_order():
+                page_text, page_method = "", None
+                validated = False
                 
-                # Пробуем 3 варианта обработки (вместо 6)
-                attempts = [
-                    ("enhanced", self.preprocess_image_enhanced(opencv_image)),
-                    ("simple", self.preprocess_image_simple(opencv_image)),
-                    ("original", opencv_image)
-                ]
+                if self.use_triage and not revisit:
+                    entry = self.triage(rung_document(self.dpi_ladder[0]), page_no)
+                    triage_log.append(entry)
+                    if entry['decision'] == 'blank':
+                        self.release_page(rung_document(self.dpi_ladder[0]))
+                        print(f"    [FAST] Стр. {page_no + 1}: пустая, OCR пропущен")
+                        continue
+                    if entry['decision'] in NOT_CERTIFICATE:
+                        self.release_page(rung_document(self.dpi_ladder[0]))
+                        deferred.append(page_no)
+                        print(f"    [FAST] Стр. {page_no + 1}: похожа на {NOT_CERTIFICATE[entry['decision']]}, отложена")
+                        continue
                 
-                page_texts = []
-                successful_attempts = []
+                # Дешево - один раз: первым движком, на первой ступени, первым вариантом
+                cheap = revisit and self.has_required_fields(all_text)
+                tiers = self.ocr_tiers[:1] if cheap else self.ocr_tiers
+                ladder = dpi_ladder[:1] if cheap else dpi_ladder
                 
-                for attempt_name, processed_image in attempts:
-                    try:
-                        # Только один OCR вызов для каждого варианта (не 2)
-                        result = self.reader.readtext(processed_image, detail=0, paragraph=False)
-                        text = " ".join(result)
-                        
-                        if text.strip():  # Проверяем, что текст не пустой
-                            page_texts.append(text)
-                            successful_attempts.append(attempt_name)
+                # Лестница разрешений: следующая ступень - только если поля не нашлись
+                page_engines = set()
+                for rung_index, dpi in enumerate(ladder):
+                    doc = rung_document(dpi)
+                
+                    # Движки по очереди на той же ступени: следующий (EasyOCR) - только если поля не нашлись
+                    for tier_index, backend in enumerate(tiers):
+                        if tier_index > 0:
+                            print(f"    [OCR] Стр. {page_no + 1}: поля не найдены при {doc['dpi']} dpi, "
+                                  f"распознаем {backend.name}")
+                        if backend.name not in page_engines:
+                            page_engines.add(backend.name)
+                            engine_pages[backend.name] += 1
                         
-                    except Exception as e:
-                        continue
+                        with self.tracer.span("page", cat="page", page=page_no + 1, dpi=doc['dpi'], engine=backend.name):
+                            rung_text, rung_method, saved, attempts = self.ocr_page(
+                                doc, page_no, all_text, backend, first_only=cheap)
+                        ocr_calls_saved += saved
+                        variant_attempts.extend(attempts)
+                        self.run_variant_stats.update(attempts)
                 
-                # Выбираем самый длинный результат (обычно лучший)
-                if page_texts:
-                    best_text = max(page_texts, key=len)
-                    best_idx = page_texts.index(best_text)
-                    best_method = successful_attempts[best_idx]
-                    
-                    all_text += best_text + " "
+                        if rung_text.strip():
+                            page_text, page_method = rung_text, rung_method
+                        
+                        if rung_text.strip() and self.has_required_fields(all_text + rung_text):
+                            rungs_validated[doc['dpi']] += 1
+                            engine_hits[backend.name] += 1
+                            validated = True
+                            if rung_index > 0:
+                                print(f"    [DPI] Стр. {page_no + 1}: поля найдены при {doc['dpi']} dpi")
+                            break
                     
-                    # Логируем какой метод сработал лучше
-                    if len(page_texts) > 1:
-                        print(f"    [FIX] Лучший метод: {best_method} ({len(best_text)} символов)")
+                    # Страница ступени нужна всем движкам - освобождается после них
+                    self.release_page(doc)
+                    rungs_tried[doc['dpi']] += 1
+                    if validated:
+                        break
+                        
+                if page_text:
+                    all_text += page_text + " "
+                        
+                # Все поля найдены - приложения и письма после страницы сертификата не распознаем
+                # (дата и часы бывают и на следующих страницах - тогда распознавание продолжается)
+                if (self.use_triage and not revisit and validated and page_no + 1 < page_count
+                        and self.has_all_fields(all_text)):
+                    skipped = range(page_no + 2, page_count + 1)
+                    triage_log.extend({'page': skipped_page, 'decision': 'after_certificate'} for skipped_page in skipped)
+                    print(f"    [FAST] Поля найдены на стр. {page_no + 1}, остальные {len(skipped)} стр. пропущены")
+                    break
             
-            ocr_time = time.time() - ocr_start
+            # Сводим статистику всех ступеней
+            docs = list(docs.values())
+            render_time = sum(doc['render_time'] for doc in docs)
+                    
+            # Рендеринг шел вперемешку с OCR - его время не считаем в OCR
+            # (кроме подготовки документа и страниц, отрендеренных заранее стадией конвейера)
+            prefetch_time = sum(doc['prefetch_time'] for doc in docs)
+            ocr_time = time.time() - ocr_start - render_time + docs[0]['pdf_time'] + prefetch_time
+            pdf_time = render_time
             total_time = time.time() - start_time
             
+            if self.ocr_cache:
+                self.ocr_cache.put_document_text(docs[0]['pdf_hash'], self.dpi_ladder[-1],
+                                                 "+".join(backend.engine for backend in self.ocr_tiers), all_text)
+            
             # Сохраняем статистику
             self.timing_stats.append({
                 'file': pdf_path.name,
+                'source': 'cache' if sum(doc['rendered_pages'] for doc in docs) == 0 else 'ocr',
+                'pdf_hash': docs[0]['pdf_hash'],
                 'pdf_convert': pdf_time,
                 'ocr_time': ocr_time,
                 'total_time': total_time,
-                'text_length': len(all_text)
+                'text_length': len(all_text),
+                'ocr_calls': sum(doc['ocr_calls'] for doc in docs),
+                'ocr_calls_saved': ocr_calls_saved,
+                'cache_hits': sum(doc['cache_hits'] for doc in docs),
+                'dpi': max(doc['dpi'] for doc in docs),
+                'rungs_tried': dict(rungs_tried),
+                'rungs_validated': dict(rungs_validated),
+                'layout_hits': sum(doc['layout_hits'] for doc in docs),
+                'layout_misses': sum(doc['layout_misses'] for doc in docs),
+                'region_ocr_calls': sum(doc['region_ocr_calls'] for doc in docs),
+                'layout_events': [event for doc in docs for event in doc['layout_events']],
+                'peak_rss_mb': max((doc['peak_rss_mb'] for doc in docs if doc['peak_rss_mb'] is not None), default=None),
+                'triage': triage_log,
+                'engine_pages': dict(engine_pages),
+                'engine_hits': dict(engine_hits),
+                'engine_calls': dict(sum((doc['engine_calls'] for doc in docs), Counter())),
+                'engine_time': dict(sum((doc['engine_time'] for doc in docs), Counter())),
+                'variant_attempts': variant_attempts
             })
             
             return all_text
@@ -155,255 +917,108 @@ class CertificateProcessorBalanced:
         except Exception as e:
             print(f"[ERROR] Ошибка при обработке {pdf_path}: {e}")
             return ""
+        finally:
+            for doc in opened:
+                self.release_document(doc)
     
-    def extract_fio(self, text):
-        """Извлекает ФИО из текста"""
-        try:
-            # Очищаем текст от лишних символов
-            cleaned_text = re.sub(r'[^\w\sа-яёА-ЯЁ]', ' ', text)
-            cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
-            
-            # Несколько вариантов поиска ФИО
-            patterns = [
-                r"Настоящее удостоверение выдано\s+(.*?)\s+в\s+том",
-                r"удостоверение выдано\s+(.*?)\s+в\s+том",
-                r"выдано\s+(.*?)\s+в\s+том\s+что",
-                r"выдано\s+([А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+)",
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, cleaned_text, re.IGNORECASE | re.DOTALL)
-                if match:
-                    fio_raw = match.group(1).strip()
-                    # Проверяем, что это похоже на ФИО (3 слова, начинающиеся с заглавной)
-                    if self.validate_fio(fio_raw):
-                        fio_clean = self.normalize_fio(fio_raw)
-                        return fio_clean
+    def triage(self, doc, page_no):
+        """Дешевая проверка страницы перед OCR (page_triage): пустая она или с текстом"""
+        # Текст страницы уже в кэше OCR - он ничего не стоит, рендерить ради проверки незачем
+        if self.ocr_cache and self.ocr_cache.get_page(doc['pdf_hash'], doc['dpi'],
+                                                      self.cache_variant(self.ordered_variants()[0]),
+                                                      self.ocr_tiers[0].engine, page_no) is not None:
+            return {'page': page_no + 1, 'decision': 'cached'}
+        
+        page_image = self.get_page_image(doc, page_no)
+        with self.tracer.span("triage", page=page_no + 1):
+            entry = triage_page(page_image)
+        return dict(entry, page=page_no + 1)
+    
+    def ocr_page(self, doc, page_no, all_text, backend, first_only=False):
+        """Распознает страницу движком backend: полосы шаблона или варианты предобработки
+        (first_only - только первый по порядку). Возвращает (текст, метод, сколько OCR вызовов сэкономил каскад,
+        попытки вариантов [(вариант, нашлись ли поля)] для статистики вариантов)"""
+        # Знакомый шаблон - распознаем только полосы с полями
+        if self.layout_templates:
+            layout_text = self.ocr_layout_bands(doc, page_no, all_text, backend)
+            if layout_text is not None:
+                return layout_text, "layout", 0, []
+        
+        # Пробуем 3 варианта обработки (вместо 6). В каскадном режиме -
+        # начиная с самого удачного по доле попыток и до первого валидного результата
+        variants = self.ordered_variants() if self.cascade else self.PREPROCESS_VARIANTS
+        if first_only:
+            variants = variants[:1]
+        
+        page_texts = []
+        successful_attempts = []
+        validated_method = None
+        ocr_calls_saved = 0
+        # Попытка что-то говорит о варианте, только пока поля еще не найдены на прежних страницах
+        attempts = []
+        scored = not self.has_required_fields(all_text)
+        
+        for attempt_index, attempt_name in enumerate(variants):
+            fields_found = False
+            try:
+                # Только один OCR вызов для каждого варианта (не 2)
+                text = self.ocr_variant(doc, page_no, attempt_name, backend)
+                
+                if text.strip():  # Проверяем, что текст не пустой
+                    page_texts.append(text)
+                    successful_attempts.append(attempt_name)
+                    fields_found = (self.cascade or scored) and self.has_required_fields(all_text + text)
             
-            # Дополнительный поиск по паттернам русских имен
-            fio_pattern = r'([А-ЯЁ][а-яё]+(?:ой|ей|ому|ему|ной|ному|ской|ский)\s+[А-ЯЁ][а-яё]+(?:е|у|ь)?\s+[А-ЯЁ][а-яё]+(?:ичу|овичу|евичу|ичем|овичем|евичем|овне|евне|ичне))'
-            match = re.search(fio_pattern, text)
-            if match:
-                fio_raw = match.group(1).strip()
-                if self.validate_fio(fio_raw):
-                    return self.normalize_fio(fio_raw)
+            except Exception as e:
+                pass
             
-            return None
-        except Exception as e:
-            print(f"Ошибка при извлечении ФИО: {e}")
-            return None
-    
-    def validate_fio(self, fio):
-        """Проверяет, похож ли текст на ФИО"""
-        words = fio.split()
-        if len(words) < 2 or len(words) > 4:
-            return False
+            if scored:
+                attempts.append((attempt_name, fields_found))
+            if self.cascade and fields_found:
+                validated_method = attempt_name
+                ocr_calls_saved = len(variants) - attempt_index - 1
+                break
         
-        # Проверяем, что все слова начинаются с заглавной буквы
-        for word in words:
-            if not word or not word[0].isupper() or len(word) < 2:
-                return False
+        if not page_texts:
+            return "", None, ocr_calls_saved, attempts
         
-        return True
-    
-    def normalize_fio(self, fio_raw):
-        """Очищает ФИО (без изменения падежа)"""
-        fio = fio_raw.strip()
+        # Выбираем валидный результат каскада или самый длинный (обычно лучший)
+        if validated_method:
+            best_method = validated_method
+            best_text = page_texts[-1]
+        else:
+            best_text = max(page_texts, key=len)
+            best_idx = page_texts.index(best_text)
+            best_method = successful_attempts[best_idx]
         
-        # Очищаем от лишних пробелов и приводим к правильному регистру
-        words = fio.split()
-        normalized_words = []
+        if self.layout_templates:
+            self.learn_layout(doc, best_text, best_method)
         
-        for word in words:
-            if word:
-                # Первая буква заглавная, остальные строчные
-                normalized_word = word[0].upper() + word[1:].lower()
-                normalized_words.append(normalized_word)
+        # Логируем какой метод сработал лучше
+        if len(page_texts) > 1 or validated_method:
+            print(f"    [FIX] Лучший метод: {best_method} ({len(best_text)} символов)")
         
-        result = ' '.join(normalized_words)
-        return result
+        return best_text, best_method, ocr_calls_saved, attempts
+    
+    def extract_fio(self, text):
+        """Извлекает ФИО из текста"""
+        return field_extraction.extract_fio(text)
     
     def extract_program_name(self, text):
         """Извлекает название программы"""
-        try:
-            # Очищаем текст от мусорных символов
-            cleaned_text = re.sub(r'[^\w\sа-яёА-ЯЁ\-\(\)\.\,\:\"«»]', ' ', text)
-            cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
-            
-            # Несколько вариантов поиска названия программы
-            patterns = [
-                r'по программе\s*["\u201C«]?\s*(.*?)\s*["\u201D»]?\s*в\s*объеме',
-                r'по программе\s*["\u201C«]?\s*(.*?)\s*["\u201D»]?\s*\d+\s*час',
-                r'по программе\s*["\u201C«]?\s*(.*?)\s*["\u201D»]?\s*№',
-                r'программе\s*["\u201C«]?\s*(.*?)\s*["\u201D»]?\s*в\s*объ[её]ме',
-                r'программе\s*["\u201C«]?\s*(.*?)\s*["\u201D»]?\s*\d+\s*час',
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, cleaned_text, re.IGNORECASE | re.DOTALL)
-                if match:
-                    program_name = match.group(1).strip()
-                    
-                    # Очищаем название от мусора
-                    program_name = self.clean_program_name(program_name)
-                    
-                    # Проверяем минимальную длину и разумность
-                    if len(program_name) > 10 and self.validate_program_name(program_name):
-                        return program_name
-            
-            # Поиск стандартных названий программ без учета "по программе"
-            standard_programs = [
-                r'(Государственн[ыые]+\s+и\s+муниципальн[ыые]+\s+закупки.*?(?:теория\s+и\s+практика|практика))',
-                r'([Оо0]\s*контрактной\s+системе\s+в\s+сфере\s+закупок)',
-                r'(44.*?ФЗ.*?закуп)',
-                r'(контрактн[оая]+\s+систем[ае]\s+в\s+сфере\s+закупок)',
-            ]
-            
-            for pattern in standard_programs:
-                match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-                if match:
-                    program_name = self.clean_program_name(match.group(1))
-                    if len(program_name) > 10:
-                        return program_name
-            
-            # Дополнительный поиск для искаженного текста
-            fallback_patterns = [
-                r'(Государствен[а-яшые]*\s+и\s+муниципальн[а-яшые]*\s+закупки[^"]*(?:теория|практика)?)',
-                r'([Оо0]\s*контрактн[а-я]*\s+систем[а-я]*\s+в\s+сфере\s+закупок[а-я]*)',
-                r'(Государств[а-яшые]*\s+[ия]*\s*муници[а-яшые]*\s+закуп[а-яки]*)',
-                r'(44[^"]*ФЗ[^"]*закуп[а-яки]*)',
-            ]
-            
-            for pattern in fallback_patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    program_name = self.clean_program_name(match.group(1))
-                    if len(program_name) > 15:
-                        return program_name
-            
-            return None
-        except Exception as e:
-            print(f"Ошибка при извлечении названия программы: {e}")
-            return None
-    
-    def clean_program_name(self, name):
-        """Очищает название программы"""
-        if not name:
-            return ""
-        
-        # Убираем кавычки и лишние символы
-        name = re.sub(r'["\u201C\u201D«»()"]', '', name)
-        name = re.sub(r'\s+', ' ', name)
-        name = name.strip()
-        
-        # Убираем мусорные символы в конце и начале
-        name = re.sub(r'^[^\w]*', '', name)
-        name = re.sub(r'[\*\#\{\}\[\]\$\%\@\!\+\=\<\>]+.*$', '', name)
-        
-        # Убираем повторяющиеся символы (более 3 подряд)
-        name = re.sub(r'(.)\1{3,}', r'\1', name)
-        
-        # Убираем фразы "в объёме", "в объеме" и цифры после них
-        name = re.sub(r'\s*[вВ]\s*объ[её]ме.*$', '', name)
-        name = re.sub(r'\s*[вВ]\s*обь[её]ме.*$', '', name)
-        name = re.sub(r'\s*объ[её]мс.*$', '', name)
-        name = re.sub(r'\s*объ[её]не.*$', '', name)
-        name = re.sub(r'\s*оь[её]ме.*$', '', name)
-        name = re.sub(r'\s*\d+\s*час.*$', '', name)
-        name = re.sub(r'\s*\d+\s*₽.*$', '', name)
-        
-        # Заменяем искаженные символы
-        replacements = [
-            ('0', 'О'),
-            ('Государствен[а-яшы]*', 'Государственные'),
-            ('Государств[а-яшы]*', 'Государственные'),
-            ('муниципальн[а-яшы]*', 'муниципальные'),
-            ('муници[а-яшы]*', 'муниципальные'),
-            ('контрактн[а-я]*', 'контрактной'),
-            ('коптрактн[а-я]*', 'контрактной'),
-            ('систем[а-я]*', 'системе'),
-            ('закупок[ъэ]', 'закупок'),
-            ('закуп[а-яки]*', 'закупки'),
-            ('44[^"]*ФЗ', '44-ФЗ'),
-        ]
-        
-        for pattern, replacement in replacements:
-            name = re.sub(pattern, replacement, name, flags=re.IGNORECASE)
-        
-        # Нормализуем пробелы
-        name = re.sub(r'\s+', ' ', name)
-        
-        return name.strip()
-    
-    def validate_program_name(self, name):
-        """Проверяет разумность названия программы"""
-        letters = len(re.findall(r'[а-яёА-ЯЁ]', name))
-        total = len(name)
-        
-        if total == 0:
-            return False
-        
-        return (letters / total) > 0.7
+        return field_extraction.extract_program_name(text)
     
     def extract_certificate_number(self, text):
         """Извлекает номер сертификата"""
-        try:
-            patterns = [
-                r'(\d{2}\s*[А-ЯЁ]{2,5}\d?\s*\d{6})',
-                r'(\d{2}\s+[А-ЯЁ]+\s*\d+)',
-                r'([А-ЯЁ]{2,5}\s*\d{6,8})',
-            ]
-            
-            for pattern in patterns:
-                matches = re.findall(pattern, text)
-                if matches:
-                    return matches[0].strip()
-                
-            return None
-        except Exception as e:
-            return None
+        return field_extraction.extract_certificate_number(text)
     
     def extract_date(self, text):
         """Извлекает дату"""
-        try:
-            pattern = r'(\d{1,2}\.\d{1,2}\.\d{4})'
-            matches = re.findall(pattern, text)
-            
-            if matches:
-                return matches[-1]
-            
-            return None
-        except Exception as e:
-            return None
+        return field_extraction.extract_date(text)
     
     def extract_hours(self, text):
         """Извлекает количество часов"""
-        try:
-            patterns = [
-                r'в\s*объ[её]ме\s*(\d+)\s*час',
-                r'Всего\s*(\d+)',
-                r'(\d+)\s*час[аов]?(?:\s|$)',
-                r'объёмс\s*(\d+)',
-                r'объёне\s*(\d+)',
-            ]
-            
-            found_hours = []
-            
-            for pattern in patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                for match in matches:
-                    hours = int(match)
-                    if 8 <= hours <= 1000:
-                        found_hours.append(hours)
-            
-            if found_hours:
-                hour_counts = Counter(found_hours)
-                most_common_hours = hour_counts.most_common(1)[0][0]
-                return str(most_common_hours)
-            
-            return None
-        except Exception as e:
-            return None
+        return field_extraction.extract_hours(text)
     
     def sanitize_filename(self, filename):
         """Очищает имя файла от недопустимых символов"""
@@ -413,106 +1028,505 @@ class CertificateProcessorBalanced:
             filename = filename[:100]
         return filename.strip()
     
-    def process_single_pdf(self, pdf_path, file_number, total_files):
-        """Обрабатывает один PDF файл"""
-        print(f"\n[PDF] Файл {file_number}/{total_files}: {pdf_path.name}")
+    def analyze_pdf(self, pdf_path, prefetched=None):
+        """Распознает PDF и извлекает поля (без раскладки по папкам).
+        Интервалы трассировки файла возвращаются в result['spans']"""
+        profiler = None
+        if self.cprofile and any(fnmatch.fnmatch(pdf_path.name, pattern.strip())
+                                 for pattern in self.cprofile.split(",")):
+            profiler = cProfile.Profile()
+            profiler.enable()
         
+        try:
+            with self.tracer.span("file", cat="file", file=pdf_path.name):
+                result = self.analyze_document(pdf_path, prefetched)
+        finally:
+            # Открытый PDF мешает раскладке переносом (Windows)
+            self.renderer.close()
+            if profiler:
+                profiler.disable()
+                profile_dir = self.debug_dir / "profiles"
+                profile_dir.mkdir(exist_ok=True)
+                profiler.dump_stats(str(profile_dir / f"{pdf_path.stem}.pstats"))
+                print(f"    [SAVE] Профиль: {profile_dir / (pdf_path.stem + '.pstats')}")
+        
+        result['spans'] = (prefetched['spans'] if prefetched else []) + self.tracer.drain(pdf_path.name)
+        return result
+    
+    def analyze_document(self, pdf_path, prefetched=None):
+        """Текст, поля и целевое имя файла"""
         file_start_time = time.time()
+        timing_start = len(self.timing_stats)
         
         # Извлекаем текст сбалансированным методом
-        text = self.extract_text_from_pdf_balanced(pdf_path)
+        text = self.extract_text_from_pdf_balanced(pdf_path, prefetched)
+        
+        result = {
+            'file': pdf_path.name,
+            'text_length': len(text),
+            'text': text,
+            'pdf_hash': None,
+            'fields': None,
+            'target_dir': None,
+            'target_stem': None,
+            'timing': self.timing_stats[timing_start:],
+            'file_time': 0.0,
+        }
         
         if not text:
-            print(f"[ERROR] Не удалось извлечь текст")
-            return False
+            return result
         
-        # Создаем файл отладки с распознанным текстом
-        debug_text_file = self.debug_dir / f"{pdf_path.stem}_ocr_text.txt"
-        with open(debug_text_file, 'w', encoding='utf-8') as f:
-            f.write(text)
+        # Текст уходит в хранилище (python text_store.py get <файл>) под хэшем PDF
+        # (хэш, посчитанный для кэша OCR, берется из статистики файла)
+        if self.use_text_store:
+            result['pdf_hash'] = next((record['pdf_hash'] for record in result['timing']
+                                       if record.get('pdf_hash')), None)
+            if result['pdf_hash'] is None:
+                with self.tracer.span("hash"):
+                    result['pdf_hash'] = file_sha256(pdf_path)
         
         # Извлекаем данные
-        fio = self.extract_fio(text)
-        program_name = self.extract_program_name(text)
-        cert_number = self.extract_certificate_number(text)
-        cert_date = self.extract_date(text)
-        hours = self.extract_hours(text)
+        with self.tracer.span("extract"):
+            fields = field_extraction.extract_fields(text)
+        result['fields'] = fields
+        
+        # Целевая папка и имя без суффикса - коллизии разрешает тот, кто раскладывает файлы
+        if fields['fio'] and fields['program_name']:
+            result['target_dir'] = self.sanitize_filename(fields['program_name'])
+            result['target_stem'] = self.sanitize_filename(fields['fio'])
+        
+        result['file_time'] = time.time() - file_start_time
+        return result
+    
+    def report_result(self, result):
+        """Печатает краткий итог распознавания файла"""
+        fio = result['fields']['fio']
+        program_name = result['fields']['program_name']
+        
+        source = result['timing'][-1]['source'] if result['timing'] else 'ocr'
+        source_name = 'текстовый слой' if source == 'text_layer' else 'OCR'
         
         # Показываем время обработки файла
-        file_time = time.time() - file_start_time
-        print(f"[TIME]  Время: {file_time:.1f}с | Текст: {len(text)} символов")
+        print(f"[TIME]  Время: {result['file_time']:.1f}с | Текст: {result['text_length']} символов | Источник: {source_name}")
         
         # Краткий вывод результата
         print(f"[USER] ФИО: {fio[:30] + '...' if fio and len(fio) > 30 else fio or 'НЕ НАЙДЕНО'}")
         print(f"[CERT] Программа: {program_name[:40] + '...' if program_name and len(program_name) > 40 else program_name or 'НЕ НАЙДЕНО'}")
+    
+    def file_result(self, pdf_path, result):
+        """Раскладывает файл по папкам и добавляет строку в CSV"""
+        if self.text_store and result['pdf_hash']:
+            self.text_store.put(result['pdf_hash'], pdf_path.name, result['text'])
+        
+        if not result['fields']:
+            print(f"[ERROR] Не удалось извлечь текст")
+            return False
+        
+        fields = result['fields']
+        # При раскладке переносом исходного файла после нее уже нет
+        key = input_key(pdf_path)
         
         # Проверяем обязательные поля
-        if not fio or not program_name:
+        if not result['target_dir']:
             print(f"[ERROR] Обработка неудачна")
-            shutil.copy2(pdf_path, self.unknown_dir / pdf_path.name)
+            self.filer.file(pdf_path, self.unknown_dir / pdf_path.name)
             
-            self.csv_data.append({
-                'ФИО': fio or 'НЕ НАЙДЕНО',
-                'Название': program_name or 'НЕ НАЙДЕНО',
-                'Номер': cert_number or '',
-                'Дата': cert_date or '',
-                'Часы': hours or '',
-                'Путь к файлу': str(self.unknown_dir / pdf_path.name)
-            })
+            self.add_row(pdf_path, 'unknown', {
+                'ФИО': fields['fio'] or 'НЕ НАЙДЕНО',
+                'Название': fields['program_name'] or 'НЕ НАЙДЕНО',
+                'Номер': fields['cert_number'] or '',
+                'Дата': fields['cert_date'] or '',
+                'Часы': fields['hours'] or '',
+                'Путь к файлу': str(self.unknown_dir / pdf_path.name),
+                'Причина': 'поля не найдены'
+            }, key)
             return False
         
         # Создаем папку для программы и копируем файл
-        safe_program_name = self.sanitize_filename(program_name)
-        program_dir = self.certificates_dir / safe_program_name
+        program_dir = self.certificates_dir / result['target_dir']
         program_dir.mkdir(exist_ok=True)
         
-        safe_fio = self.sanitize_filename(fio)
-        new_filename = f"{safe_fio}.pdf"
-        new_path = program_dir / new_filename
-        
-        counter = 1
-        while new_path.exists():
-            new_filename = f"{safe_fio}_{counter}.pdf"
-            new_path = program_dir / new_filename
-            counter += 1
-        
-        shutil.copy2(pdf_path, new_path)
-        
-        self.csv_data.append({
-            'ФИО': fio,
-            'Название': program_name,
-            'Номер': cert_number or '',
-            'Дата': cert_date or '',
-            'Часы': hours or '',
-            'Путь к файлу': str(new_path)
-        })
+        new_filename = f"{result['target_stem']}.pdf"
+        new_path = None
+        if self.resume:
+            # Файл мог быть скопирован прямо перед сбоем, но не попасть в журнал
+            new_path = next((path for path in self.names.taken(program_dir, new_filename)
+                             if filecmp.cmp(pdf_path, path, shallow=False)), None)
+        if new_path is None:
+            new_path = self.names.allocate(program_dir, new_filename)
+        
+        try:
+            self.filer.file(pdf_path, new_path)
+        except BaseException:
+            # Любой сбой (и прерывание с клавиатуры) - иначе пустая заглушка навсегда займет имя
+            self.names.discard_placeholder(new_path)
+            raise
+        
+        self.add_row(pdf_path, 'ok', {
+            'ФИО': fields['fio'],
+            'Название': fields['program_name'],
+            'Номер': fields['cert_number'] or '',
+            'Дата': fields['cert_date'] or '',
+            'Часы': fields['hours'] or '',
+            'Путь к файлу': str(new_path),
+            'Причина': ''
+        }, key)
         
         print(f"[OK] Успешно обработан")
         return True
     
+    def file_timeout_result(self, pdf_path, reason):
+        """Раскладывает файл, не уложившийся в бюджет времени: в Неопознанные с причиной timeout"""
+        print(f"[ERROR] Превышен бюджет времени: {reason}")
+        key = input_key(pdf_path)
+        self.filer.file(pdf_path, self.unknown_dir / pdf_path.name)
+        
+        self.add_row(pdf_path, 'timeout', {
+            'ФИО': 'НЕ НАЙДЕНО',
+            'Название': 'НЕ НАЙДЕНО',
+            'Номер': '',
+            'Дата': '',
+            'Часы': '',
+            'Путь к файлу': str(self.unknown_dir / pdf_path.name),
+            'Причина': f'timeout: {reason}'
+        }, key)
+        return False
+    
+    def add_row(self, pdf_path, status, row, key=None):
+        """Добавляет строку каталога и сразу записывает результат в журнал"""
+        if self.catalog:
+            self.catalog.write(row)
+        if self.journal:
+            self.journal.append(pdf_path, status, row, key)
+    
+    def skip_journaled(self, pdf_files):
+        """Убирает файлы, уже разложенные до сбоя. Каталог восстанавливается из всех завершенных
+        записей журнала: при --filing move разложенных файлов в input уже нет, но их строки нужны"""
+        done = self.journal.done()
+        for record in done.values():
+            self.catalog.write(record['row'])
+        # Пустые файлы в папках программ, не записанные в журнал, - заглушки имен убитого процесса
+        self.names.reclaim_placeholders(keep=[record['row']['Путь к файлу'] for record in done.values()])
+        remaining = [pdf_file for pdf_file in pdf_files if input_key(pdf_file) not in done]
+        
+        print(f"[RESUME] Уже обработано по журналу: {len(done)} (в input: {len(pdf_files) - len(remaining)}), "
+              f"осталось: {len(remaining)}")
+        return remaining
+    
+    def process_single_pdf(self, pdf_path, file_number, total_files):
+        """Обрабатывает один PDF файл"""
+        print(f"\n[PDF] Файл {file_number}/{total_files}: {pdf_path.name}")
+        
+        result = self.analyze_pdf(pdf_path)
+        self.tracer.extend(result['spans'])
+        if result['fields']:
+            self.report_result(result)
+        with self.tracer.span("filing", cat="file", file=pdf_path.name):
+            return self.file_result(pdf_path, result)
+    
     def show_timing_stats(self):
         """Показывает статистику времени"""
         if not self.timing_stats:
             return
             
-        df = pd.DataFrame(self.timing_stats)
+        stats = self.timing_stats
+        def total(key):
+            return sum(record.get(key) or 0 for record in stats)
         
-        avg_pdf = df['pdf_convert'].mean()
-        avg_ocr = df['ocr_time'].mean()
-        avg_total = df['total_time'].mean()
-        avg_text_len = df['text_length'].mean()
+        avg_text_len = total('text_length') / len(stats)
         
         print(f"\n[TIME]  СТАТИСТИКА ВРЕМЕНИ:")
-        print(f"   PDF конвертация: {avg_pdf:.1f} сек/файл")
-        print(f"   OCR обработка: {avg_ocr:.1f} сек/файл") 
-        print(f"   Общее время: {avg_total:.1f} сек/файл")
+        self.show_stage_table()
         print(f"   Средняя длина текста: {avg_text_len:.0f} символов")
         
         # Найти самый медленный и быстрый файлы
-        slowest = df.loc[df['total_time'].idxmax()]
-        fastest = df.loc[df['total_time'].idxmin()]
-        print(f"   Самый медленный: {slowest['file']} ({slowest['total_time']:.1f} сек)")
-        print(f"   Самый быстрый: {fastest['file']} ({fastest['total_time']:.1f} сек)")
+        durations = self.tracer.file_durations()
+        if durations:
+            slowest = max(durations, key=durations.get)
+            fastest = min(durations, key=durations.get)
+            print(f"   Самый медленный: {slowest} ({durations[slowest]:.1f} сек)")
+            print(f"   Самый быстрый: {fastest} ({durations[fastest]:.1f} сек)")
+    
+        # Экономия каскада: OCR вызовы, которые не понадобились
+        ocr_calls = total('ocr_calls')
+        ocr_calls_saved = total('ocr_calls_saved')
+        if self.cascade:
+            planned = ocr_calls + ocr_calls_saved
+            print(f"   OCR вызовов: {ocr_calls} (сэкономлено каскадом: {ocr_calls_saved}, {ocr_calls_saved/max(planned, 1)*100:.0f}%)")
+        else:
+            print(f"   OCR вызовов: {ocr_calls}")
+        
+        variant_stats = self.variant_stats + self.run_variant_stats
+        if variant_stats:
+            print(f"   Варианты (поля найдены/попыток): " + ", ".join(
+                f"{name}={variant_stats[(name, True)]}/{variant_stats[(name, True)] + variant_stats[(name, False)]}"
+                for name in self.ordered_variants()))
+    
+        # Каким путем получен текст: встроенный слой или OCR
+        sources = Counter(record.get('source') for record in stats)
+        print(f"   Источник текста: текстовый слой - {sources.get('text_layer', 0)}, "
+              f"кэш OCR - {sources.get('cache', 0)}, OCR - {sources.get('ocr', 0)}")
+        if self.ocr_cache:
+            print(f"   Попаданий в кэш OCR: {total('cache_hits')} страниц/вариантов")
+    
+        if self.batcher and self.batcher.batches:
+            print(f"   Пакетный OCR: {self.batcher.regions} областей в {self.batcher.batches} пачках "
+                  f"({self.batcher.regions / self.batcher.batches:.1f} в среднем), "
+                  f"{self.batcher.regions / max(self.batcher.recognize_time, 1e-9):.0f} областей/сек")
+        
+        # Пиковая память по файлам (только файлы, прошедшие через рендеринг/кэш)
+        peaks = [record for record in stats if record.get('peak_rss_mb') is not None]
+        if peaks:
+            peak = max(peaks, key=lambda record: record['peak_rss_mb'])
+            print(f"   Пиковая память: {sum(record['peak_rss_mb'] for record in peaks) / len(peaks):.0f} МБ/файл в среднем, "
+                  f"максимум {peak['peak_rss_mb']:.0f} МБ ({peak['file']})")
+    
+        self.show_dpi_histogram()
+        self.show_engine_stats()
+        
+        if self.buffers.summary():
+            print(f"   {self.buffers.summary()}")
+        if self.renderer.summary():
+            print(f"   {self.renderer.summary()}")
+        
+        if self.filer.summary():
+            print(f"   {self.filer.summary()}")
+            for fallback in self.filer.fallbacks[:3]:
+                print(f"   [WARNING]  Откат раскладки: {fallback}")
+        
+        if self.layout_templates:
+            hits = total('layout_hits')
+            misses = total('layout_misses')
+            print(f"   Шаблоны полей: {hits} страниц по полосам, {misses} откатов на всю страницу, "
+                  f"{len(self.layout_templates.templates)} шаблонов")
+    
+    def show_stage_table(self):
+        """Таблица стадий по трассировке: секунд на файл, среднее и перцентили"""
+        totals = self.tracer.stage_totals()
+        if not totals:
+            return
+        
+        header = " ".join(f"{'p' + str(p):>7}" for p in PERCENTILES)
+        print(f"   {'стадия, сек/файл':18} {'файлов':>6} {'среднее':>8} {header} {'макс':>7}")
+        ordered = [name for name in self.TRACE_STAGES if name in totals]
+        ordered += sorted(name for name in totals if name not in self.TRACE_STAGES)
+        for name in ordered:
+            mean, *points, maximum = percentiles(totals[name])
+            row = " ".join(f"{value:7.2f}" for value in points)
+            print(f"   {name:18} {len(totals[name]):6} {mean:8.2f} {row} {maximum:7.2f}")
+    
+    def show_dpi_histogram(self):
+        """Гистограмма успехов по ступеням лестницы dpi"""
+        tried = Counter()
+        validated = Counter()
+        for record in self.timing_stats:
+            tried.update(record.get('rungs_tried', {}))
+            validated.update(record.get('rungs_validated', {}))
+        
+        if not tried:
+            return
+        
+        print(f"   Ступени dpi (страниц с найденными полями / распознано):")
+        for dpi in sorted(tried):
+            share = validated[dpi] / tried[dpi] * 100
+            print(f"      {dpi:4} dpi: {validated[dpi]:5}/{tried[dpi]:<5} ({share:5.1f}%) {'#' * int(share // 5)}")
+    
+    def show_engine_stats(self):
+        """Движки OCR: доля страниц с найденными полями и время; сколько файлов обошлись без EasyOCR"""
+        pages = Counter()
+        hits = Counter()
+        calls = Counter()
+        seconds = Counter()
+        for record in self.timing_stats:
+            pages.update(record.get('engine_pages', {}))
+            hits.update(record.get('engine_hits', {}))
+            calls.update(record.get('engine_calls', {}))
+            seconds.update(record.get('engine_time', {}))
+        
+        if not pages:
+            return
+        
+        print(f"   Движки OCR (страниц с найденными полями / распознано, время OCR):")
+        for backend in self.ocr_tiers:
+            name = backend.name
+            if not pages[name]:
+                continue
+            share = hits[name] / pages[name] * 100
+            print(f"      {name:10} {hits[name]:5}/{pages[name]:<5} ({share:5.1f}%), {calls[name]} вызовов, "
+                  f"{seconds[name]:.1f} сек ({seconds[name] / max(calls[name], 1):.2f} сек/вызов)")
+        
+        if len(self.ocr_tiers) > 1:
+            recognized = [record for record in self.timing_stats if record.get('engine_pages')]
+            without_easyocr = sum(1 for record in recognized if not record['engine_pages'].get('easyocr'))
+            print(f"   Без EasyOCR: {without_easyocr} из {len(recognized)} распознанных файлов "
+                  f"({without_easyocr / len(recognized) * 100:.0f}%)")
+    
+    def process_serial(self, pdf_files):
+        """Последовательная обработка в текущем процессе"""
+        for i, pdf_file in enumerate(pdf_files, 1):
+            yield self.process_single_pdf(pdf_file, i, len(pdf_files))
+    
+    def process_parallel(self, pdf_files):
+        """Параллельный OCR в пуле процессов, раскладка файлов - здесь, в порядке входа"""
+        # Каждому воркеру - своя доля ядер (self.threads), иначе потоки torch мешают друг другу
+        print(f"[START] Запуск {self.workers} процессов OCR (потоков на процесс: torch {self.threads['torch']}, "
+              f"OpenCV {self.threads['opencv']})")
+        
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.worker_options(),)) as pool:
+            futures = [pool.submit(_analyze_in_worker, str(pdf_file)) for pdf_file in pdf_files]
+            yield from self.collect_results(pdf_files, futures)
+            
+    def process_batched(self, pdf_files):
+        """Несколько документов в потоках одного процесса с общим пакетным распознавателем
+        (со службой OCR - без него: изображения распознают Reader службы)"""
+        if self.ocr_service:
+            print(f"[START] Служба OCR: {self.ocr_threads} документов одновременно")
+        elif self.reader is None:
+            print(f"[START] Tesseract: {self.ocr_threads} документов одновременно")
+        else:
+            print(f"[START] Пакетный OCR: {self.ocr_threads} документов одновременно, пачки до {self.batch_size} областей")
+            self.batcher = BatchingRecognizer(self.reader, batch_size=self.batch_size, producers=self.ocr_threads)
+        
+        local = threading.local()
+        def analyze(pdf_file):
+            return self.thread_processor(local).analyze_pdf(pdf_file)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.ocr_threads) as pool:
+                futures = [pool.submit(analyze, pdf_file) for pdf_file in pdf_files]
+                yield from self.collect_results(pdf_files, futures)
+        finally:
+            if self.batcher:
+                self.batcher.close()
+    
+    def thread_processor(self, local):
+        """Обработчик текущего потока: свое соединение с кэшем и статистика,
+        но модель и пакетный распознаватель общие"""
+        if not hasattr(local, 'processor'):
+            local.processor = CertificateProcessorBalanced(load_reader=False, **self.worker_options())
+            local.processor.reader = self.reader
+            local.processor.ocr_service = self.ocr_service
+            local.processor.ocr_engine = self.ocr_engine
+            local.processor.batcher = self.batcher
+            # Предобработанные в одном потоке страницы освобождаются в другом - пул общий
+            local.processor.buffers = self.buffers
+        return local.processor
+    
+    def process_pipelined(self, pdf_files):
+        """Конвейер: следующие документы рендерятся и предобрабатываются, пока идет OCR текущего"""
+        # Несколько потоков OCR имеют смысл только с общим пакетным распознавателем или со службой OCR
+        ocr_workers = 1
+        if self.batch_ocr and (self.ocr_service or self.reader is None):
+            ocr_workers = self.ocr_threads
+        elif self.batch_ocr and batching_available():
+            ocr_workers = self.ocr_threads
+            self.batcher = BatchingRecognizer(self.reader, batch_size=self.batch_size, producers=ocr_workers)
+        print(f"[START] Конвейер: рендеринг {self.render_threads}, предобработка {self.prep_threads}, "
+              f"OCR {ocr_workers} потоков, очереди по {self.queue_size} документа")
+        
+        local = threading.local()
+        pipeline = StagedPipeline([
+            Stage("render", lambda pdf_file: (pdf_file, self.thread_processor(local).prefetch_document(pdf_file)),
+                  workers=self.render_threads),
+            Stage("preprocess", lambda job: (job[0], self.thread_processor(local).prepare_document(job[1])),
+                  workers=self.prep_threads),
+            Stage("ocr", lambda job: self.thread_processor(local).analyze_pdf(job[0], job[1]),
+                  workers=ocr_workers),
+        ], queue_size=self.queue_size)
+        
+        self.filing_time = 0.0
+        try:
+            yield from self.collect_results(pdf_files, pipeline.run(pdf_files))
+        finally:
+            if self.batcher:
+                self.batcher.close()
+        
+        print(f"\n[STATS] Стадии конвейера ({pipeline.wall_time:.1f} сек):")
+        for line in pipeline.report([("file", 1, len(pdf_files), self.filing_time, 0.0, 0)]):
+            print(f"   {line}")
+    
+    def collect_results(self, pdf_files, futures):
+        """Раскладывает результаты воркеров в исходном порядке файлов"""
+        # Результаты забираем в исходном порядке, поэтому имена файлов
+        # и table.csv совпадают с последовательным запуском
+        for i, (pdf_file, future) in enumerate(zip(pdf_files, futures), 1):
+            print(f"\n[PDF] Файл {i}/{len(pdf_files)}: {pdf_file.name}")
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"[ERROR] Ошибка при обработке {pdf_file}: {e}")
+                yield False
+                continue
+            
+            yield self.absorb_result(pdf_file, result)
+    
+    def absorb_result(self, pdf_file, result):
+        """Забирает статистику результата из воркера и раскладывает файл"""
+        self.timing_stats.extend(result['timing'])
+        self.tracer.extend(result['spans'])
+        for record in result['timing']:
+            self.run_variant_stats.update(map(tuple, record['variant_attempts']))
+            if self.layout_templates:
+                for event in record.get('layout_events', []):
+                    self.layout_templates.apply_event(event)
+        if result['fields']:
+            self.report_result(result)
+        with self.tracer.span("filing", cat="file", file=pdf_file.name) as span:
+            success = self.file_result(pdf_file, result)
+        self.filing_time += span['dur'] / 1e6
+        return success
+    
+    def process_supervised(self, pdf_files):
+        """Файлы распознают процессы-воркеры под надзором: файл сверх бюджета времени
+        (или стадия сверх своего) прерывается убийством воркера; такие файлы в конце
+        распознаются еще раз профилем подешевле, а не уложившиеся снова - в Неопознанные"""
+        stages = ", ".join(f"{name} {seconds:g}" for name, seconds in self.stage_timeouts.items())
+        print(f"[START] Под надзором: {self.workers} процессов OCR, бюджет файла {self.file_timeout:g} сек"
+              + (f", стадий: {stages} сек" if stages else ""))
+        if self.pipeline or self.batch_ocr:
+            print("[WARNING]  Под надзором файлы распознаются по одному в процессах: --pipeline и --batch-ocr не используются")
+        
+        timed_out = []
+        yield from self.collect_supervised(pdf_files, self.worker_options(), timed_out)
+        if not timed_out:
+            return
+        
+        print(f"\n[RETRY] Повтор {len(timed_out)} файлов, не уложившихся в бюджет: профиль fast, "
+              f"{self.dpi_ladder[0]} dpi, каскад")
+        yield from self.collect_supervised([pdf_file for pdf_file, _ in timed_out], self.retry_options())
+    
+    def retry_options(self):
+        """Параметры повтора просроченных файлов: быстрая предобработка, нижняя ступень dpi, каскад"""
+        return dict(self.worker_options(), profile="fast", dpi_ladder=self.dpi_ladder[:1], cascade=True)
+    
+    def collect_supervised(self, pdf_files, options, timed_out=None):
+        """Раскладывает исходы воркеров под надзором в исходном порядке файлов.
+        Просроченные файлы попадают в timed_out (для повтора), а без него - в Неопознанные"""
+        supervisor = Supervisor(_supervised_worker, (options, tuple(self.stage_timeouts)), workers=self.workers,
+                                file_timeout=self.file_timeout, stage_timeouts=self.stage_timeouts)
+        for i, (pdf_file, outcome, data, seconds) in enumerate(supervisor.run(pdf_files), 1):
+            self.file_latencies[pdf_file.name] += seconds
+            if outcome == 'timeout':
+                self.timeouts.append({'file': pdf_file.name, 'reason': data, 'retry': timed_out is None})
+                if timed_out is not None:
+                    timed_out.append((pdf_file, data))
+                    continue
+            
+            print(f"\n[PDF] Файл {i}/{len(pdf_files)}: {pdf_file.name}")
+            if outcome == 'ok':
+                yield self.absorb_result(pdf_file, data)
+            elif outcome == 'timeout':
+                with self.tracer.span("filing", cat="file", file=pdf_file.name):
+                    success = self.file_timeout_result(pdf_file, data)
+                yield success
+            else:
+                print(f"[ERROR] Ошибка при обработке {pdf_file}: {data}")
+                yield False
+        
+        if supervisor.restarts:
+            print(f"[WARNING]  Перезапущено процессов-воркеров: {supervisor.restarts}")
     
     def process_all_pdfs(self):
         """Обрабатывает все PDF файлы в папке input"""
@@ -521,18 +1535,87 @@ class CertificateProcessorBalanced:
             return
         
         pdf_files = list(self.input_dir.glob("*.pdf"))
-        if not pdf_files:
+        # При --resume папка может опустеть (--filing move) - каталог все равно восстанавливается
+        if not pdf_files and not self.resume:
             print("[ERROR] PDF файлы не найдены в папке input!")
             return
         
         print(f"[TARGET] Найдено {len(pdf_files)} PDF файлов")
+        
+        self.journal = ProcessingJournal(self.debug_dir / "journal.jsonl", resume=self.resume)
+        self.catalog = CatalogWriter(self.debug_dir / "table", self.catalog_formats, self.flush_rows)
+        if self.use_text_store:
+            self.text_store = OCRTextStore(self.debug_dir / "ocr_text.store")
+        try:
+            if self.resume:
+                pdf_files = self.skip_journaled(pdf_files)
+            if pdf_files:
+                self.process_files(pdf_files)
+        finally:
+            self.journal.close()
+            self.catalog.close()
+            if self.text_store:
+                self.text_store.close()
+        
+        if self.names.reclaimed:
+            print(f"[RESUME] Удалено заглушек имен прерванного запуска: {self.names.reclaimed}")
+        
+        # Запоминаем попытки вариантов предобработки
+        self.save_variant_stats()
+        if self.layout_templates:
+            self.layout_templates.save()
+        
+        # Каталог уже записан по ходу обработки
+        self.report_catalog()
+        self.save_trace()
+        self.save_triage_log()
+    
+    def save_trace(self):
+        """Выгружает трассировку: JSON lines и формат Chrome trace"""
+        if not self.tracer.spans:
+            return
+        self.tracer.write_jsonl(self.debug_dir / "trace.jsonl")
+        self.tracer.write_chrome(self.debug_dir / "trace.json")
+        print(f"[SAVE] Трассировка: {self.debug_dir / 'trace.jsonl'}, {self.debug_dir / 'trace.json'} (chrome://tracing)")
+    
+    def save_triage_log(self):
+        """Дописывает решения сортировки страниц в debug/triage.jsonl (для проверки задним числом)"""
+        entries = [dict(entry, file=record['file']) for record in self.timing_stats
+                   for entry in record.get('triage', [])]
+        if not entries:
+            return
+        run_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        path = self.debug_dir / "triage.jsonl"
+        with open(path, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(dict(entry, run=run_time), ensure_ascii=False) + "\n")
+        decisions = Counter(entry['decision'] for entry in entries)
+        print(f"[SAVE] Сортировка страниц: {path} (пустых {decisions['blank']}, "
+              f"отложено писем и таблиц {decisions['letter'] + decisions['table']}, "
+              f"пропущено после сертификата {decisions['after_certificate']})")
+    
+    def process_files(self, pdf_files):
+        """Распознает и раскладывает файлы, печатает прогресс и итоговую статистику"""
         print("="*60)
         
         start_time = time.time()
         successful = 0
         
-        for i, pdf_file in enumerate(pdf_files, 1):
-            if self.process_single_pdf(pdf_file, i, len(pdf_files)):
+        if self.file_timeout:
+            results = self.process_supervised(pdf_files)
+        elif self.workers > 1:
+            results = self.process_parallel(pdf_files)
+        elif self.pipeline:
+            results = self.process_pipelined(pdf_files)
+        elif self.batch_ocr and (self.ocr_service or self.reader is None or batching_available()):
+            results = self.process_batched(pdf_files)
+        else:
+            if self.batch_ocr:
+                print("[WARNING]  Пакетный OCR недоступен в этой версии EasyOCR, файлы обрабатываются по одному")
+            results = self.process_serial(pdf_files)
+        
+        for i, success in enumerate(results, 1):
+            if success:
                 successful += 1
             
             # Показываем прогресс каждые 10 файлов
@@ -554,6 +1637,7 @@ class CertificateProcessorBalanced:
         print(f"[OK] Успешно обработано: {successful} из {len(pdf_files)} файлов ({successful/len(pdf_files)*100:.1f}%)")
         print(f"[TIME]  Общее время: {total_time/60:.1f} минут")
         print(f"[SPEED] Средняя скорость: {total_time/len(pdf_files):.1f} сек/файл")
+        self.show_tail_latency()
         
         if successful < len(pdf_files):
             print(f"[ERROR] Неудачных файлов: {len(pdf_files) - successful}")
@@ -561,24 +1645,190 @@ class CertificateProcessorBalanced:
         
         # Показываем детальную статистику времени
         self.show_timing_stats()
+    
+    def show_tail_latency(self):
+        """Хвост задержек: перцентили секунд на файл и файлы, не уложившиеся в бюджет времени"""
+        latencies = self.file_latencies or self.tracer.file_durations()
+        if latencies:
+            _, *points, maximum = percentiles(list(latencies.values()))
+            slowest = max(latencies, key=latencies.get)
+            print(f"[TIME]  Задержка файла: " + ", ".join(f"p{p} {value:.1f}" for p, value in zip(PERCENTILES, points))
+                  + f", макс {maximum:.1f} сек ({slowest})")
         
-        # Сохраняем CSV
-        self.save_csv()
+        if self.timeouts:
+            retried = [entry for entry in self.timeouts if entry['retry']]
+            print(f"[WARNING]  Не уложились в бюджет времени: {len(self.timeouts) - len(retried)} файлов, "
+                  f"после повтора - {len(retried)}")
+            for entry in self.timeouts[:5]:
+                print(f"   {entry['file']}: {entry['reason']}" + (" (повтор)" if entry['retry'] else ""))
     
-    def save_csv(self):
-        """Сохраняет данные в CSV файл"""
-        if not self.csv_data:
-            print("[WARNING]  Нет данных для сохранения в CSV")
+    def report_catalog(self):
+        """Сообщает, куда записан каталог"""
+        if not self.catalog.rows:
+            print("[WARNING]  Нет данных для сохранения в CSV (прежний каталог не тронут)")
             return
         
-        df = pd.DataFrame(self.csv_data)
-        csv_path = self.debug_dir / "table.csv"
-        df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-        print(f"[SAVE] Данные сохранены в {csv_path}")
+        for path in self.catalog.paths:
+            print(f"[SAVE] Данные сохранены в {path} ({self.catalog.rows} строк)")
 
-def main():
+# Процесс-воркер держит свой прогретый Reader все время работы пула
+_worker_processor = None
+
+def _init_worker(options):
+    """Инициализация процесса-воркера (потоки torch и OpenCV задает сам обработчик по options['threads'])"""
+    global _worker_processor
+    _worker_processor = CertificateProcessorBalanced(**options)
+    # Со службой OCR torch в воркере не импортируется вовсе
+    if _worker_processor.reader is not None:
+        _worker_processor.warm_up()
+
+def _analyze_in_worker(pdf_path):
+    """Распознает один файл в процессе-воркере"""
+    return _worker_processor.analyze_pdf(Path(pdf_path))
+
+def _supervised_worker(conn, options, stages):
+    """Процесс-воркер под надзором: начало и конец стадий с бюджетом сообщаются координатору"""
+    _init_worker(options)
+    if stages:
+        _worker_processor.tracer.listener = stage_reporter(conn, stages)
+    serve(conn, _analyze_in_worker)
+
+def parse_args(argv=None):
+    """Разбирает параметры командной строки (по умолчанию - sys.argv)"""
+    parser = argparse.ArgumentParser(description="Обработка PDF сертификатов")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="число процессов OCR (0 - по числу ядер, 1 - без пула; "
+                             "по умолчанию - по замеру tuning.py autotune, без него 1)")
+    parser.add_argument("--torch-threads", type=int, default=None,
+                        help="потоков torch на процесс OCR (по умолчанию - из профиля)")
+    parser.add_argument("--interop-threads", type=int, default=None,
+                        help="потоков inter-op torch на процесс OCR (по умолчанию - из профиля)")
+    parser.add_argument("--opencv-threads", type=int, default=None,
+                        help="потоков OpenCV на процесс OCR (по умолчанию - из профиля)")
+    parser.add_argument("--renderer", choices=RENDERERS, default=DEFAULT_RENDERER,
+                        help="рендеринг страниц: pdfium - pypdfium2 в процессе, pdftoppm, pdf2image - как раньше, "
+                             "auto - первый доступный из них")
+    parser.add_argument("--file-timeout", type=float, default=0,
+                        help="бюджет времени на файл, сек: файлы распознают процессы под надзором, зависший "
+                             "процесс убивается, файл повторяется профилем fast, затем - в Неопознанные (0 - без надзора)")
+    parser.add_argument("--stage-timeout", default=DEFAULT_STAGE_TIMEOUTS,
+                        help="бюджеты стадий под надзором, стадия=сек через запятую (пусто - без них)")
+    parser.add_argument("--no-triage", action="store_true",
+                        help="распознавать все страницы по порядку: не пропускать пустые, не откладывать "
+                             "похожие на письма и таблицы (сетка линий, плотный текст; проверка по макету "
+                             "страницы, не по тексту) и не останавливаться, когда нашлись все поля")
+    parser.add_argument("--ocr-engine", choices=sorted(OCR_MODES), default=DEFAULT_OCR_MODE,
+                        help="движок OCR: easyocr - как раньше, tesseract - Tesseract rus, "
+                             "tiered - Tesseract, а EasyOCR только для страниц, где поля не нашлись")
+    parser.add_argument("--cascade", action="store_true",
+                        help="останавливать перебор предобработок, как только найдены ФИО и программа")
+    parser.add_argument("--no-text-layer", action="store_true",
+                        help="не использовать встроенный текстовый слой PDF, всегда OCR")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="не использовать кэш OCR (debug/ocr_cache.sqlite)")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_MB,
+                        help="предельный размер кэша OCR, МБ")
+    parser.add_argument("--max-memory-mb", type=float, default=None,
+                        help="бюджет памяти на страницу, МБ (при превышении снижается dpi)")
+    parser.add_argument("--layout", action="store_true",
+                        help="учить расположение полей и распознавать только их полосы на знакомых шаблонах")
+    parser.add_argument("--dpi-ladder", default=",".join(str(dpi) for dpi in DEFAULT_DPI_LADDER),
+                        help="ступени dpi через запятую, например 150,200,300 (300 - как раньше)")
+    parser.add_argument("--batch-ocr", action="store_true",
+                        help="распознавать области нескольких документов общими пачками (в одном процессе)")
+    parser.add_argument("--ocr-threads", type=int, default=DEFAULT_OCR_THREADS,
+                        help="сколько документов одновременно готовят области для пачек")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="размер пачки распознавателя, областей")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help="профиль обработки: quality - как раньше, fast - быстрая предобработка")
+    parser.add_argument("--resume", action="store_true",
+                        help="продолжить прерванный запуск: пропустить файлы из debug/journal.jsonl")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="конвейер: рендеринг, предобработка, OCR и раскладка разных документов одновременно")
+    parser.add_argument("--render-threads", type=int, default=2,
+                        help="потоков рендеринга в конвейере")
+    parser.add_argument("--prep-threads", type=int, default=2,
+                        help="потоков предобработки в конвейере")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="документов в очереди между стадиями конвейера")
+    parser.add_argument("--cprofile", metavar="FILES",
+                        help="профилировать cProfile эти файлы (шаблоны через запятую, например \"*.pdf\"), "
+                             "профили - в debug/profiles/*.pstats")
+    parser.add_argument("--no-service", action="store_true",
+                        help="не подключаться к службе OCR (ocr_service.py), загружать EasyOCR в этом процессе")
+    parser.add_argument("--service-port", type=int, default=DEFAULT_PORT,
+                        help="порт службы OCR на 127.0.0.1")
+    parser.add_argument("--filing", choices=STRATEGIES, default=DEFAULT_STRATEGY,
+                        help="как класть файлы в папки: copy - копия (как раньше), hardlink - жесткая ссылка, "
+                             "reflink - клон блоков, move - перенос, auto - лучшее, что умеет файловая система")
+    parser.add_argument("--catalog", default="csv",
+                        help=f"форматы каталога debug/table.* через запятую: {', '.join(CATALOG_FORMATS)}")
+    parser.add_argument("--flush-rows", type=int, default=DEFAULT_FLUSH_ROWS,
+                        help="сбрасывать каталог на диск каждые N строк")
+    parser.add_argument("--no-text-store", action="store_true",
+                        help="не сохранять распознанный текст в debug/ocr_text.store")
+    args = parser.parse_args(argv)
     
-    processor = CertificateProcessorBalanced()
+    unknown = set(args.catalog.split(",")) - set(CATALOG_FORMATS)
+    if unknown:
+        parser.error(f"неизвестные форматы каталога: {', '.join(sorted(unknown))}")
+    try:
+        args.stage_timeouts = parse_stage_timeouts(args.stage_timeout)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+def create_processor(args, base_dir=None):
+    """Обработчик по разобранным параметрам командной строки"""
+    workers = args.workers
+    if workers is None:
+        # Число процессов, которое autotune намерил на этой машине
+        tuning = load_tuning((Path(base_dir) if base_dir else Path.cwd()) / "debug")
+        workers = tuning['workers'] if tuning else 1
+        if tuning:
+            print(f"[CPU] По замеру autotune: {workers} процессов OCR")
+    elif workers <= 0:
+        workers = os.cpu_count() or 1
+    threads = {key: max(1, value) for key, value in (('torch', args.torch_threads),
+                                                     ('interop', args.interop_threads),
+                                                     ('opencv', args.opencv_threads)) if value is not None}
+    
+    # Под надзором OCR делают только воркеры
+    return CertificateProcessorBalanced(base_dir=base_dir, load_reader=workers <= 1 and not args.file_timeout,
+                                        workers=workers,
+                                        cascade=args.cascade,
+                                        use_text_layer=not args.no_text_layer,
+                                        use_cache=not args.no_cache,
+                                        cache_max_mb=args.cache_max_mb,
+                                        max_memory_mb=args.max_memory_mb,
+                                        use_layout=args.layout,
+                                        dpi_ladder=[int(dpi) for dpi in args.dpi_ladder.split(",")],
+                                        batch_ocr=args.batch_ocr,
+                                        ocr_threads=max(1, args.ocr_threads),
+                                        batch_size=max(1, args.batch_size),
+                                        profile=args.profile,
+                                        resume=args.resume,
+                                        pipeline=args.pipeline,
+                                        render_threads=max(1, args.render_threads),
+                                        prep_threads=max(1, args.prep_threads),
+                                        queue_size=max(1, args.queue_size),
+                                        cprofile=args.cprofile,
+                                        use_service=not args.no_service,
+                                        service_port=args.service_port,
+                                        filing=args.filing,
+                                        catalog_formats=args.catalog.split(","),
+                                        flush_rows=max(1, args.flush_rows),
+                                        use_text_store=not args.no_text_store,
+                                        threads=threads,
+                                        ocr_mode=args.ocr_engine,
+                                        use_triage=not args.no_triage,
+                                        renderer=args.renderer,
+                                        file_timeout=args.file_timeout or None,
+                                        stage_timeouts=args.stage_timeouts)
+
+def main():
+    processor = create_processor(parse_args())
     processor.process_all_pdfs()
 
 if __name__ == "__main__":
@@ -1,12 +1,13 @@
 import os
 import re
-import shutil
 from pathlib import Path
+from name_index import NameIndex
 
 class FolderCleanup:
     def __init__(self):
         self.base_dir = Path.cwd()
         self.certificates_dir = self.base_dir / "сертификаты"
+        self.names = NameIndex()
     
     def clean_program_name(self, name):
         """Очищает название программы от мусора"""
@@ -103,32 +104,18 @@ class FolderCleanup:
             if new_path.exists() and new_path != folder:
                 print(f"   [WARNING]  Папка с названием '{safe_new_name}' уже существует!")
                 
-                # Перемещаем файлы в существующую папку
+                # Перемещаем файлы в существующую папку (занятое имя получает счетчик)
                 files_moved = 0
                 for file in folder.glob("*.pdf"):
-                    target_file = new_path / file.name
-                    if not target_file.exists():
-                        shutil.move(file, target_file)
-                        files_moved += 1
-                    else:
-                        # Добавляем счетчик к имени файла
-                        counter = 1
-                        while True:
-                            name_part = file.stem
-                            ext_part = file.suffix
-                            new_file_name = f"{name_part}_{counter}{ext_part}"
-                            target_file = new_path / new_file_name
-                            if not target_file.exists():
-                                shutil.move(file, target_file)
-                                files_moved += 1
-                                break
-                            counter += 1
+                    self.names.move(file, new_path)
+                    files_moved += 1
                 
                 print(f"   [FOLDER] Перемещено {files_moved} файлов в существующую папку")
                 
                 # Удаляем пустую папку
                 try:
                     folder.rmdir()
+                    self.names.forget(folder)
                     print(f"   [DELETE]  Удалена пустая папка")
                     renamed_count += 1
                 except OSError:
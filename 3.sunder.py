@@ -8,14 +8,15 @@
 
 import os
 import re
-import shutil
 from pathlib import Path
 from difflib import SequenceMatcher
+from name_index import NameIndex
 
 class FolderMerger:
     def __init__(self):
         self.base_dir = Path.cwd()
         self.certificates_dir = self.base_dir / "сертификаты"
+        self.names = NameIndex()
         
     def get_similarity(self, a, b):
         """Вычисляет сходство между двумя строками (0-1)"""
@@ -190,24 +191,15 @@ class FolderMerger:
                 # Если папка уже имеет целевое название, пропускаем
                 continue
                 
-            # Перемещаем все PDF файлы
+            # Перемещаем все PDF файлы (занятое имя получает счетчик по индексу папки)
             for pdf_file in folder.glob("*.pdf"):
-                target_file = target_folder / pdf_file.name
-                
-                # Если файл уже существует, добавляем счетчик
-                counter = 1
-                while target_file.exists():
-                    name_part = pdf_file.stem
-                    ext_part = pdf_file.suffix
-                    target_file = target_folder / f"{name_part}_{counter}{ext_part}"
-                    counter += 1
-                
-                shutil.move(pdf_file, target_file)
+                self.names.move(pdf_file, target_folder)
                 total_moved += 1
             
             # Удаляем пустую папку
             try:
                 folder.rmdir()
+                self.names.forget(folder)
                 print(f"  [DELETE]  Удалена папка: {folder.name}")
             except OSError:
                 print(f"  [WARNING]  Не удалось удалить папку: {folder.name} (возможно, не пустая)")
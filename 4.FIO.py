@@ -5,6 +5,7 @@ import json
 import time
 from pathlib import Path
 from datetime import datetime
+from name_index import NameIndex
 
 class CompleteFIOFixer:
     """Полная версия исправителя ФИО с патчем - решает ВСЕ проблемы"""
@@ -16,6 +17,9 @@ class CompleteFIOFixer:
         # Кэш для API
         self.api_cache = {}
         
+        # Свободные имена в папках без перебора файлов на диске
+        self.names = NameIndex()
+        
         # Расширенные словари имен
         self.male_names = {
             'александр', 'алексей', 'андрей', 'антон', 'артем', 'артём', 'владимир',
@@ -490,20 +494,11 @@ class CompleteFIOFixer:
                 corrected_name, was_changed = self.correct_fio_complete(original_name, use_api)
                 
                 if was_changed:
-                    safe_name = self.sanitize_filename(corrected_name)
-                    new_path = pdf_file.parent / safe_name
-                    
-                    # Избегаем конфликтов
-                    counter = 1
-                    while new_path.exists() and new_path != pdf_file:
-                        name_part = Path(safe_name).stem
-                        ext_part = Path(safe_name).suffix
-                        safe_name = f"{name_part}_{counter}{ext_part}"
-                        new_path = pdf_file.parent / safe_name
-                        counter += 1
+                    # Избегаем конфликтов: занятое имя получает счетчик
+                    new_path = self.names.move(pdf_file, pdf_file.parent, self.sanitize_filename(corrected_name))
+                    safe_name = new_path.name
                     
                     if new_path != pdf_file:
-                        pdf_file.rename(new_path)
                         renamed_count += 1
                         self.stats['renamed_files'] += 1
                         
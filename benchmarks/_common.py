@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+"""
+Общие функции бенчмарков: загрузка 1.new2.py (имя файла не подходит для import)
+, поиск PDF для замеров и сравнение полей с эталоном.
+"""
+
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+if str(REPO_DIR) not in sys.path:
+    sys.path.insert(0, str(REPO_DIR))
+
+
+def load_processor_module():
+    """Модуль 1.new2.py"""
+    spec = importlib.util.spec_from_file_location("new2", REPO_DIR / "1.new2.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def find_pdfs(input_dir, limit=None):
+    """PDF файлы папки по алфавиту"""
+    pdf_files = sorted(Path(input_dir).glob("*.pdf"))
+    if limit:
+        pdf_files = pdf_files[:limit]
+    return pdf_files
+
+
+def load_truth(path):
+    """Эталонные поля: JSON {имя файла: {fio, program_name, cert_number, cert_date, hours}}"""
+    if not path:
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def field_accuracy(results, truth, fields, files=None):
+    """Доля файлов с верным значением каждого поля: {поле: доля}.
+    По умолчанию считаются все файлы эталона: необработанный файл - ошибка во всех полях"""
+    files = list(truth) if files is None else [name for name in files if name in truth]
+    if not files:
+        return {}
+    return {field: sum(results.get(name, {}).get(field) == truth[name].get(field) for name in files) / len(files)
+            for field in fields}
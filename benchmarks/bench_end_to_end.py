@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Сквозной бенчмарк: полный запуск обработки на синтетическом корпусе (make_corpus.py)
+во временной папке, затем файлов в минуту, секунды по стадиям и точность полей
+(в целом и по вариантам скана). Результат сохраняется в JSON; с --baseline
+запуск сравнивается с прежним и завершается с кодом 1 при регрессии.
+
+    python benchmarks/bench_end_to_end.py --corpus benchmarks/corpus -- --profile fast --cascade
+    python benchmarks/bench_end_to_end.py --baseline benchmarks/results/before.json
+
+Все параметры после -- передаются обработчику как параметры 1.new2.py.
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from _common import load_processor_module, load_truth, field_accuracy
+import field_extraction
+from journal import ProcessingJournal
+from tracing import Tracer
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Стадии короче этого (сек/файл) и в прежнем, и в новом запуске регрессией не считаются - это шум
+MIN_STAGE_SECONDS = 0.05
+
+# Значения строки CSV, означающие "поле не найдено"
+MISSING_VALUES = ("", "НЕ НАЙДЕНО")
+
+CSV_FIELDS = {
+    'fio': 'ФИО',
+    'program_name': 'Название',
+    'cert_number': 'Номер',
+    'cert_date': 'Дата',
+    'hours': 'Часы',
+}
+
+
+def journal_fields(base_dir):
+    """Поля по именам входных файлов из журнала запуска"""
+    journal = ProcessingJournal(Path(base_dir) / "debug" / "journal.jsonl", resume=True)
+    journal.close()
+    results = {}
+    for record in journal.records:
+        row = record['row']
+        results[record['file']] = {field: (None if row.get(column) in MISSING_VALUES else row.get(column))
+                                   for field, column in CSV_FIELDS.items()}
+    return results
+
+
+def stage_seconds(base_dir, stage_order=()):
+    """Суммарные секунды по каждой стадии трассировки запуска (debug/trace.jsonl):
+    hash, pdfinfo, render, triage, preprocess, ocr, extract, filing, ... и file - весь файл"""
+    tracer = Tracer()
+    with open(Path(base_dir) / "debug" / "trace.jsonl", 'r', encoding='utf-8') as f:
+        tracer.extend(json.loads(line) for line in f if line.strip())
+    totals = {name: sum(seconds) for name, seconds in tracer.stage_totals().items()}
+    ordered = [name for name in stage_order if name in totals]
+    ordered += sorted(name for name in totals if name not in stage_order)
+    return {name: totals[name] for name in ordered}
+
+
+def run(corpus, processor_argv):
+    """Полный запуск обработчика на копии корпуса; возвращает отчет"""
+    module = load_processor_module()
+    truth = load_truth(corpus / "truth.json")
+    pdf_files = sorted(corpus.glob("*.pdf"))
+
+    with tempfile.TemporaryDirectory(prefix="pdf_organizer_bench_") as base_dir:
+        input_dir = Path(base_dir) / "input"
+        input_dir.mkdir()
+        for pdf_file in pdf_files:
+            shutil.copy2(pdf_file, input_dir / pdf_file.name)
+
+        processor = module.create_processor(module.parse_args(processor_argv), base_dir=base_dir)
+        start_time = time.time()
+        processor.process_all_pdfs()
+        wall_time = time.time() - start_time
+
+        results = journal_fields(base_dir)
+        stages = stage_seconds(base_dir, module.CertificateProcessorBalanced.TRACE_STAGES)
+        # Иначе временную папку с открытым кэшем не удалить (Windows)
+        if processor.ocr_cache:
+            processor.ocr_cache.close()
+
+    # Точность по вариантам скана
+    by_variant = defaultdict(dict)
+    for name, expected in truth.items():
+        by_variant[expected.get('variant', 'unknown')][name] = expected
+
+    return {
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'argv': processor_argv,
+        'files': len(pdf_files),
+        'filed': len(results),
+        'wall_seconds': wall_time,
+        'files_per_minute': len(pdf_files) / max(wall_time, 1e-9) * 60,
+        'stage_seconds': stages,
+        'accuracy': field_accuracy(results, truth, field_extraction.FIELDS),
+        'accuracy_by_variant': {variant: field_accuracy(results, expected, field_extraction.FIELDS)
+                                for variant, expected in sorted(by_variant.items())},
+    }
+
+
+def compare(report, baseline, max_slowdown, max_accuracy_drop):
+    """Регрессии относительно прежнего запуска (список строк)"""
+    regressions = []
+    old_speed, new_speed = baseline['files_per_minute'], report['files_per_minute']
+    if new_speed < old_speed * (1 - max_slowdown):
+        regressions.append(f"скорость {new_speed:.1f} < {old_speed:.1f} файлов/мин")
+
+    # Каждая стадия отдельно, в секундах на файл: замедление одной стадии видно, даже если общее в допуске
+    for stage, seconds in report['stage_seconds'].items():
+        if stage not in baseline.get('stage_seconds', {}):
+            continue
+        old = baseline['stage_seconds'][stage] / max(baseline['files'], 1)
+        new = seconds / max(report['files'], 1)
+        if new > old * (1 + max_slowdown) and new >= MIN_STAGE_SECONDS:
+            regressions.append(f"стадия {stage} {new:.2f} > {old:.2f} сек/файл")
+
+    for field in field_extraction.FIELDS:
+        old, new = baseline['accuracy'].get(field, 0.0), report['accuracy'].get(field, 0.0)
+        if new < old - max_accuracy_drop:
+            regressions.append(f"точность {field} {new * 100:.1f}% < {old * 100:.1f}%")
+    return regressions
+
+
+def print_report(report):
+    """Печатает итог запуска"""
+    print(f"\n[STATS] Сквозной бенчмарк: {report['files']} файлов, {report['wall_seconds']:.1f} сек, "
+          f"{report['files_per_minute']:.1f} файлов/мин")
+    for stage, seconds in report['stage_seconds'].items():
+        print(f"   {stage:12} {seconds:8.1f} сек ({seconds / max(report['files'], 1):.2f} сек/файл)")
+
+    header = " ".join(f"{field:>13}" for field in field_extraction.FIELDS)
+    print(f"   {'':14} {header}")
+    rows = [('все', report['accuracy'])] + list(report['accuracy_by_variant'].items())
+    for name, accuracy in rows:
+        print(f"   {name:14} " + " ".join(f"{accuracy.get(field, 0) * 100:12.1f}%" for field in field_extraction.FIELDS))
+
+
+def main():
+    argv = sys.argv[1:]
+    processor_argv = []
+    if "--" in argv:
+        processor_argv = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк обработки сертификатов")
+    parser.add_argument("--corpus", default=str(Path(__file__).parent / "corpus"), help="папка make_corpus.py")
+    parser.add_argument("--output", help="куда сохранить JSON (по умолчанию benchmarks/results/<время>.json)")
+    parser.add_argument("--baseline", help="JSON прежнего запуска для сравнения")
+    parser.add_argument("--max-slowdown", type=float, default=0.10, help="допустимое падение скорости и замедление каждой стадии (доля)")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.02, help="допустимое падение точности поля (доля)")
+    args = parser.parse_args(argv)
+
+    corpus = Path(args.corpus)
+    if not (corpus / "truth.json").exists():
+        print(f"[ERROR] Корпус {corpus} не найден, создайте его: python benchmarks/make_corpus.py")
+        sys.exit(2)
+
+    report = run(corpus, processor_argv)
+    print_report(report)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{time.strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[SAVE] Результат сохранен в {output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_slowdown, args.max_accuracy_drop)
+        if regressions:
+            for regression in regressions:
+                print(f"[ERROR] Регрессия: {regression}")
+            sys.exit(1)
+        print(f"[OK] Регрессий относительно {args.baseline} нет")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Микро-бенчмарк извлечения полей: field_extraction против прежних методов
+CertificateProcessorBalanced (их копия ниже - эталон).
+Корпус: *.txt из --corpus, итоговые тексты из кэша OCR и синтетические зашумленные тексты.
+Любое расхождение результатов - ошибка (код возврата 1).
+
+    python benchmarks/bench_field_extraction.py --corpus debug --repeat 20
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import _common  # noqa: F401 - путь к модулям репозитория
+import field_extraction
+from ocr_cache import OCRCache, DEFAULT_CACHE_PATH
+
+
+class LegacyExtractor:
+    """Извлечение полей в том виде, в каком оно было в 1.new2.py"""
+
+    def extract_fio(self, text):
+        """Извлекает ФИО из текста"""
+        try:
+            # Очищаем текст от лишних символов
+            cleaned_text = re.sub(r'[^\w\sа-яёА-ЯЁ]', ' ', text)
+            cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
+
+            # Несколько вариантов поиска ФИО
+            patterns = [
+                r"Настоящее удостоверение выдано\s+(.*?)\s+в\s+том",
+                r"удостоверение выдано\s+(.*?)\s+в\s+том",
+                r"выдано\s+(.*?)\s+в\s+том\s+что",
+                r"выдано\s+([А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+)",
+            ]
+
+            for pattern in patterns:
+                match = re.search(pattern, cleaned_text, re.IGNORECASE | re.DOTALL)
+                if match:
+                    fio_raw = match.group(1).strip()
+                    # Проверяем, что это похоже на ФИО (3 слова, начинающиеся с заглавной)
+                    if self.validate_fio(fio_raw):
+                        fio_clean = self.normalize_fio(fio_raw)
+                        return fio_clean
+
+            # Дополнительный поиск по паттернам русских имен
+            fio_pattern = r'([А-ЯЁ][а-яё]+(?:ой|ей|ому|ему|ной|ному|ской|ский)\s+[А-ЯЁ][а-яё]+(?:е|у|ь)?\s+[А-ЯЁ][а-яё]+(?:ичу|овичу|евичу|ичем|овичем|евичем|овне|евне|ичне))'
+            match = re.search(fio_pattern, text)
+            if match:
+                fio_raw = match.group(1).strip()
+                if self.validate_fio(fio_raw):
+                    return self.normalize_fio(fio_raw)
+
+            return None
+        except Exception as e:
+            print(f"Ошибка при извлечении ФИО: {e}")
+            return None
+
+    def validate_fio(self, fio):
+        """Проверяет, похож ли текст на ФИО"""
+        words = fio.split()
+        if len(words) < 2 or len(words) > 4:
+            return False
+
+        # Проверяем, что все слова начинаются с заглавной буквы
+        for word in words:
+            if not word or not word[0].isupper() or len(word) < 2:
+                return False
+
+        return True
+
+    def normalize_fio(self, fio_raw):
+        """Очищает ФИО (без изменения падежа)"""
+        fio = fio_raw.strip()
+
+        # Очищаем от лишних пробелов и приводим к правильному регистру
+        words = fio.split()
+        normalized_words = []
+
+        for word in words:
+            if word:
+                # Первая буква заглавная, остальные строчные
+                normalized_word = word[0].upper() + word[1:].lower()
+                normalized_words.append(normalized_word)
+
+        result = ' '.join(normalized_words)
+        return result
+
+    def extract_program_name(self, text):
+        """Извлекает название программы"""
+        try:
+            # Очищаем текст от мусорных символов
+            cleaned_text = re.sub(r'[^\w\sа-яёА-ЯЁ\-\(\)\.\,\:\"«»]', ' ', text)
+            cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
+
+            # Несколько вариантов поиска названия программы
+            patterns = [
+                r'по программе\s*["\u201C«]?\s*(.*?)\s*["\u201D»]?\s*в\s*объеме',
+                r'по программе\s*["\u201C«]?\s*(.*?)\s*["\u201D»]?\s*\d+\s*час',
+                r'по программе\s*["\u201C«]?\s*(.*?)\s*["\u201D»]?\s*№',
+                r'программе\s*["\u201C«]?\s*(.*?)\s*["\u201D»]?\s*в\s*объ[её]ме',
+                r'программе\s*["\u201C«]?\s*(.*?)\s*["\u201D»]?\s*\d+\s*час',
+            ]
+
+            for pattern in patterns:
+                match = re.search(pattern, cleaned_text, re.IGNORECASE | re.DOTALL)
+                if match:
+                    program_name = match.group(1).strip()
+
+                    # Очищаем название от мусора
+                    program_name = self.clean_program_name(program_name)
+
+                    # Проверяем минимальную длину и разумность
+                    if len(program_name) > 10 and self.validate_program_name(program_name):
+                        return program_name
+
+            # Поиск стандартных названий программ без учета "по программе"
+            standard_programs = [
+                r'(Государственн[ыые]+\s+и\s+муниципальн[ыые]+\s+закупки.*?(?:теория\s+и\s+практика|практика))',
+                r'([Оо0]\s*контрактной\s+системе\s+в\s+сфере\s+закупок)',
+                r'(44.*?ФЗ.*?закуп)',
+                r'(контрактн[оая]+\s+систем[ае]\s+в\s+сфере\s+закупок)',
+            ]
+
+            for pattern in standard_programs:
+                match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+                if match:
+                    program_name = self.clean_program_name(match.group(1))
+                    if len(program_name) > 10:
+                        return program_name
+
+            # Дополнительный поиск для искаженного текста
+            fallback_patterns = [
+                r'(Государствен[а-яшые]*\s+и\s+муниципальн[а-яшые]*\s+закупки[^"]*(?:теория|практика)?)',
+                r'([Оо0]\s*контрактн[а-я]*\s+систем[а-я]*\s+в\s+сфере\s+закупок[а-я]*)',
+                r'(Государств[а-яшые]*\s+[ия]*\s*муници[а-яшые]*\s+закуп[а-яки]*)',
+                r'(44[^"]*ФЗ[^"]*закуп[а-яки]*)',
+            ]
+
+            for pattern in fallback_patterns:
+                match = re.search(pattern, text, re.IGNORECASE)
+                if match:
+                    program_name = self.clean_program_name(match.group(1))
+                    if len(program_name) > 15:
+                        return program_name
+
+            return None
+        except Exception as e:
+            print(f"Ошибка при извлечении названия программы: {e}")
+            return None
+
+    def clean_program_name(self, name):
+        """Очищает название программы"""
+        if not name:
+            return ""
+
+        # Убираем кавычки и лишние символы
+        name = re.sub(r'["\u201C\u201D«»()"]', '', name)
+        name = re.sub(r'\s+', ' ', name)
+        name = name.strip()
+
+        # Убираем мусорные символы в конце и начале
+        name = re.sub(r'^[^\w]*', '', name)
+        name = re.sub(r'[\*\#\{\}\[\]\$\%\@\!\+\=\<\>]+.*$', '', name)
+
+        # Убираем повторяющиеся символы (более 3 подряд)
+        name = re.sub(r'(.)\1{3,}', r'\1', name)
+
+        # Убираем фразы "в объёме", "в объеме" и цифры после них
+        name = re.sub(r'\s*[вВ]\s*объ[её]ме.*$', '', name)
+        name = re.sub(r'\s*[вВ]\s*обь[её]ме.*$', '', name)
+        name = re.sub(r'\s*объ[её]мс.*$', '', name)
+        name = re.sub(r'\s*объ[её]не.*$', '', name)
+        name = re.sub(r'\s*оь[её]ме.*$', '', name)
+        name = re.sub(r'\s*\d+\s*час.*$', '', name)
+        name = re.sub(r'\s*\d+\s*₽.*$', '', name)
+
+        # Заменяем искаженные символы
+        replacements = [
+            ('0', 'О'),
+            ('Государствен[а-яшы]*', 'Государственные'),
+            ('Государств[а-яшы]*', 'Государственные'),
+            ('муниципальн[а-яшы]*', 'муниципальные'),
+            ('муници[а-яшы]*', 'муниципальные'),
+            ('контрактн[а-я]*', 'контрактной'),
+            ('коптрактн[а-я]*', 'контрактной'),
+            ('систем[а-я]*', 'системе'),
+            ('закупок[ъэ]', 'закупок'),
+            ('закуп[а-яки]*', 'закупки'),
+            ('44[^"]*ФЗ', '44-ФЗ'),
+        ]
+
+        for pattern, replacement in replacements:
+            name = re.sub(pattern, replacement, name, flags=re.IGNORECASE)
+
+        # Нормализуем пробелы
+        name = re.sub(r'\s+', ' ', name)
+
+        return name.strip()
+
+    def validate_program_name(self, name):
+        """Проверяет разумность названия программы"""
+        letters = len(re.findall(r'[а-яёА-ЯЁ]', name))
+        total = len(name)
+
+        if total == 0:
+            return False
+
+        return (letters / total) > 0.7
+
+    def extract_certificate_number(self, text):
+        """Извлекает номер сертификата"""
+        try:
+            patterns = [
+                r'(\d{2}\s*[А-ЯЁ]{2,5}\d?\s*\d{6})',
+                r'(\d{2}\s+[А-ЯЁ]+\s*\d+)',
+                r'([А-ЯЁ]{2,5}\s*\d{6,8})',
+            ]
+
+            for pattern in patterns:
+                matches = re.findall(pattern, text)
+                if matches:
+                    return matches[0].strip()
+
+            return None
+        except Exception as e:
+            return None
+
+    def extract_date(self, text):
+        """Извлекает дату"""
+        try:
+            pattern = r'(\d{1,2}\.\d{1,2}\.\d{4})'
+            matches = re.findall(pattern, text)
+
+            if matches:
+                return matches[-1]
+
+            return None
+        except Exception as e:
+            return None
+
+    def extract_hours(self, text):
+        """Извлекает количество часов"""
+        try:
+            patterns = [
+                r'в\s*объ[её]ме\s*(\d+)\s*час',
+                r'Всего\s*(\d+)',
+                r'(\d+)\s*час[аов]?(?:\s|$)',
+                r'объёмс\s*(\d+)',
+                r'объёне\s*(\d+)',
+            ]
+
+            found_hours = []
+
+            for pattern in patterns:
+                matches = re.findall(pattern, text, re.IGNORECASE)
+                for match in matches:
+                    hours = int(match)
+                    if 8 <= hours <= 1000:
+                        found_hours.append(hours)
+
+            if found_hours:
+                hour_counts = Counter(found_hours)
+                most_common_hours = hour_counts.most_common(1)[0][0]
+                return str(most_common_hours)
+
+            return None
+        except Exception as e:
+            return None
+
+
+SYNTHETIC_NAMES = ["Иванову Ивану Ивановичу", "ПЕТРОВОЙ АННЕ СЕРГЕЕВНЕ", "Сидорову Олегу Петровичу"]
+SYNTHETIC_PROGRAMS = [
+    "Государственные и муниципальные закупки: теория и практика",
+    "О контрактной системе в сфере закупок",
+    "44-ФЗ закупки товаров, работ, услуг",
+]
+NOISE_CHARS = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя0123456789.,:;«»\"'()*#$%!№- "
+
+
+def synthetic_texts(count, seed=1):
+    """Тексты сертификатов с OCR-подобными искажениями и длинным мусором"""
+    rng = random.Random(seed)
+    texts = []
+    for index in range(count):
+        noise = lambda length: "".join(rng.choice(NOISE_CHARS) for _ in range(length))
+        parts = [
+            noise(rng.randint(0, 400)),
+            "Настоящее удостоверение выдано" if rng.random() < 0.7 else "удостоверение вьдано",
+            rng.choice(SYNTHETIC_NAMES),
+            "в том что он(а) прошел(а) обучение по программе" if rng.random() < 0.8 else "программе",
+            "«" + rng.choice(SYNTHETIC_PROGRAMS) + "»",
+            rng.choice(["в объеме", "в объёме", "объёмс", ""]),
+            str(rng.choice([16, 36, 40, 72, 144, 250])),
+            rng.choice(["часов", "часа", "час", ""]),
+            f"{rng.randint(10, 99)} {rng.choice(['УПК', 'ПК', 'АБВГ'])} {rng.randint(100000, 999999)}",
+            f"{rng.randint(1, 28)}.{rng.randint(1, 12):02}.{rng.randint(2018, 2025)}",
+            noise(rng.randint(0, 3000 if index % 5 == 0 else 300)),
+        ]
+        # Часть текстов без ключевых слов или с оборванным концом
+        if index % 7 == 0:
+            parts = parts[:4] + [noise(2000)]
+        texts.append(" ".join(parts))
+    return texts
+
+
+def load_corpus(corpus_dir, cache_path, synthetic):
+    """Тексты для сравнения: файлы, кэш OCR и синтетика"""
+    texts = []
+    if corpus_dir:
+        for path in sorted(Path(corpus_dir).glob("*.txt")):
+            texts.append(path.read_text(encoding="utf-8", errors="replace"))
+
+    if cache_path and Path(cache_path).exists():
+        cache = OCRCache(cache_path)
+        try:
+            for pdf_hash, _, _, _ in cache.documents():
+                texts.extend(text for _, _, text in cache.document_texts(pdf_hash))
+        finally:
+            cache.close()
+
+    return texts + synthetic_texts(synthetic)
+
+
+def timed(function, texts, repeat):
+    """Время одного прохода по корпусу (лучшее из repeat)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for text in texts:
+            function(text)
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк извлечения полей")
+    parser.add_argument("--corpus", help="папка с распознанными текстами *.txt")
+    parser.add_argument("--cache", default=str(DEFAULT_CACHE_PATH), help="кэш OCR с итоговыми текстами")
+    parser.add_argument("--synthetic", type=int, default=200, help="сколько синтетических текстов добавить")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    texts = load_corpus(args.corpus, args.cache, args.synthetic)
+    legacy = LegacyExtractor()
+    legacy_functions = {
+        'fio': legacy.extract_fio,
+        'program_name': legacy.extract_program_name,
+        'cert_number': legacy.extract_certificate_number,
+        'cert_date': legacy.extract_date,
+        'hours': legacy.extract_hours,
+    }
+
+    # Эталон: поля должны совпасть на каждом тексте
+    mismatches = 0
+    for index, text in enumerate(texts):
+        expected = {field: function(text) for field, function in legacy_functions.items()}
+        actual = field_extraction.extract_fields(text)
+        if actual != expected:
+            mismatches += 1
+            print(f"[ERROR] Текст {index}: ожидалось {expected}, получено {actual}")
+
+    print(f"[TARGET] Текстов: {len(texts)}, средняя длина {sum(map(len, texts)) / max(len(texts), 1):.0f} символов")
+    print(f"{'поле':14} {'было, мс':>10} {'стало, мс':>10} {'ускорение':>10}")
+    new_functions = {
+        'fio': field_extraction.extract_fio,
+        'program_name': field_extraction.extract_program_name,
+        'cert_number': field_extraction.extract_certificate_number,
+        'cert_date': field_extraction.extract_date,
+        'hours': field_extraction.extract_hours,
+    }
+    for field in field_extraction.FIELDS:
+        old_time = timed(legacy_functions[field], texts, args.repeat)
+        new_time = timed(new_functions[field], texts, args.repeat)
+        print(f"{field:14} {old_time * 1000:10.2f} {new_time * 1000:10.2f} {old_time / max(new_time, 1e-9):9.2f}x")
+
+    old_total = timed(lambda text: [function(text) for function in legacy_functions.values()], texts, args.repeat)
+    new_total = timed(field_extraction.extract_fields, texts, args.repeat)
+    print(f"{'все поля':14} {old_total * 1000:10.2f} {new_total * 1000:10.2f} {old_total / max(new_total, 1e-9):9.2f}x")
+
+    if mismatches:
+        print(f"[ERROR] Расхождений: {mismatches}")
+        sys.exit(1)
+    print("[OK] Результаты совпадают")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк памяти на страницу: прежний путь (RGB от PIL, копия в numpy, BGR,
+новый массив на каждом шаге предобработки) против серого рендеринга в буфер
+пула и предобработки на месте. OCR не запускается - меряется рендеринг и все
+варианты предобработки страницы.
+
+Пик - по tracemalloc (массивы numpy и OpenCV учитываются, внутренние
+временные буферы OpenCV - нет). Буферы - сколько изображений выделено заново:
+у прежнего пути по шагам, у нового - промахи пула.
+
+    python benchmarks/bench_memory.py --input input --limit 5 [--dpi 300]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from pdf2image import convert_from_path
+
+from _common import load_processor_module, find_pdfs
+
+
+def legacy_preprocess(module, name, image, pipeline, fresh):
+    """Прежняя предобработка: каждый шаг возвращает новый массив"""
+    if name == "original":
+        return image
+    gray = fresh(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+    if name == "simple":
+        enhanced = fresh(cv2.convertScaleAbs(gray, alpha=1.5, beta=30))
+        return fresh(cv2.GaussianBlur(enhanced, (1, 1), 0))
+    if pipeline == "quality":
+        height, width = gray.shape
+        gray = fresh(cv2.resize(gray, (width * 2, height * 2), interpolation=cv2.INTER_CUBIC))
+        denoised = fresh(cv2.fastNlMeansDenoising(gray))
+    else:
+        if pipeline == "fast-bilateral":
+            denoised = fresh(cv2.bilateralFilter(gray, 5, 50, 50))
+        else:
+            denoised = fresh(cv2.medianBlur(gray, 3))
+        if module.estimate_text_height(denoised) < module.MIN_TEXT_HEIGHT:
+            height, width = denoised.shape
+            denoised = fresh(cv2.resize(denoised, (width * 2, height * 2), interpolation=cv2.INTER_CUBIC))
+    enhanced = fresh(clahe.apply(denoised))
+    return fresh(cv2.adaptiveThreshold(enhanced, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2))
+
+
+def legacy_page(module, processor, pdf_file, page_no, dpi):
+    """Прежний путь страницы; возвращает число выделенных изображений"""
+    created = []
+    def fresh(array):
+        created.append(array.nbytes)
+        return array
+
+    images = convert_from_path(pdf_file, dpi=dpi, first_page=page_no + 1, last_page=page_no + 1)
+    rgb = fresh(np.array(images[0]))
+    images[0].close()
+    del images
+    page = fresh(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+    del rgb
+    for variant in processor.PREPROCESS_VARIANTS:
+        processed = legacy_preprocess(module, variant, page, processor.preprocess_pipeline, fresh)
+        del processed
+    return len(created)
+
+
+def pooled_page(processor, doc, page_no):
+    """Новый путь страницы; возвращает число выделенных изображений (промахов пула)"""
+    allocations = processor.buffers.allocations
+    page = processor.get_page_image(doc, page_no)
+    for variant in processor.PREPROCESS_VARIANTS:
+        processed = processor.preprocess_variant(variant, page)
+        if variant != "original":
+            processor.buffers.release(processed)
+    processor.release_page(doc)
+    return processor.buffers.allocations - allocations
+
+
+def measure(pages, run):
+    """(пик МБ на страницу в среднем, максимум МБ, выделений на страницу, сек на страницу).
+    Пик считается от памяти до первой страницы - буферы, которые держит пул, входят в него"""
+    peaks, allocations = [], []
+    start_time = time.perf_counter()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        for page in pages:
+            tracemalloc.reset_peak()
+            allocations.append(run(page))
+            peaks.append((tracemalloc.get_traced_memory()[1] - baseline) / 1024 / 1024)
+    finally:
+        tracemalloc.stop()
+    elapsed = time.perf_counter() - start_time
+    return sum(peaks) / len(peaks), max(peaks), sum(allocations) / len(allocations), elapsed / len(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк памяти на страницу")
+    parser.add_argument("--input", default="input", help="папка с PDF")
+    parser.add_argument("--limit", type=int, default=5, help="сколько PDF взять")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--profile", default="quality", help="профиль предобработки (quality, fast)")
+    args = parser.parse_args()
+
+    module = load_processor_module()
+    pdf_files = find_pdfs(args.input, args.limit)
+    if not pdf_files:
+        print(f"[ERROR] PDF файлы не найдены в папке {args.input}!")
+        return
+
+    # OCR не нужен - модель не загружается
+    processor = module.CertificateProcessorBalanced(load_reader=False, use_cache=False, profile=args.profile)
+    docs = [processor.open_document(pdf_file, dpi=args.dpi) for pdf_file in pdf_files]
+    pages = [(doc, page_no) for doc in docs for page_no in range(doc['page_count'])]
+    print(f"[TARGET] {len(pdf_files)} PDF, {len(pages)} страниц, {args.dpi} dpi, профиль {args.profile}")
+
+    results = [
+        ("прежний (RGB)", measure(pages, lambda page: legacy_page(module, processor, page[0]['pdf_path'], page[1], args.dpi))),
+        ("серый + пул", measure(pages, lambda page: pooled_page(processor, *page))),
+    ]
+
+    print(f"{'путь':16} {'пик, МБ/стр':>12} {'макс, МБ':>9} {'буферов/стр':>12} {'сек/стр':>8}")
+    for name, (peak, maximum, allocations, seconds) in results:
+        print(f"{name:16} {peak:12.1f} {maximum:9.1f} {allocations:12.1f} {seconds:8.2f}")
+
+    legacy_peak, pooled_peak = results[0][1][0], results[1][1][0]
+    print(f"[STATS] Пик памяти на страницу меньше в {legacy_peak / max(pooled_peak, 1e-9):.1f} раза")
+    if processor.buffers.summary():
+        print(f"   {processor.buffers.summary()}")
+
+
+if __name__ == "__main__":
+    main()
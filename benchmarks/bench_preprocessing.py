@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк реализаций предобработки enhanced: время на страницу (предобработка и OCR)
+и точность извлечения полей для каждой из них.
+Эталон - JSON с полями (--truth), без него - результат реализации quality.
+
+    python benchmarks/bench_preprocessing.py --input input --limit 20 [--truth truth.json]
+"""
+
+import argparse
+import time
+
+from _common import load_processor_module, find_pdfs, load_truth, field_accuracy
+import field_extraction
+
+
+def run_pipeline(processor, pages, pipeline):
+    """Распознает страницы одной реализацией; возвращает (поля по файлам, время предобработки, время OCR)"""
+    processor.preprocess_pipeline = pipeline
+    texts = {}
+    preprocess_time = ocr_time = 0.0
+
+    for name, image in pages:
+        start_time = time.perf_counter()
+        processed = processor.preprocess_variant("enhanced", image)
+        preprocess_time += time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        text = " ".join(processor.readtext(processed, detail=0))
+        ocr_time += time.perf_counter() - start_time
+
+        texts[name] = texts.get(name, "") + text + " "
+
+    fields = {name: field_extraction.extract_fields(text) for name, text in texts.items()}
+    return fields, preprocess_time, ocr_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк предобработки")
+    parser.add_argument("--input", default="input", help="папка с PDF")
+    parser.add_argument("--limit", type=int, default=20, help="сколько PDF взять")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--truth", help="JSON с эталонными полями по именам файлов")
+    args = parser.parse_args()
+
+    module = load_processor_module()
+    pdf_files = find_pdfs(args.input, args.limit)
+    if not pdf_files:
+        print(f"[ERROR] PDF файлы не найдены в папке {args.input}!")
+        return
+
+    processor = module.CertificateProcessorBalanced(use_cache=False)
+    processor.warm_up()
+
+    pages = []
+    for pdf_file in pdf_files:
+        doc = processor.open_document(pdf_file, dpi=args.dpi)
+        for page_no in range(doc['page_count']):
+            # Буфер страницы после release_page достанется следующей странице - храним копию
+            pages.append((pdf_file.name, processor.get_page_image(doc, page_no).copy()))
+            processor.release_page(doc)
+    print(f"[TARGET] {len(pdf_files)} PDF, {len(pages)} страниц, {args.dpi} dpi")
+
+    truth = load_truth(args.truth)
+    header = "   ".join(f"{field:>12}" for field in field_extraction.FIELDS)
+    print(f"{'реализация':16} {'предобр., с/стр':>16} {'OCR, с/стр':>11}   {header}")
+
+    for pipeline in processor.PREPROCESS_PIPELINES:
+        fields, preprocess_time, ocr_time = run_pipeline(processor, pages, pipeline)
+        # Без эталона точность считается относительно реализации quality
+        if truth is None:
+            truth = fields
+        accuracy = field_accuracy(fields, truth, field_extraction.FIELDS, files=fields)
+        columns = "   ".join(f"{accuracy.get(field, 0) * 100:11.1f}%" for field in field_extraction.FIELDS)
+        print(f"{pipeline:16} {preprocess_time / len(pages):16.2f} {ocr_time / len(pages):11.2f}   {columns}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк рендеринга: задержка каждого рендерера (pdfium, pdftoppm, pdf2image)
+отдельно для одностраничных и многостраничных документов. Время документа
+включает чтение числа страниц и рендеринг всех страниц, как при OCR.
+
+    python benchmarks/bench_render.py --input input --limit 20 [--dpi 300] [--repeat 3]
+"""
+
+import argparse
+import statistics
+import time
+
+import _common  # noqa: F401 - путь к модулям репозитория
+from _common import find_pdfs
+from image_buffers import BufferPool
+from renderers import RENDERER_CLASSES, RendererUnavailable
+
+
+def render_document(renderer, pdf_file, dpi, pool):
+    """(секунд на документ, секунд до первой страницы, страниц)"""
+    start_time = time.perf_counter()
+    page_count, _ = renderer.info(pdf_file)
+    first_page = None
+    for page_no in range(page_count):
+        pool.release(renderer.render(pdf_file, page_no, dpi, pool))
+        if first_page is None:
+            first_page = time.perf_counter() - start_time
+    renderer.close()
+    return time.perf_counter() - start_time, first_page or 0.0, page_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк рендеринга страниц")
+    parser.add_argument("--input", default="input", help="папка с PDF")
+    parser.add_argument("--limit", type=int, default=20, help="сколько PDF взять")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3, help="сколько раз рендерить каждый документ")
+    args = parser.parse_args()
+
+    pdf_files = find_pdfs(args.input, args.limit)
+    if not pdf_files:
+        print(f"[ERROR] PDF файлы не найдены в папке {args.input}!")
+        return
+
+    renderers = []
+    for name, renderer_class in RENDERER_CLASSES.items():
+        try:
+            renderers.append(renderer_class())
+        except RendererUnavailable as e:
+            print(f"[WARNING]  {name}: {e}")
+
+    # Группы по числу страниц (его берем у первого рендерера)
+    groups = {"1 стр.": [], "многостр.": []}
+    for pdf_file in pdf_files:
+        page_count, _ = renderers[0].info(pdf_file)
+        groups["1 стр." if page_count == 1 else "многостр."].append(pdf_file)
+    renderers[0].close()
+    print(f"[TARGET] {len(pdf_files)} PDF (1 стр.: {len(groups['1 стр.'])}, "
+          f"многостр.: {len(groups['многостр.'])}), {args.dpi} dpi, повторов {args.repeat}")
+
+    print(f"{'рендерер':10} {'документы':10} {'мс/док':>8} {'p90':>8} {'1-я стр., мс':>13} {'мс/стр':>8}")
+    for renderer in renderers:
+        pool = BufferPool()
+        for group, files in groups.items():
+            if not files:
+                continue
+            durations, first_pages, pages = [], [], 0
+            for _ in range(args.repeat):
+                for pdf_file in files:
+                    duration, first_page, page_count = render_document(renderer, pdf_file, args.dpi, pool)
+                    durations.append(duration * 1000)
+                    first_pages.append(first_page * 1000)
+                    pages += page_count
+            p90 = statistics.quantiles(durations, n=10)[-1] if len(durations) > 1 else durations[0]
+            print(f"{renderer.name:10} {group:10} {statistics.median(durations):8.0f} {p90:8.0f} "
+                  f"{statistics.median(first_pages):13.0f} {sum(durations) / max(pages, 1):8.0f}")
+
+
+if __name__ == "__main__":
+    main()
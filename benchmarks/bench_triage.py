@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Проверка сортировки страниц (page_triage) на синтетических страницах
+make_corpus: страница сертификата каждого варианта (clean, noisy, rotated,
+low-contrast) не должна считаться пустой, чистый лист того же варианта -
+должен. Печатает решения и время проверки, при ошибке выходит с кодом 1.
+
+    python benchmarks/bench_triage.py [--pages 5] [--font FONT.ttf]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+import _common  # noqa: F401 - путь к модулям репозитория
+from make_corpus import VARIANTS, certificate_lines, degrade, draw_page, find_font
+from page_triage import triage_page
+
+
+def variant_pages(variant, rng, font_path):
+    """(страница сертификата, чистый лист) варианта, как их рисует make_corpus"""
+    colors = {'foreground': 140, 'background': 200} if variant == "low-contrast" else {}
+    page = draw_page(certificate_lines(rng), font_path, **colors)
+    blank = np.full_like(page, colors.get('background', 255))
+    return degrade(page, variant, rng), degrade(blank, variant, rng)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка сортировки страниц перед OCR")
+    parser.add_argument("--pages", type=int, default=5, help="сколько страниц каждого варианта")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--font", help="путь к TTF шрифту с кириллицей")
+    args = parser.parse_args()
+
+    font_path = find_font(args.font)
+    rng = random.Random(args.seed)
+    errors = []
+
+    print(f"{'Вариант':<14} {'текст':>7} {'пустые':>7} {'мс/стр':>8} {'порог':>6}")
+    for variant in VARIANTS:
+        recognized = blanks = 0
+        seconds = 0.0
+        contrasts = []
+        for index in range(args.pages):
+            page, blank = variant_pages(variant, rng, font_path)
+            start_time = time.perf_counter()
+            page_entry = triage_page(page)
+            blank_entry = triage_page(blank)
+            seconds += time.perf_counter() - start_time
+            contrasts.append(page_entry['contrast'])
+
+            if page_entry['decision'] == 'blank':
+                errors.append(f"{variant} #{index + 1}: сертификат считается пустым ({page_entry})")
+            else:
+                recognized += 1
+            if blank_entry['decision'] == 'blank':
+                blanks += 1
+            else:
+                errors.append(f"{variant} #{index + 1}: чистый лист не считается пустым ({blank_entry})")
+
+        print(f"{variant:<14} {recognized:>5}/{args.pages} {blanks:>5}/{args.pages} "
+              f"{seconds / (2 * args.pages) * 1000:>8.2f} {min(contrasts):>6}")
+
+    if errors:
+        for error in errors:
+            print(f"[ERROR] {error}")
+        sys.exit(1)
+    print("[OK] Все страницы отсортированы верно")
+
+
+if __name__ == "__main__":
+    main()
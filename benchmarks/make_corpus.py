@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Генератор синтетических сертификатов для сквозного бенчмарка.
+Каждый сертификат - растровый PDF (как скан) в одном из вариантов:
+clean, noisy, rotated, low-contrast. Рядом сохраняется truth.json с полями,
+которые извлекаются из исходного текста сертификата.
+
+    python benchmarks/make_corpus.py --output benchmarks/corpus --count 40
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import _common  # noqa: F401 - путь к модулям репозитория
+import field_extraction
+
+VARIANTS = ("clean", "noisy", "rotated", "low-contrast")
+
+DPI = 200
+A4_WIDTH, A4_HEIGHT = int(8.27 * DPI), int(11.69 * DPI)
+
+FONT_CANDIDATES = (
+    "C:/Windows/Fonts/times.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSerif.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSerif-Regular.ttf",
+    "/Library/Fonts/Arial.ttf",
+)
+
+SURNAMES = ["Иванову", "Петрову", "Смирнову", "Кузнецову", "Соколову", "Попову", "Лебедеву", "Новикову"]
+FIRST_NAMES = ["Ивану", "Сергею", "Алексею", "Дмитрию", "Андрею", "Михаилу", "Николаю", "Павлу"]
+PATRONYMICS = ["Ивановичу", "Сергеевичу", "Алексеевичу", "Петровичу", "Николаевичу", "Андреевичу"]
+
+PROGRAMS = [
+    "Государственные и муниципальные закупки: теория и практика",
+    "О контрактной системе в сфере закупок",
+    "Управление государственными и муниципальными закупками",
+    "Охрана труда для руководителей и специалистов организаций",
+    "Пожарно-технический минимум для руководителей",
+]
+
+HOURS = [16, 36, 40, 72, 108, 144, 256]
+SERIES = ["УПК", "ПК", "АНО", "ДПО"]
+
+
+def find_font(path=None):
+    """Шрифт с кириллицей: заданный или первый найденный из известных"""
+    for candidate in ([path] if path else []) + list(FONT_CANDIDATES):
+        if candidate and Path(candidate).exists():
+            return candidate
+    raise FileNotFoundError("Не найден шрифт с кириллицей, укажите его через --font")
+
+
+def certificate_lines(rng):
+    """Строки сертификата (центрированные абзацы)"""
+    fio = f"{rng.choice(SURNAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(PATRONYMICS)}"
+    number = f"{rng.randint(10, 99)} {rng.choice(SERIES)} {rng.randint(100000, 999999)}"
+    date = f"{rng.randint(1, 28):02}.{rng.randint(1, 12):02}.{rng.randint(2019, 2025)}"
+    return [
+        ("УДОСТОВЕРЕНИЕ", 1.6),
+        ("о повышении квалификации", 1.0),
+        (number, 1.0),
+        ("", 1.0),
+        ("Настоящее удостоверение выдано", 1.0),
+        (fio, 1.3),
+        ("в том, что он(а) прошел(а) обучение", 1.0),
+        ("по программе", 1.0),
+        (f"«{rng.choice(PROGRAMS)}»", 1.1),
+        (f"в объеме {rng.choice(HOURS)} часов", 1.0),
+        ("", 1.0),
+        (f"Дата выдачи {date}", 1.0),
+    ]
+
+
+def draw_page(lines, font_path, foreground=0, background=255):
+    """Рисует страницу сертификата (серое изображение)"""
+    image = Image.new("L", (A4_WIDTH, A4_HEIGHT), background)
+    draw = ImageDraw.Draw(image)
+    base_size = DPI // 5
+    y = A4_HEIGHT // 6
+
+    for text, scale in lines:
+        font = ImageFont.truetype(font_path, int(base_size * scale))
+        # Длинные строки переносим по словам
+        words, line = text.split(), ""
+        wrapped = []
+        for word in words:
+            candidate = f"{line} {word}".strip()
+            if draw.textlength(candidate, font=font) > A4_WIDTH * 0.8 and line:
+                wrapped.append(line)
+                line = word
+            else:
+                line = candidate
+        wrapped.append(line)
+
+        for part in wrapped:
+            width = draw.textlength(part, font=font)
+            draw.text(((A4_WIDTH - width) / 2, y), part, fill=foreground, font=font)
+            y += int(base_size * scale * 1.6)
+
+    return np.array(image)
+
+
+def degrade(page, variant, rng):
+    """Искажения скана для варианта"""
+    if variant == "noisy":
+        page = cv2.GaussianBlur(page, (3, 3), 0)
+        noise = np.random.default_rng(rng.randint(0, 2**31)).normal(0, 25, page.shape)
+        page = np.clip(page.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+        # Точки грязи
+        mask = np.random.default_rng(rng.randint(0, 2**31)).random(page.shape) < 0.002
+        page[mask] = 0
+    elif variant == "rotated":
+        angle = rng.uniform(-4, 4)
+        height, width = page.shape
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        page = cv2.warpAffine(page, matrix, (width, height), borderValue=255)
+    return page
+
+
+def make_certificate(path, rng, variant, font_path):
+    """Создает PDF и возвращает поля, извлекаемые из его исходного текста"""
+    lines = certificate_lines(rng)
+    if variant == "low-contrast":
+        page = draw_page(lines, font_path, foreground=140, background=200)
+    else:
+        page = draw_page(lines, font_path)
+    page = degrade(page, variant, rng)
+
+    Image.fromarray(page).save(path, "PDF", resolution=DPI)
+
+    # Эталон - то, что дает извлечение полей из безошибочного текста
+    return field_extraction.extract_fields(" ".join(text for text, _ in lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генератор синтетических сертификатов")
+    parser.add_argument("--output", default=str(Path(__file__).parent / "corpus"), help="папка корпуса")
+    parser.add_argument("--count", type=int, default=40, help="сколько сертификатов (поровну по вариантам)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--font", help="путь к TTF шрифту с кириллицей")
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    font_path = find_font(args.font)
+    rng = random.Random(args.seed)
+
+    truth = {}
+    for index in range(args.count):
+        variant = VARIANTS[index % len(VARIANTS)]
+        name = f"cert_{index + 1:04}_{variant}.pdf"
+        fields = make_certificate(output / name, rng, variant, font_path)
+        if not fields['fio'] or not fields['program_name']:
+            print(f"[WARNING]  {name}: поля не извлекаются даже из исходного текста")
+        truth[name] = dict(fields, variant=variant)
+
+    with open(output / "truth.json", 'w', encoding='utf-8') as f:
+        json.dump(truth, f, ensure_ascii=False, indent=2)
+    print(f"[OK] Создано {args.count} сертификатов в {output} (шрифт {font_path})")
+
+
+if __name__ == "__main__":
+    main()
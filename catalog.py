@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Каталог разложенных файлов (debug/table.csv), который пишется по мере обработки:
+строка добавляется, как только файл разложен, и каждые flush_rows строк
+сбрасывается на диск. После сбоя в таблице остается все, что успело сброситься,
+а --resume дописывает ее из журнала. Файлы каталога создаются (и прежние
+перезаписываются) только с первой строкой: запуск без строк оставляет прежний каталог.
+
+Кроме CSV каталог можно вести в SQLite (debug/table.sqlite, сохраняется транзакциями)
+и в Parquet (debug/table.parquet, нужен pyarrow; файл становится читаемым только
+после закрытия - при сбое источником остаются CSV и журнал).
+"""
+
+import csv
+import os
+import sqlite3
+from pathlib import Path
+
+COLUMNS = ("ФИО", "Название", "Номер", "Дата", "Часы", "Путь к файлу", "Причина")
+FORMATS = ("csv", "sqlite", "parquet")
+DEFAULT_FLUSH_ROWS = 20
+
+
+class _CsvSink:
+    def __init__(self, path):
+        self.path = path
+        # utf-8-sig - чтобы Excel открывал кириллицу без вопросов (как раньше)
+        self.file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=COLUMNS, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class _SqliteSink:
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(str(path))
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("DROP TABLE IF EXISTS catalog")
+        self.connection.execute("CREATE TABLE catalog (" + ", ".join(f'"{column}" TEXT' for column in COLUMNS) + ")")
+        self.connection.commit()
+
+    def write(self, rows):
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        with self.connection:
+            self.connection.executemany(f"INSERT INTO catalog VALUES ({placeholders})",
+                                        [tuple(row.get(column) for column in COLUMNS) for row in rows])
+
+    def close(self):
+        self.connection.close()
+
+
+class _ParquetSink:
+    def __init__(self, path):
+        import pyarrow
+        import pyarrow.parquet
+        self.path = path
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([(column, pyarrow.string()) for column in COLUMNS])
+        self.writer = pyarrow.parquet.ParquetWriter(str(path), self.schema)
+
+    def write(self, rows):
+        # Каждый сброс - отдельная группа строк
+        columns = {column: [None if row.get(column) is None else str(row.get(column)) for row in rows]
+                   for column in COLUMNS}
+        self.writer.write_table(self.pyarrow.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+SINKS = {
+    "csv": (_CsvSink, ".csv"),
+    "sqlite": (_SqliteSink, ".sqlite"),
+    "parquet": (_ParquetSink, ".parquet"),
+}
+
+
+class CatalogWriter:
+    """Пишет строки каталога в выбранные форматы пачками по flush_rows"""
+
+    def __init__(self, base_path, formats=("csv",), flush_rows=DEFAULT_FLUSH_ROWS):
+        self.base_path = Path(base_path)
+        self.flush_rows = max(1, flush_rows)
+        self.pending = []
+        self.rows = 0
+        for name in formats:
+            if name not in SINKS:
+                raise ValueError(f"Неизвестный формат каталога {name!r}, допустимы: {', '.join(FORMATS)}")
+        self.formats = tuple(formats)
+        # Открываются при первом сбросе строк
+        self.sinks = None
+
+    def open_sinks(self):
+        self.sinks = []
+        for name in self.formats:
+            sink_class, suffix = SINKS[name]
+            try:
+                self.sinks.append(sink_class(self.base_path.with_suffix(suffix)))
+            except ImportError as e:
+                print(f"[WARNING]  Каталог {name} не ведется: {e}")
+
+    @property
+    def paths(self):
+        return [sink.path for sink in self.sinks or []]
+
+    def write(self, row):
+        """Добавляет строку; на диск она попадет не позже чем через flush_rows строк"""
+        self.pending.append(row)
+        self.rows += 1
+        if len(self.pending) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        """Сбрасывает накопленные строки во все форматы"""
+        if not self.pending:
+            return
+        if self.sinks is None:
+            self.open_sinks()
+        for sink in self.sinks:
+            sink.write(self.pending)
+        self.pending = []
+
+    def close(self):
+        """Сбрасывает остаток и закрывает файлы"""
+        try:
+            self.flush()
+        finally:
+            for sink in self.sinks or []:
+                sink.close()
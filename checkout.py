@@ -11,14 +11,15 @@ def test_imports():
     print("=" * 40)
     
     tests = [
-        ("pandas", "import pandas as pd"),
         ("numpy", "import numpy as np"),
         ("opencv-python", "import cv2"),
         ("Pillow", "from PIL import Image"),
         ("requests", "import requests"),
         ("easyocr", "import easyocr"),
         ("pdf2image", "from pdf2image import convert_from_path"),
+        ("pypdfium2", "import pypdfium2"),
         ("torch", "import torch"),
+        ("psutil", "import psutil"),
         ("pathlib", "from pathlib import Path"),
         ("re", "import re"),
         ("json", "import json"),
@@ -109,6 +110,20 @@ def test_easyocr():
     print("\n  ТЕСТ EASYOCR")
     print("=" * 40)
     
+    # Запущенная служба OCR уже держит загруженную модель - проверяем через нее
+    try:
+        from ocr_service import OCRServiceClient
+        import numpy as np
+        client = OCRServiceClient.connect()
+        if client:
+            status = client.ping()
+            client.readtext(np.full((64, 256), 255, dtype=np.uint8), detail=0)
+            client.close()
+            print(f" Служба OCR отвечает: {status['engine']}, Reader: {status['readers']}")
+            return True
+    except Exception as e:
+        print(f" Служба OCR не отвечает: {e}")
+    
     try:
         import easyocr
         print(" EasyOCR импортируется")
@@ -147,7 +162,8 @@ def main():
     test_gpu()
     
     # Тест EasyOCR 
-    print("\n  Следующий тест может занять несколько минут при первом запуске...")
+    print("\n  Следующий тест может занять несколько минут при первом запуске")
+    print("  (если служба OCR не запущена: python ocr_service.py serve)...")
     input("Нажмите Enter для продолжения или Ctrl+C для выхода...")
     test_easyocr()
     
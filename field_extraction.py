@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Извлечение полей сертификата из распознанного текста.
+Все регулярные выражения компилируются один раз при импорте. Шаблоны с ленивым
+.*? начинают поиск с первого ключевого слова ("выдано", "программе", "объеме")
+и пропускаются, если после него нет завершающего слова - иначе на длинном
+зашумленном тексте они просматривают его до конца от каждой позиции.
+Результат совпадает с прежними методами CertificateProcessorBalanced.
+"""
+
+import re
+from collections import Counter
+
+FIELDS = ('fio', 'program_name', 'cert_number', 'cert_date', 'hours')
+
+
+class AnchoredPattern:
+    """
+    Регулярное выражение с ключевым словом, с которого обязано начинаться совпадение,
+    и словом, которое обязано встретиться после него.
+    Поиск начинается с первого вхождения ключевого слова, а без завершающего слова
+    не выполняется вовсе - результат тот же, что у re.search по всему тексту.
+    """
+
+    def __init__(self, pattern, anchor=None, terminator=None, flags=0):
+        self.regex = re.compile(pattern, flags)
+        self.anchor = re.compile(anchor, flags) if anchor else None
+        self.terminator = re.compile(terminator, flags) if terminator else None
+
+    def start(self, text):
+        """Позиция, раньше которой совпадение начаться не может; None - совпадения нет"""
+        start = end = 0
+        if self.anchor:
+            anchor = self.anchor.search(text)
+            if anchor is None:
+                return None
+            start, end = anchor.start(), anchor.end()
+        if self.terminator and self.terminator.search(text, end) is None:
+            return None
+        return start
+
+    def search(self, text):
+        start = self.start(text)
+        return None if start is None else self.regex.search(text, start)
+
+    def findall(self, text):
+        start = self.start(text)
+        return [] if start is None else self.regex.findall(text, start)
+
+
+# --- ФИО ---
+
+FIO_CLEAN_CHARS = re.compile(r'[^\w\sа-яёА-ЯЁ]')
+SPACES = re.compile(r'\s+')
+
+FIO_PATTERNS = [
+    AnchoredPattern(r"Настоящее удостоверение выдано\s+(.*?)\s+в\s+том",
+                    "Настоящее удостоверение выдано", r"\s+в\s+том", re.IGNORECASE | re.DOTALL),
+    AnchoredPattern(r"удостоверение выдано\s+(.*?)\s+в\s+том",
+                    "удостоверение выдано", r"\s+в\s+том", re.IGNORECASE | re.DOTALL),
+    AnchoredPattern(r"выдано\s+(.*?)\s+в\s+том\s+что",
+                    "выдано", r"\s+в\s+том\s+что", re.IGNORECASE | re.DOTALL),
+    AnchoredPattern(r"выдано\s+([А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+)",
+                    "выдано", None, re.IGNORECASE | re.DOTALL),
+]
+
+# Русские ФИО в дательном падеже без ключевых слов
+FIO_DATIVE = re.compile(r'([А-ЯЁ][а-яё]+(?:ой|ей|ому|ему|ной|ному|ской|ский)\s+[А-ЯЁ][а-яё]+(?:е|у|ь)?\s+[А-ЯЁ][а-яё]+(?:ичу|овичу|евичу|ичем|овичем|евичем|овне|евне|ичне))')
+
+
+def validate_fio(fio):
+    """Проверяет, похож ли текст на ФИО"""
+    words = fio.split()
+    if len(words) < 2 or len(words) > 4:
+        return False
+
+    # Проверяем, что все слова начинаются с заглавной буквы
+    for word in words:
+        if not word or not word[0].isupper() or len(word) < 2:
+            return False
+
+    return True
+
+
+def normalize_fio(fio_raw):
+    """Очищает ФИО (без изменения падежа): первая буква слова заглавная, остальные строчные"""
+    return ' '.join(word[0].upper() + word[1:].lower() for word in fio_raw.strip().split() if word)
+
+
+def extract_fio(text):
+    """Извлекает ФИО из текста"""
+    try:
+        cleaned_text = clean_fio_text(text)
+
+        for pattern in FIO_PATTERNS:
+            match = pattern.search(cleaned_text)
+            if match:
+                fio_raw = match.group(1).strip()
+                # Проверяем, что это похоже на ФИО (3 слова, начинающиеся с заглавной)
+                if validate_fio(fio_raw):
+                    return normalize_fio(fio_raw)
+
+        # Дополнительный поиск по паттернам русских имен
+        match = FIO_DATIVE.search(text)
+        if match:
+            fio_raw = match.group(1).strip()
+            if validate_fio(fio_raw):
+                return normalize_fio(fio_raw)
+
+        return None
+    except Exception as e:
+        print(f"Ошибка при извлечении ФИО: {e}")
+        return None
+
+
+def clean_fio_text(text):
+    """Текст без знаков препинания и с одиночными пробелами"""
+    return SPACES.sub(' ', FIO_CLEAN_CHARS.sub(' ', text))
+
+
+# --- Программа обучения ---
+
+PROGRAM_CLEAN_CHARS = re.compile(r'[^\w\sа-яёА-ЯЁ\-\(\)\.\,\:\"«»]')
+
+_PROGRAM_FLAGS = re.IGNORECASE | re.DOTALL
+PROGRAM_PATTERNS = [
+    AnchoredPattern(r'по программе\s*["“«]?\s*(.*?)\s*["”»]?\s*в\s*объеме',
+                    'по программе', r'в\s*объеме', _PROGRAM_FLAGS),
+    AnchoredPattern(r'по программе\s*["“«]?\s*(.*?)\s*["”»]?\s*\d+\s*час',
+                    'по программе', r'\d+\s*час', _PROGRAM_FLAGS),
+    AnchoredPattern(r'по программе\s*["“«]?\s*(.*?)\s*["”»]?\s*№',
+                    'по программе', '№', _PROGRAM_FLAGS),
+    AnchoredPattern(r'программе\s*["“«]?\s*(.*?)\s*["”»]?\s*в\s*объ[её]ме',
+                    'программе', r'в\s*объ[её]ме', _PROGRAM_FLAGS),
+    AnchoredPattern(r'программе\s*["“«]?\s*(.*?)\s*["”»]?\s*\d+\s*час',
+                    'программе', r'\d+\s*час', _PROGRAM_FLAGS),
+]
+
+# Стандартные названия программ без учета "по программе"
+STANDARD_PROGRAMS = [
+    AnchoredPattern(r'(Государственн[ыые]+\s+и\s+муниципальн[ыые]+\s+закупки.*?(?:теория\s+и\s+практика|практика))',
+                    'Государственн', 'практика', _PROGRAM_FLAGS),
+    AnchoredPattern(r'([Оо0]\s*контрактной\s+системе\s+в\s+сфере\s+закупок)', None, 'закупок', _PROGRAM_FLAGS),
+    AnchoredPattern(r'(44.*?ФЗ.*?закуп)', '44', 'закуп', _PROGRAM_FLAGS),
+    AnchoredPattern(r'(контрактн[оая]+\s+систем[ае]\s+в\s+сфере\s+закупок)', 'контрактн', 'закупок', _PROGRAM_FLAGS),
+]
+
+# Дополнительный поиск для искаженного текста
+FALLBACK_PROGRAMS = [
+    AnchoredPattern(r'(Государствен[а-яшые]*\s+и\s+муниципальн[а-яшые]*\s+закупки[^"]*(?:теория|практика)?)',
+                    'Государствен', 'закупки', re.IGNORECASE),
+    AnchoredPattern(r'([Оо0]\s*контрактн[а-я]*\s+систем[а-я]*\s+в\s+сфере\s+закупок[а-я]*)',
+                    None, 'закупок', re.IGNORECASE),
+    AnchoredPattern(r'(Государств[а-яшые]*\s+[ия]*\s*муници[а-яшые]*\s+закуп[а-яки]*)',
+                    'Государств', 'закуп', re.IGNORECASE),
+    AnchoredPattern(r'(44[^"]*ФЗ[^"]*закуп[а-яки]*)', '44', 'закуп', re.IGNORECASE),
+]
+
+PROGRAM_QUOTES = re.compile(r'["“”«»()"]')
+LEADING_JUNK = re.compile(r'^[^\w]*')
+TRAILING_JUNK = re.compile(r'[\*\#\{\}\[\]\$\%\@\!\+\=\<\>]+.*$')
+REPEATED_CHARS = re.compile(r'(.)\1{3,}')
+
+# "в объёме", "в объеме" (и искажения) и цифры после них
+PROGRAM_TAILS = [re.compile(pattern) for pattern in (
+    r'\s*[вВ]\s*объ[её]ме.*$',
+    r'\s*[вВ]\s*обь[её]ме.*$',
+    r'\s*объ[её]мс.*$',
+    r'\s*объ[её]не.*$',
+    r'\s*оь[её]ме.*$',
+    r'\s*\d+\s*час.*$',
+    r'\s*\d+\s*₽.*$',
+)]
+
+# Искаженные символы и слова
+PROGRAM_REPLACEMENTS = [(re.compile(pattern, re.IGNORECASE), replacement) for pattern, replacement in (
+    ('0', 'О'),
+    ('Государствен[а-яшы]*', 'Государственные'),
+    ('Государств[а-яшы]*', 'Государственные'),
+    ('муниципальн[а-яшы]*', 'муниципальные'),
+    ('муници[а-яшы]*', 'муниципальные'),
+    ('контрактн[а-я]*', 'контрактной'),
+    ('коптрактн[а-я]*', 'контрактной'),
+    ('систем[а-я]*', 'системе'),
+    ('закупок[ъэ]', 'закупок'),
+    ('закуп[а-яки]*', 'закупки'),
+    ('44[^"]*ФЗ', '44-ФЗ'),
+)]
+
+CYRILLIC_LETTER = re.compile(r'[а-яёА-ЯЁ]')
+
+
+def clean_program_name(name):
+    """Очищает название программы"""
+    if not name:
+        return ""
+
+    # Убираем кавычки и лишние символы
+    name = PROGRAM_QUOTES.sub('', name)
+    name = SPACES.sub(' ', name)
+    name = name.strip()
+
+    # Убираем мусорные символы в конце и начале
+    name = LEADING_JUNK.sub('', name)
+    name = TRAILING_JUNK.sub('', name)
+
+    # Убираем повторяющиеся символы (более 3 подряд)
+    name = REPEATED_CHARS.sub(r'\1', name)
+
+    for tail in PROGRAM_TAILS:
+        name = tail.sub('', name)
+
+    for pattern, replacement in PROGRAM_REPLACEMENTS:
+        name = pattern.sub(replacement, name)
+
+    # Нормализуем пробелы
+    name = SPACES.sub(' ', name)
+
+    return name.strip()
+
+
+def validate_program_name(name):
+    """Проверяет разумность названия программы: больше 70% кириллицы"""
+    if not name:
+        return False
+    return len(CYRILLIC_LETTER.findall(name)) / len(name) > 0.7
+
+
+def extract_program_name(text):
+    """Извлекает название программы"""
+    try:
+        cleaned_text = clean_program_text(text)
+
+        for pattern in PROGRAM_PATTERNS:
+            match = pattern.search(cleaned_text)
+            if match:
+                program_name = clean_program_name(match.group(1).strip())
+                # Проверяем минимальную длину и разумность
+                if len(program_name) > 10 and validate_program_name(program_name):
+                    return program_name
+
+        for pattern in STANDARD_PROGRAMS:
+            match = pattern.search(text)
+            if match:
+                program_name = clean_program_name(match.group(1))
+                if len(program_name) > 10:
+                    return program_name
+
+        for pattern in FALLBACK_PROGRAMS:
+            match = pattern.search(text)
+            if match:
+                program_name = clean_program_name(match.group(1))
+                if len(program_name) > 15:
+                    return program_name
+
+        return None
+    except Exception as e:
+        print(f"Ошибка при извлечении названия программы: {e}")
+        return None
+
+
+def clean_program_text(text):
+    """Текст без мусорных символов и с одиночными пробелами"""
+    return SPACES.sub(' ', PROGRAM_CLEAN_CHARS.sub(' ', text))
+
+
+# --- Номер, дата, часы ---
+
+CERT_NUMBER_PATTERNS = [re.compile(pattern) for pattern in (
+    r'(\d{2}\s*[А-ЯЁ]{2,5}\d?\s*\d{6})',
+    r'(\d{2}\s+[А-ЯЁ]+\s*\d+)',
+    r'([А-ЯЁ]{2,5}\s*\d{6,8})',
+)]
+
+DATE_PATTERN = re.compile(r'(\d{1,2}\.\d{1,2}\.\d{4})')
+
+HOURS_PATTERNS = [
+    AnchoredPattern(r'в\s*объ[её]ме\s*(\d+)\s*час', r'в\s*объ[её]ме', 'час', re.IGNORECASE),
+    AnchoredPattern(r'Всего\s*(\d+)', 'Всего', None, re.IGNORECASE),
+    AnchoredPattern(r'(\d+)\s*час[аов]?(?:\s|$)', None, 'час', re.IGNORECASE),
+    AnchoredPattern(r'объёмс\s*(\d+)', 'объёмс', None, re.IGNORECASE),
+    AnchoredPattern(r'объёне\s*(\d+)', 'объёне', None, re.IGNORECASE),
+]
+
+
+def extract_certificate_number(text):
+    """Извлекает номер сертификата: первое совпадение первого подходящего шаблона"""
+    for pattern in CERT_NUMBER_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group(1).strip()
+    return None
+
+
+def extract_date(text):
+    """Извлекает дату (последнюю в тексте)"""
+    matches = DATE_PATTERN.findall(text)
+    return matches[-1] if matches else None
+
+
+def extract_hours(text):
+    """Извлекает количество часов: самое частое значение от 8 до 1000"""
+    found_hours = []
+    for pattern in HOURS_PATTERNS:
+        for match in pattern.findall(text):
+            hours = int(match)
+            if 8 <= hours <= 1000:
+                found_hours.append(hours)
+
+    if found_hours:
+        return str(Counter(found_hours).most_common(1)[0][0])
+    return None
+
+
+def extract_fields(text):
+    """Все поля сертификата: {fio, program_name, cert_number, cert_date, hours}.
+    Каждое поле ищет свой экстрактор, по тексту проходит каждый из них"""
+    return {
+        'fio': extract_fio(text),
+        'program_name': extract_program_name(text),
+        'cert_number': extract_certificate_number(text),
+        'cert_date': extract_date(text),
+        'hours': extract_hours(text),
+    }
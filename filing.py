@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Раскладка файлов в папки сертификатов разными способами:
+copy - полная копия (как раньше), hardlink - жесткая ссылка на тот же файл,
+reflink - клон блоков файловой системы (Btrfs, XFS, APFS), а где его нет -
+copy_file_range (на NFS/SMB копирует сервер), move - перенос без копирования,
+auto - reflink, затем hardlink, затем copy_file_range и copy.
+
+Что поддерживает файловая система, выясняется на первом файле каждой пары
+устройств (откуда, куда) и запоминается. Файл сначала появляется под временным
+именем рядом с целевым и только после проверки получает свое имя.
+Проверка не перечитывает файлы целиком: жесткая ссылка - тот же inode,
+копия и клон - размер и выборочные блоки.
+"""
+
+import errno
+import os
+import shutil
+import sys
+from collections import Counter
+from pathlib import Path
+
+STRATEGIES = ("copy", "hardlink", "reflink", "move", "auto")
+DEFAULT_STRATEGY = "copy"
+
+# Порядок попыток для каждой стратегии; copy - всегда последний запасной вариант
+FALLBACKS = {
+    "copy": ("copy",),
+    "hardlink": ("hardlink", "copy"),
+    "reflink": ("reflink", "copy_file_range", "copy"),
+    "move": ("move", "copy"),
+    "auto": ("reflink", "hardlink", "copy_file_range", "copy"),
+}
+
+# Способы, при которых данные файла физически не копируются
+NO_COPY_METHODS = ("hardlink", "reflink", "move")
+
+# Выборочная проверка копии: столько блоков такого размера
+VERIFY_BLOCKS = 8
+VERIFY_BLOCK_SIZE = 64 * 1024
+
+# Linux ioctl FICLONE: клон всего файла (Btrfs, XFS с reflink=1)
+FICLONE = 0x40049409
+
+# Ошибки "так эта файловая система не умеет" - пробуем следующий способ
+UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EACCES, errno.EINVAL, errno.ENOSYS,
+                      errno.EOPNOTSUPP, getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP),
+                      getattr(errno, 'ENOTTY', errno.EINVAL), getattr(errno, 'EMLINK', errno.EINVAL)}
+
+
+class VerificationError(OSError):
+    """Разложенный файл не совпал с исходным"""
+
+
+def _clone(source, target):
+    """Клон блоков файла; OSError, если файловая система не умеет"""
+    if sys.platform == "darwin":
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(source), os.fsencode(target), 0) != 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), str(target))
+        return
+
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(errno.ENOTSUP, "Клонирование файлов не поддерживается", str(target))
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(source, target)
+
+
+def _copy_range(source, target):
+    """Копия через copy_file_range: данные не проходят через процесс, на NFS/SMB копирует сервер"""
+    if not hasattr(os, 'copy_file_range'):
+        raise OSError(errno.ENOTSUP, "copy_file_range не поддерживается", str(target))
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if copied == 0:
+                raise OSError(errno.EIO, "copy_file_range остановился до конца файла", str(target))
+            remaining -= copied
+    shutil.copystat(source, target)
+
+
+def _sample_offsets(size):
+    """Смещения выборочных блоков: начало, конец и равномерно между ними"""
+    if size <= VERIFY_BLOCKS * VERIFY_BLOCK_SIZE:
+        return [0]
+    step = (size - VERIFY_BLOCK_SIZE) // (VERIFY_BLOCKS - 1)
+    return [index * step for index in range(VERIFY_BLOCKS)]
+
+
+def same_sample(source, target, size):
+    """Совпадают ли выборочные блоки (маленький файл сравнивается целиком)"""
+    block_size = size if size <= VERIFY_BLOCKS * VERIFY_BLOCK_SIZE else VERIFY_BLOCK_SIZE
+    with open(source, 'rb') as src, open(target, 'rb') as dst:
+        for offset in _sample_offsets(size):
+            src.seek(offset)
+            dst.seek(offset)
+            if src.read(block_size) != dst.read(block_size):
+                return False
+    return True
+
+
+class Filer:
+    """Раскладывает файлы выбранной стратегией с откатом на более простой способ"""
+
+    def __init__(self, strategy=DEFAULT_STRATEGY):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Неизвестная стратегия раскладки {strategy!r}, допустимы: {', '.join(STRATEGIES)}")
+        self.strategy = strategy
+        # (устройство источника, устройство папки назначения) -> способ, который там работает
+        self.methods = {}
+
+        # Статистика
+        self.counts = Counter()
+        self.bytes_not_copied = 0
+        self.fallbacks = []
+
+    def file(self, source, target):
+        """Помещает source в target (существующий target заменяется); возвращает способ"""
+        source, target = Path(source), Path(target)
+        stat = source.stat()
+        size = stat.st_size
+        devices = (stat.st_dev, target.parent.stat().st_dev)
+
+        candidates = FALLBACKS[self.strategy]
+        if devices in self.methods:
+            candidates = candidates[candidates.index(self.methods[devices]):]
+
+        for method in candidates:
+            try:
+                self.place(method, source, target, size)
+            except OSError as e:
+                if method == "copy" or (e.errno not in UNSUPPORTED_ERRNOS and not isinstance(e, VerificationError)):
+                    raise
+                self.fallbacks.append(f"{method} -> {target.parent}: {e}")
+                continue
+            # Перенос, замененный копией, все равно убирает исходный файл
+            if self.strategy == "move" and method != "move":
+                source.unlink()
+            self.methods[devices] = method
+            self.counts[method] += 1
+            if method in NO_COPY_METHODS:
+                self.bytes_not_copied += size
+            return method
+
+    def place(self, method, source, target, size):
+        """Один способ: временное имя рядом с целью, проверка, затем замена на целевое имя"""
+        if method == "move":
+            # Перенос внутри устройства атомарен и не трогает данные; между устройствами - EXDEV
+            os.replace(source, target)
+            if target.stat().st_size != size:
+                raise VerificationError(errno.EIO, "Размер перенесенного файла изменился", str(target))
+            return
+
+        temporary = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        try:
+            if method == "hardlink":
+                os.link(source, temporary)
+                if not os.path.samefile(source, temporary):
+                    raise VerificationError(errno.EIO, "Жесткая ссылка указывает на другой файл", str(target))
+            else:
+                if method == "reflink":
+                    _clone(source, temporary)
+                elif method == "copy_file_range":
+                    _copy_range(source, temporary)
+                else:
+                    shutil.copy2(source, temporary)
+                if temporary.stat().st_size != size or not same_sample(source, temporary, size):
+                    raise VerificationError(errno.EIO, "Копия не совпадает с исходным файлом", str(target))
+            os.replace(temporary, target)
+        finally:
+            if temporary.exists():
+                temporary.unlink()
+
+    def summary(self):
+        """Строка статистики для итогов"""
+        if not self.counts:
+            return None
+        methods = ", ".join(f"{method} {count}" for method, count in self.counts.most_common())
+        return (f"Раскладка ({self.strategy}): {methods}; "
+                f"без копирования данных {self.bytes_not_copied / 1024 / 1024:.0f} МБ")
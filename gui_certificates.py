@@ -35,6 +35,8 @@ class CertificateProcessorGUI:
         self.scripts = {
             '1': {
                 'name': '1.new2.py',
+                # С галочкой "Бюджет времени на файл": зависший PDF не останавливает всю обработку
+                'timeout_args': ['--file-timeout', '600'],
                 'title': 'Обработка PDF сертификатов',
                 'description': 'Извлекает ФИО и программы из PDF файлов\nСортирует по папкам с помощью OCR',
                 'icon': '📄',
@@ -172,6 +174,13 @@ class CertificateProcessorGUI:
                                         variable=self.auto_scroll_var)
         auto_scroll_cb.pack(anchor=tk.W)
         
+        # Файлы распознают процессы под надзором; модель загружается в каждом процессе заново
+        self.file_timeout_var = tk.BooleanVar(value=False)
+        file_timeout_cb = ttk.Checkbutton(settings_frame,
+                                         text="Бюджет времени на файл (10 мин)",
+                                         variable=self.file_timeout_var)
+        file_timeout_cb.pack(anchor=tk.W)
+        
         # Кнопки управления процессом
         control_frame = ttk.LabelFrame(left_frame, text="Управление процессом", padding="5")
         control_frame.pack(fill=tk.X)
@@ -319,7 +328,7 @@ class CertificateProcessorGUI:
                 
                 # Проверка библиотек
                 self.log_message("Проверка библиотек...")
-                required_libs = ['pandas', 'easyocr', 'pdf2image', 'cv2', 'numpy']
+                required_libs = ['easyocr', 'pdf2image', 'cv2', 'numpy']
                 for lib in required_libs:
                     try:
                         if lib == 'cv2':
@@ -376,9 +385,14 @@ class CertificateProcessorGUI:
         self.log_message(f"📄 Скрипт: {script_name}", "info")
         self.log_message("=" * 60)
         
+        script_args = []
+        if self.file_timeout_var.get():
+            script_args = next((info.get('timeout_args', []) for info in self.scripts.values()
+                                if info['name'] == script_name), [])
+        
         try:
             self.current_process = subprocess.Popen(
-                [sys.executable, str(script_path)],
+                [sys.executable, str(script_path), *script_args],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
                 text=True,
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Журнал обработки (debug/journal.jsonl): по строке JSON на каждый разложенный файл,
+дописывается сразу после копирования и сбрасывается на диск.
+После сбоя запуск с --resume пропускает файлы из журнала и восстанавливает
+table.csv из сохраненных строк.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+# Статусы файлов, которые при возобновлении повторно не обрабатываются
+# (timeout - файл не уложился в бюджет времени и уже лежит в Неопознанных)
+DONE_STATUSES = ("ok", "unknown", "timeout")
+
+
+def input_key(pdf_path):
+    """Ключ входного файла: имя и размер (замененный файл с тем же именем обработается заново)"""
+    return f"{Path(pdf_path).name}|{Path(pdf_path).stat().st_size}"
+
+
+class ProcessingJournal:
+    """Дописываемый журнал результатов с чтением, устойчивым к оборванной последней строке"""
+
+    def __init__(self, path, resume=False):
+        self.path = Path(path)
+        self.records = self.load() if resume else []
+        # Новый запуск без --resume начинает журнал заново
+        self.file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        # Оборванная строка не должна склеиться со следующей записью
+        if resume and self.file.tell() > 0 and not self.path.read_bytes().endswith(b"\n"):
+            self.file.write("\n")
+
+    def load(self):
+        """Записи журнала; оборванная при сбое строка пропускается"""
+        records = []
+        if not self.path.exists():
+            return records
+        with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records
+
+    def done(self):
+        """Записи завершенных файлов по ключу входного файла (последняя запись побеждает)"""
+        return {record['key']: record for record in self.records if record['status'] in DONE_STATUSES}
+
+    def append(self, pdf_path, status, row, key=None):
+        """Записывает результат файла и сбрасывает его на диск
+        (key - если файл уже перенесен и его размер не узнать)"""
+        record = {
+            'key': key or input_key(pdf_path),
+            'file': Path(pdf_path).name,
+            'status': status,
+            'row': row,
+            'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.records.append(record)
+
+    def close(self):
+        """Закрывает файл журнала"""
+        self.file.close()
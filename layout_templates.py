@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Обучаемые шаблоны расположения полей на сертификатах.
+Шаблон узнается по хэшу уменьшенной страницы, а хранит горизонтальные полосы,
+в которых находились ФИО, программа, номер, дата и часы. Для знакомого шаблона
+распознаются только эти полосы, а не вся страница.
+"""
+
+import json
+import re
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# dHash 16x16 = 256 бит
+HASH_SIZE = 16
+# Максимальное расстояние Хэмминга, при котором страница считается тем же шаблоном
+MAX_HASH_DISTANCE = 24
+# Запас вокруг полосы поля (доля высоты страницы)
+BAND_PADDING = 0.015
+# Шаблон перестает использоваться, если чаще ошибается, чем угадывает
+MIN_TRIES_TO_JUDGE = 4
+
+# Ключевые слова рядом с полями: без них регулярные выражения не найдут значение
+FIELD_ANCHORS = {
+    'fio': ('настоящее', 'удостоверение', 'выдано', 'том'),
+    'program_name': ('программе', 'программа'),
+    'hours': ('объеме', 'объёме', 'час', 'часа', 'часов'),
+    'cert_number': (),
+    'cert_date': (),
+}
+
+
+def page_fingerprint(image):
+    """dHash уменьшенной страницы (hex строка)"""
+    if len(image.shape) == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return '%0*x' % (HASH_SIZE * HASH_SIZE // 4, int(''.join('1' if bit else '0' for bit in bits), 2))
+
+
+def hash_distance(a, b):
+    """Расстояние Хэмминга между двумя хэшами"""
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def words_of(text):
+    """Слова текста в нижнем регистре"""
+    return re.findall(r'[\wа-яё]+', text.lower())
+
+
+class LayoutTemplates:
+    """Хранилище шаблонов в JSON файле"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.templates = []
+        self.changed = False
+        self.load()
+
+    def load(self):
+        """Загружает шаблоны"""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.templates = json.load(f)
+        except (OSError, ValueError):
+            self.templates = []
+
+    def save(self):
+        """Сохраняет шаблоны, если что-то изменилось"""
+        if not self.changed:
+            return
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.templates, f, ensure_ascii=False, indent=2)
+        self.changed = False
+
+    def find(self, fingerprint):
+        """Ближайший шаблон по хэшу или None"""
+        best, best_distance = None, MAX_HASH_DISTANCE + 1
+        for template in self.templates:
+            distance = hash_distance(template['fingerprint'], fingerprint)
+            if distance < best_distance:
+                best, best_distance = template, distance
+        return best
+
+    def match(self, fingerprint):
+        """Шаблон, которому можно доверить распознавание по полосам"""
+        template = self.find(fingerprint)
+        if template is None:
+            return None
+
+        tries = template['hits'] + template['misses']
+        if tries >= MIN_TRIES_TO_JUDGE and template['misses'] > template['hits']:
+            return None
+        return template
+
+    def apply_event(self, event):
+        """Применяет событие обучения: learn / hit / miss"""
+        template = self.find(event['fingerprint'])
+
+        if event['type'] == 'learn':
+            if template is None:
+                template = {
+                    'id': f"t{len(self.templates) + 1}",
+                    'fingerprint': event['fingerprint'],
+                    'fields': {},
+                    'bands': [],
+                    'hits': 0,
+                    'misses': 0,
+                    'learned': 0,
+                }
+                self.templates.append(template)
+
+            # Полосы расширяются объединением с новыми наблюдениями
+            for field, (top, bottom) in event['fields'].items():
+                if field in template['fields']:
+                    old_top, old_bottom = template['fields'][field]
+                    top, bottom = min(top, old_top), max(bottom, old_bottom)
+                template['fields'][field] = [top, bottom]
+            template['bands'] = merge_bands(template['fields'].values())
+            template['learned'] += 1
+
+        elif template is not None:
+            template['hits' if event['type'] == 'hit' else 'misses'] += 1
+
+        self.changed = True
+        return template
+
+
+def merge_bands(bands):
+    """Объединяет пересекающиеся полосы (с запасом) и сортирует сверху вниз"""
+    padded = sorted((max(0.0, top - BAND_PADDING), min(1.0, bottom + BAND_PADDING))
+                    for top, bottom in bands)
+    merged = []
+    for top, bottom in padded:
+        if merged and top <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], bottom)
+        else:
+            merged.append([top, bottom])
+    return merged
+
+
+def learn_field_bands(boxes, image_height, fields):
+    """
+    Находит полосы полей по результату EasyOCR detail=1.
+    boxes - [(bbox, text, confidence)], fields - извлеченные значения полей.
+    Возвращает {поле: [верх, низ]} в долях высоты страницы.
+    """
+    field_words = {}
+    for field, value in fields.items():
+        if not value:
+            continue
+        value_words = {word for word in words_of(value) if len(word) >= 3 or word.isdigit()}
+        field_words[field] = (value_words, set(FIELD_ANCHORS.get(field, ())))
+
+    bands = {}
+    for bbox, text, _ in boxes:
+        box_words = set(words_of(text))
+        ys = [point[1] for point in bbox]
+        top, bottom = min(ys) / image_height, max(ys) / image_height
+
+        for field, (value_words, anchors) in field_words.items():
+            if box_words & value_words or box_words & anchors:
+                if field in bands:
+                    bands[field] = [min(bands[field][0], top), max(bands[field][1], bottom)]
+                else:
+                    bands[field] = [top, bottom]
+
+    # Без ФИО и программы шаблон бесполезен
+    if 'fio' not in bands or 'program_name' not in bands:
+        return {}
+    return bands
+
+
+def crop_band(image, band):
+    """Вырезает полосу страницы по долям высоты"""
+    height = image.shape[0]
+    top, bottom = int(band[0] * height), int(np.ceil(band[1] * height))
+    return image[top:max(bottom, top + 1)]
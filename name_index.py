@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Индекс занятых имен файлов для раскладки без коллизий.
+Каждая папка сканируется один раз; дальше свободное имя (ФИО.pdf, ФИО_1.pdf, ...)
+находится по наибольшему занятому суффиксу основы, без проверки диска в цикле.
+Имя занимается созданием пустого файла с O_EXCL, поэтому параллельные
+процессы не получат одно и то же имя; файл затем заменяется на место заглушки.
+Если процесс убит между выделением имени и раскладкой, заглушка остается;
+при --resume пустые файлы старше запуска считаются такими заглушками и удаляются.
+Ключи сравниваются через os.path.normcase (на Windows регистр не важен).
+"""
+
+import errno
+import os
+import re
+import shutil
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Имя с числовым суффиксом: основа_N.расширение
+SUFFIX_PATTERN = re.compile(r'^(.*)_(\d+)(\.[^.]*)?$')
+
+
+def _key(name):
+    return os.path.normcase(name)
+
+
+def split_name(filename):
+    """(основа, суффикс или 0, расширение) в нормализованном регистре"""
+    filename = _key(filename)
+    match = SUFFIX_PATTERN.match(filename)
+    if match:
+        return match.group(1), int(match.group(2)), match.group(3) or ""
+    stem, ext = os.path.splitext(filename)
+    return stem, 0, ext
+
+
+class _Directory:
+    """Занятые имена одной папки и наибольший суффикс каждой основы"""
+
+    def __init__(self, path, reclaim=None):
+        self.names = set()
+        self.highest = defaultdict(int)
+        self.reclaimed = 0
+        if path.is_dir():
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if reclaim and self.stale_placeholder(entry, *reclaim):
+                        continue
+                    self.add(entry.name)
+
+    def stale_placeholder(self, entry, keep, started):
+        """Удаляет пустой файл, созданный до запуска и не разложенный по журналу; True - удален"""
+        try:
+            stat = entry.stat(follow_symlinks=False)
+            if (not entry.is_file(follow_symlinks=False) or stat.st_size != 0 or stat.st_mtime >= started
+                    or _key(entry.path) in keep):
+                return False
+            os.unlink(entry.path)
+        except OSError:
+            return False
+        self.reclaimed += 1
+        return True
+
+    def add(self, filename):
+        self.names.add(_key(filename))
+        stem, counter, ext = split_name(filename)
+        self.highest[(stem, ext)] = max(self.highest[(stem, ext)], counter)
+
+    def discard(self, filename):
+        # Наибольший суффикс не уменьшаем: освободившийся номер займут только после пересканирования
+        self.names.discard(_key(filename))
+
+
+class NameIndex:
+    """Выдача свободных имен в папках; потокобезопасна"""
+
+    def __init__(self):
+        self.directories = {}
+        self.lock = threading.Lock()
+        # (пути, которые не трогать, время запуска) - после reclaim_placeholders
+        self.reclaim = None
+
+        # Статистика
+        self.scans = 0
+        self.allocations = 0
+        self.races = 0
+        self.reclaimed = 0
+
+    def directory(self, path):
+        key = _key(str(path))
+        if key not in self.directories:
+            self.directories[key] = _Directory(Path(path), self.reclaim)
+            self.scans += 1
+            self.reclaimed += self.directories[key].reclaimed
+        return self.directories[key]
+
+    def reclaim_placeholders(self, keep=()):
+        """Продолжение после сбоя: пустые файлы старше этого вызова, которые найдутся при
+        сканировании папок, - заглушки убитого процесса; они удаляются, и имя снова свободно.
+        keep - файлы, разложенные по журналу (пустой PDF мог быть и настоящим)"""
+        with self.lock:
+            self.reclaim = ({_key(str(path)) for path in keep}, time.time())
+            # Уже просканированные папки - заново, уже с очисткой
+            self.directories.clear()
+
+    def taken(self, directory, filename):
+        """Существующие файлы той же основы: filename, основа_1, основа_2, ..."""
+        directory = Path(directory)
+        stem, ext = os.path.splitext(filename)
+        with self.lock:
+            entry = self.directory(directory)
+            highest = entry.highest[(_key(stem), _key(ext))]
+            names = [filename] + [f"{stem}_{counter}{ext}" for counter in range(1, highest + 1)]
+            return [directory / name for name in names if _key(name) in entry.names]
+
+    def allocate(self, directory, filename, current=None):
+        """Свободное имя в папке, занятое пустым файлом-заглушкой.
+        current - файл, который сам переименовывается: его имя считается свободным"""
+        directory = Path(directory)
+        stem, ext = os.path.splitext(filename)
+        with self.lock:
+            entry = self.directory(directory)
+            candidate = filename
+            counter = entry.highest[(_key(stem), _key(ext))]
+            while True:
+                if current is not None and Path(current).parent == directory and _key(candidate) == _key(Path(current).name):
+                    # Например, смена регистра букв того же файла
+                    self.allocations += 1
+                    return directory / candidate
+                if _key(candidate) not in entry.names:
+                    try:
+                        os.close(os.open(directory / candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                        entry.add(candidate)
+                        self.allocations += 1
+                        return directory / candidate
+                    except FileExistsError:
+                        # Имя занял другой процесс после сканирования
+                        entry.add(candidate)
+                        self.races += 1
+                counter += 1
+                candidate = f"{stem}_{counter}{ext}"
+
+    def release(self, path):
+        """Имя освободилось (файл перенесен или переименован)"""
+        path = Path(path)
+        with self.lock:
+            if _key(str(path.parent)) in self.directories:
+                self.directory(path.parent).discard(path.name)
+
+    def forget(self, directory):
+        """Папка удалена или переименована - при следующем обращении будет пересканирована"""
+        with self.lock:
+            self.directories.pop(_key(str(directory)), None)
+
+    def move(self, source, directory, filename=None):
+        """Переносит файл в папку под свободным именем (по умолчанию - его же имя); возвращает новый путь"""
+        source = Path(source)
+        target = self.allocate(directory, filename or source.name, current=source)
+        if target == source:
+            return target
+        try:
+            try:
+                os.replace(source, target)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                # Другой диск: копия поверх заглушки и удаление исходного
+                shutil.copy2(source, target)
+                source.unlink()
+        except BaseException:
+            # Любой сбой (и прерывание с клавиатуры) - иначе пустая заглушка навсегда займет имя
+            self.discard_placeholder(target)
+            raise
+        if _key(str(source)) != _key(str(target)):
+            self.release(source)
+        return target
+
+    def discard_placeholder(self, path):
+        """Удаляет невостребованную заглушку (файл не удалось положить на ее место)"""
+        path = Path(path)
+        try:
+            if path.stat().st_size == 0:
+                path.unlink()
+        except OSError:
+            pass
+        self.release(path)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Движки OCR с общим интерфейсом: readtext(image, detail) возвращает то же, что
+EasyOCR - [(рамка, текст, уверенность), ...] или [текст, ...] при detail=0.
+
+    easyocr   - нейросеть EasyOCR (как раньше): точнее, но на CPU дорогая
+    tesseract - Tesseract с языком rus (pytesseract): в разы быстрее на чистых сканах
+    tiered    - сначала Tesseract, EasyOCR - только для страниц, где поля не нашлись
+                (на той же ступени dpi, до перехода к следующей)
+
+engine - строка версии движка для ключей кэша OCR: тексты разных движков не смешиваются.
+"""
+
+from abc import ABC, abstractmethod
+
+DEFAULT_MODE = "easyocr"
+
+# Движки по порядку попыток для каждого режима
+MODES = {
+    "easyocr": ("easyocr",),
+    "tesseract": ("tesseract",),
+    "tiered": ("tesseract", "easyocr"),
+}
+
+TESSERACT_LANG = "rus"
+# LSTM и разметка страницы по блокам текста
+TESSERACT_CONFIG = "--oem 1 --psm 3"
+
+
+class BackendUnavailable(Exception):
+    """Движок не установлен или не настроен"""
+
+
+class OCRBackend(ABC):
+    """Движок OCR: name - имя в статистике, engine - версия для ключей кэша"""
+    name = None
+    engine = None
+
+    @abstractmethod
+    def readtext(self, image, detail=1):
+        """[(рамка, текст, уверенность), ...], при detail=0 - [текст, ...]"""
+
+
+class EasyOCRBackend(OCRBackend):
+    """EasyOCR через обработчик: его пакетный распознаватель, служба OCR или свой Reader"""
+    name = "easyocr"
+
+    def __init__(self, processor):
+        self.processor = processor
+
+    @property
+    def engine(self):
+        # Обработчики потоков получают версию движка от родителя уже после создания
+        return self.processor.ocr_engine
+
+    def readtext(self, image, detail=1):
+        return self.processor.readtext(image, detail=detail)
+
+
+class TesseractBackend(OCRBackend):
+    """Tesseract через pytesseract; слова собираются в строки, как у EasyOCR"""
+    name = "tesseract"
+
+    def __init__(self, lang=TESSERACT_LANG, config=TESSERACT_CONFIG):
+        try:
+            import pytesseract
+        except ImportError:
+            raise BackendUnavailable("не установлен pytesseract (pip install pytesseract)")
+        try:
+            version = pytesseract.get_tesseract_version()
+            languages = pytesseract.get_languages(config='')
+        except (OSError, pytesseract.TesseractError) as e:
+            raise BackendUnavailable(f"не найден tesseract: {e}")
+        if lang not in languages:
+            raise BackendUnavailable(f"у tesseract нет языка {lang} (установите tesseract-ocr-{lang})")
+
+        self.pytesseract = pytesseract
+        self.lang = lang
+        self.config = config
+        self.engine = f"tesseract-{version}-{lang}"
+
+    def readtext(self, image, detail=1):
+        data = self.pytesseract.image_to_data(image, lang=self.lang, config=self.config,
+                                              output_type=self.pytesseract.Output.DICT)
+        # (блок, абзац, строка) -> [(x, y, ширина, высота, слово, уверенность)]
+        lines = {}
+        for index, word in enumerate(data['text']):
+            confidence = float(data['conf'][index])
+            if not word.strip() or confidence < 0:
+                continue
+            key = (data['block_num'][index], data['par_num'][index], data['line_num'][index])
+            lines.setdefault(key, []).append((data['left'][index], data['top'][index], data['width'][index],
+                                              data['height'][index], word, confidence))
+
+        results = []
+        for words in lines.values():
+            text = " ".join(word[4] for word in words)
+            if not detail:
+                results.append(text)
+                continue
+            left = min(word[0] for word in words)
+            top = min(word[1] for word in words)
+            right = max(word[0] + word[2] for word in words)
+            bottom = max(word[1] + word[3] for word in words)
+            box = [[left, top], [right, top], [right, bottom], [left, bottom]]
+            results.append((box, text, sum(word[5] for word in words) / len(words) / 100))
+        return results
+
+
+def create_backends(mode, processor):
+    """Движки режима по порядку попыток; недоступный Tesseract заменяется EasyOCR"""
+    if mode not in MODES:
+        raise ValueError(f"Неизвестный режим OCR {mode!r}, допустимы: {', '.join(MODES)}")
+    backends = []
+    for name in MODES[mode]:
+        if name == "easyocr":
+            backends.append(EasyOCRBackend(processor))
+            continue
+        try:
+            backends.append(TesseractBackend())
+        except BackendUnavailable as e:
+            print(f"[WARNING]  Tesseract недоступен ({e}), используется EasyOCR")
+    if not backends:
+        backends.append(EasyOCRBackend(processor))
+    return backends
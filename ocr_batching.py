@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Пакетное распознавание для EasyOCR.
+Детекция выполняется для каждого изображения отдельно, а найденные области текста
+со многих страниц и документов копятся в общей очереди и распознаются большими пачками.
+Пачка отправляется в распознаватель по размеру или по времени ожидания,
+результаты возвращаются тому, кто прислал изображение.
+"""
+
+import threading
+import time
+
+# Внутренние функции EasyOCR импортируются при первой проверке batching_available():
+# импорт easyocr тянет за собой torch, а со службой OCR он не нужен
+get_image_list = reformat_input = get_text = None
+_available = None
+
+# Высота строки, к которой EasyOCR приводит области перед распознаванием
+RECOGNIZER_HEIGHT = 64
+
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_MAX_REGIONS = 256
+DEFAULT_MAX_LATENCY = 0.05
+
+
+def batching_available():
+    """Есть ли в установленной версии EasyOCR функции для пакетного распознавания"""
+    global get_image_list, reformat_input, get_text, RECOGNIZER_HEIGHT, _available
+    if _available is None:
+        try:
+            from easyocr.utils import get_image_list, reformat_input
+            from easyocr.recognition import get_text
+            _available = True
+        except ImportError:
+            _available = False
+        try:
+            from easyocr.config import imgH as RECOGNIZER_HEIGHT
+        except ImportError:
+            pass
+    return _available
+
+
+class _Ticket:
+    """Изображение, ожидающее распознавания своих областей"""
+
+    def __init__(self, image_list):
+        self.image_list = image_list
+        self.created = time.time()
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class BatchingRecognizer:
+    """Общий для всех потоков пакетный распознаватель поверх easyocr.Reader"""
+
+    def __init__(self, reader, batch_size=DEFAULT_BATCH_SIZE, max_regions=DEFAULT_MAX_REGIONS,
+                 max_latency=DEFAULT_MAX_LATENCY, producers=1):
+        if not batching_available():
+            raise RuntimeError("Внутренние функции EasyOCR для пакетного распознавания недоступны")
+
+        self.reader = reader
+        self.batch_size = batch_size
+        self.max_regions = max_regions
+        self.max_latency = max_latency
+        # Сколько потоков одновременно присылают изображения: когда все ждут,
+        # ждать остальных бессмысленно - пачка уходит сразу
+        self.producers = producers
+
+        self.ignore_char = ''.join(set(reader.character) - set(reader.lang_char))
+
+        self.pending = []
+        self.pending_regions = 0
+        self.condition = threading.Condition()
+        self.closed = False
+
+        # Статистика
+        self.batches = 0
+        self.regions = 0
+        self.recognize_time = 0.0
+
+        self.thread = threading.Thread(target=self._run, name="ocr-batcher", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        """Останавливает поток пакетной обработки"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+
+    def readtext(self, image, detail=1, paragraph=False):
+        """Аналог reader.readtext: детекция здесь, распознавание - в общей пачке"""
+        return self.readtext_many([image], detail=detail)[0]
+
+    def readtext_many(self, images, detail=1):
+        """Распознает несколько изображений одной пачкой"""
+        tickets = [self.submit(image) for image in images]
+        results = []
+        for ticket in tickets:
+            ticket.done.wait()
+            if ticket.error is not None:
+                raise ticket.error
+            if detail == 0:
+                results.append([item[1] for item in ticket.result])
+            else:
+                results.append(ticket.result)
+        return results
+
+    def submit(self, image):
+        """Находит области текста и ставит их в очередь распознавания"""
+        img, img_cv_grey = reformat_input(image)
+        horizontal_list, free_list = self.reader.detect(img)
+        horizontal_list, free_list = horizontal_list[0], free_list[0]
+        image_list, _ = get_image_list(horizontal_list, free_list, img_cv_grey,
+                                       model_height=RECOGNIZER_HEIGHT)
+
+        ticket = _Ticket(image_list)
+        if not image_list:
+            ticket.result = []
+            ticket.done.set()
+            return ticket
+
+        with self.condition:
+            self.pending.append(ticket)
+            self.pending_regions += len(image_list)
+            self.condition.notify_all()
+        return ticket
+
+    def _ready(self):
+        """Пора ли отправлять пачку"""
+        if not self.pending:
+            return False
+        if self.closed or self.pending_regions >= self.max_regions:
+            return True
+        if len(self.pending) >= self.producers:
+            return True
+        return time.time() - self.pending[0].created >= self.max_latency
+
+    def _run(self):
+        """Цикл потока: собирает пачки и распознает их"""
+        while True:
+            with self.condition:
+                while not self._ready():
+                    if self.closed and not self.pending:
+                        return
+                    timeout = None
+                    if self.pending:
+                        timeout = max(0.0, self.max_latency - (time.time() - self.pending[0].created))
+                    self.condition.wait(timeout)
+                tickets = self.pending
+                self.pending = []
+                self.pending_regions = 0
+
+            try:
+                self._recognize(tickets)
+            except Exception as e:
+                for ticket in tickets:
+                    ticket.error = e
+            finally:
+                for ticket in tickets:
+                    ticket.done.set()
+
+    def _recognize(self, tickets):
+        """Распознает области всех изображений пачками близкой ширины"""
+        start_time = time.time()
+
+        # (ширина, номер изображения, номер области, область)
+        regions = []
+        for ticket_index, ticket in enumerate(tickets):
+            ticket.result = [None] * len(ticket.image_list)
+            for region_index, item in enumerate(ticket.image_list):
+                # get_image_list уже привел область к высоте RECOGNIZER_HEIGHT
+                regions.append((item[1].shape[1], ticket_index, region_index, item))
+
+        # Сортировка по ширине: в одной пачке меньше пустого поля при выравнивании
+        regions.sort(key=lambda region: region[0])
+
+        for start in range(0, len(regions), self.batch_size):
+            chunk = regions[start:start + self.batch_size]
+            max_width = max(max(width for width, _, _, _ in chunk), RECOGNIZER_HEIGHT)
+            recognized = get_text(self.reader.character, RECOGNIZER_HEIGHT, int(max_width),
+                                  self.reader.recognizer, self.reader.converter,
+                                  [item for _, _, _, item in chunk], self.ignore_char,
+                                  'greedy', 5, len(chunk), 0.1, 0.5, 0.003, 0, self.reader.device)
+            for (_, ticket_index, region_index, _), item in zip(chunk, recognized):
+                tickets[ticket_index].result[region_index] = item
+
+            self.batches += 1
+            self.regions += len(chunk)
+
+        self.recognize_time += time.time() - start_time
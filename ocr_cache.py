@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Кэш результатов OCR на диске (SQLite).
+Ключ - sha256 содержимого PDF, dpi, вариант предобработки, версия OCR движка и номер страницы.
+Повторный запуск после правки регулярных выражений берет текст отсюда, а не распознает заново.
+
+Управление кэшем:
+    python ocr_cache.py stats
+    python ocr_cache.py list
+    python ocr_cache.py show <файл.pdf | имя файла | sha256>
+    python ocr_cache.py evict --max-mb 256
+    python ocr_cache.py purge [<файл.pdf | имя файла | sha256>]
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path("debug") / "ocr_cache.sqlite"
+DEFAULT_MAX_MB = 512
+
+# Итоговый текст документа хранится как "страница" -1 с этим вариантом
+DOCUMENT_TEXT = "final"
+
+# Как часто (в записях) проверять размер кэша
+EVICT_CHECK_EVERY = 100
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Хэш содержимого файла"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """Кэш текста страниц с вытеснением давно не использованных записей (LRU)"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_mb=DEFAULT_MAX_MB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.puts_since_check = 0
+
+        # Несколько процессов-воркеров пишут в один файл: WAL + ожидание блокировки
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                pdf_hash TEXT NOT NULL,
+                dpi INTEGER NOT NULL,
+                variant TEXT NOT NULL,
+                engine TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (pdf_hash, dpi, variant, engine, page)
+            );
+            CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access);
+            CREATE TABLE IF NOT EXISTS documents (
+                pdf_hash TEXT NOT NULL,
+                dpi INTEGER NOT NULL,
+                page_count INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                PRIMARY KEY (pdf_hash, dpi)
+            );
+            CREATE INDEX IF NOT EXISTS documents_name ON documents (name);
+        """)
+
+    def close(self):
+        """Закрывает соединение"""
+        self.conn.close()
+
+    def get_page(self, pdf_hash, dpi, variant, engine, page):
+        """Текст страницы из кэша или None"""
+        row = self.conn.execute(
+            "SELECT text FROM pages WHERE pdf_hash=? AND dpi=? AND variant=? AND engine=? AND page=?",
+            (pdf_hash, dpi, variant, engine, page)).fetchone()
+        if row is None:
+            return None
+
+        self.conn.execute(
+            "UPDATE pages SET last_access=? WHERE pdf_hash=? AND dpi=? AND variant=? AND engine=? AND page=?",
+            (time.time(), pdf_hash, dpi, variant, engine, page))
+        return row[0]
+
+    def put_page(self, pdf_hash, dpi, variant, engine, page, text):
+        """Сохраняет текст страницы"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (pdf_hash, dpi, variant, engine, page, text, len(text.encode('utf-8')), time.time()))
+
+        self.puts_since_check += 1
+        if self.puts_since_check >= EVICT_CHECK_EVERY:
+            self.puts_since_check = 0
+            self.evict()
+
+    def get_document_text(self, pdf_hash, dpi, engine):
+        """Итоговый текст документа"""
+        return self.get_page(pdf_hash, dpi, DOCUMENT_TEXT, engine, -1)
+
+    def put_document_text(self, pdf_hash, dpi, engine, text):
+        """Сохраняет итоговый текст документа (то, что ушло в извлечение полей)"""
+        self.put_page(pdf_hash, dpi, DOCUMENT_TEXT, engine, -1, text)
+
+    def get_page_count(self, pdf_hash, dpi):
+        """Число страниц документа, если он уже встречался"""
+        row = self.conn.execute(
+            "SELECT page_count FROM documents WHERE pdf_hash=? AND dpi=?",
+            (pdf_hash, dpi)).fetchone()
+        return row[0] if row else None
+
+    def put_document(self, pdf_hash, dpi, page_count, name):
+        """Запоминает документ: число страниц и имя файла"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+            (pdf_hash, dpi, page_count, name))
+
+    def total_bytes(self):
+        """Суммарный размер текста в кэше"""
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def evict(self, max_bytes=None):
+        """Вытесняет самые давно использованные страницы, пока кэш больше лимита"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        total = self.total_bytes()
+        removed = 0
+
+        while total > max_bytes:
+            rows = self.conn.execute(
+                "SELECT rowid, size FROM pages ORDER BY last_access LIMIT 200").fetchall()
+            if not rows:
+                break
+            for rowid, size in rows:
+                if total <= max_bytes:
+                    break
+                self.conn.execute("DELETE FROM pages WHERE rowid=?", (rowid,))
+                total -= size
+                removed += 1
+
+        # Документы без единой страницы больше не нужны
+        if removed:
+            self.conn.execute(
+                "DELETE FROM documents WHERE pdf_hash NOT IN (SELECT DISTINCT pdf_hash FROM pages)")
+        return removed
+
+    def resolve(self, key):
+        """Находит sha256 документов по пути к PDF, имени файла или хэшу"""
+        path = Path(key)
+        if path.is_file():
+            return [file_sha256(path)]
+
+        rows = self.conn.execute(
+            "SELECT DISTINCT pdf_hash FROM documents WHERE name=? OR pdf_hash=?",
+            (key, key)).fetchall()
+        return [row[0] for row in rows]
+
+    def documents(self):
+        """Список документов: хэш, имя, число страниц, размер текста"""
+        return self.conn.execute("""
+            SELECT d.pdf_hash, d.name, MAX(d.page_count),
+                   (SELECT COALESCE(SUM(size), 0) FROM pages p WHERE p.pdf_hash = d.pdf_hash)
+            FROM documents d GROUP BY d.pdf_hash ORDER BY d.name
+        """).fetchall()
+
+    def document_texts(self, pdf_hash):
+        """Итоговые тексты документа по всем dpi и движкам"""
+        return self.conn.execute(
+            "SELECT dpi, engine, text FROM pages WHERE pdf_hash=? AND variant=? ORDER BY last_access DESC",
+            (pdf_hash, DOCUMENT_TEXT)).fetchall()
+
+    def page_texts(self, pdf_hash):
+        """Тексты страниц документа по вариантам"""
+        return self.conn.execute(
+            "SELECT dpi, variant, engine, page, text FROM pages WHERE pdf_hash=? AND page >= 0 "
+            "ORDER BY dpi, page, variant",
+            (pdf_hash,)).fetchall()
+
+    def purge(self, pdf_hash=None):
+        """Удаляет записи документа или весь кэш"""
+        if pdf_hash is None:
+            self.conn.execute("DELETE FROM pages")
+            self.conn.execute("DELETE FROM documents")
+            self.conn.execute("VACUUM")
+        else:
+            self.conn.execute("DELETE FROM pages WHERE pdf_hash=?", (pdf_hash,))
+            self.conn.execute("DELETE FROM documents WHERE pdf_hash=?", (pdf_hash,))
+
+    def stats(self):
+        """Сводка по кэшу"""
+        pages, size = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages WHERE page >= 0").fetchone()
+        documents = self.conn.execute("SELECT COUNT(DISTINCT pdf_hash) FROM documents").fetchone()[0]
+        engines = self.conn.execute(
+            "SELECT engine, COUNT(*) FROM pages WHERE page >= 0 GROUP BY engine").fetchall()
+        return {
+            'documents': documents,
+            'pages': pages,
+            'bytes': self.total_bytes(),
+            'page_bytes': size,
+            'engines': dict(engines),
+            'file_bytes': self.path.stat().st_size if self.path.exists() else 0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Управление кэшем OCR")
+    parser.add_argument("--cache", default=str(DEFAULT_CACHE_PATH), help="путь к файлу кэша")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("stats", help="сводка по кэшу")
+    commands.add_parser("list", help="список документов")
+
+    show = commands.add_parser("show", help="показать распознанный текст документа")
+    show.add_argument("key", help="путь к PDF, имя файла или sha256")
+    show.add_argument("--pages", action="store_true", help="показать текст каждой страницы и варианта")
+
+    evict = commands.add_parser("evict", help="ужать кэш до заданного размера")
+    evict.add_argument("--max-mb", type=float, default=DEFAULT_MAX_MB)
+
+    purge = commands.add_parser("purge", help="удалить документ или весь кэш")
+    purge.add_argument("key", nargs="?", help="путь к PDF, имя файла или sha256 (без него - весь кэш)")
+
+    args = parser.parse_args()
+
+    if not Path(args.cache).exists():
+        print(f"[ERROR] Кэш {args.cache} не найден!")
+        return
+
+    cache = OCRCache(args.cache)
+
+    try:
+        if args.command == "stats":
+            stats = cache.stats()
+            print(f"[STATS] Кэш OCR: {cache.path}")
+            print(f"   Документов: {stats['documents']}")
+            print(f"   Страниц: {stats['pages']}")
+            print(f"   Текст: {stats['bytes'] / 1024 / 1024:.1f} МБ (лимит {cache.max_bytes / 1024 / 1024:.0f} МБ)")
+            print(f"   Файл: {stats['file_bytes'] / 1024 / 1024:.1f} МБ")
+            for engine, count in stats['engines'].items():
+                print(f"   {engine}: {count} страниц")
+
+        elif args.command == "list":
+            for pdf_hash, name, page_count, size in cache.documents():
+                print(f"{pdf_hash[:12]}  {page_count:3} стр.  {size / 1024:8.1f} КБ  {name}")
+
+        elif args.command == "show":
+            hashes = cache.resolve(args.key)
+            if not hashes:
+                print(f"[ERROR] Документ {args.key} не найден в кэше")
+                return
+            for pdf_hash in hashes:
+                print(f"[PDF] {pdf_hash}")
+                if args.pages:
+                    for dpi, variant, engine, page, text in cache.page_texts(pdf_hash):
+                        print(f"--- стр. {page + 1}, {variant}, {dpi} dpi, {engine}")
+                        print(text)
+                else:
+                    for dpi, engine, text in cache.document_texts(pdf_hash):
+                        print(f"--- {dpi} dpi, {engine}")
+                        print(text)
+
+        elif args.command == "evict":
+            removed = cache.evict(int(args.max_mb * 1024 * 1024))
+            print(f"[DELETE]  Вытеснено страниц: {removed}")
+
+        elif args.command == "purge":
+            if args.key:
+                hashes = cache.resolve(args.key)
+                for pdf_hash in hashes:
+                    cache.purge(pdf_hash)
+                print(f"[DELETE]  Удалено документов: {len(hashes)}")
+            else:
+                cache.purge()
+                print("[DELETE]  Кэш очищен")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Локальная служба OCR: долго живущий процесс с прогретыми EasyOCR Reader.
+Импорт torch и загрузка моделей происходят один раз при запуске службы,
+а не в каждом запуске обработки. Обработчик сертификатов подключается
+к службе, если она запущена, и распознает сам, если нет.
+
+Служба слушает только 127.0.0.1. Принимает изображения страниц
+(numpy массив как есть) или пути к PDF - только из папки --input
+(по умолчанию input в текущей папке), другие пути отклоняются.
+
+    python ocr_service.py serve [--readers 2] [--cpu] [--input input]
+    python ocr_service.py status
+    python ocr_service.py pdf <файл.pdf> [--dpi 200]
+    python ocr_service.py stop
+
+Протокол: сообщение = 8 байт (длина JSON заголовка и длина данных, big-endian),
+JSON заголовок, данные. Ответ - такое же сообщение с полем ok.
+"""
+
+import argparse
+import json
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from importlib import metadata
+from pathlib import Path
+
+import numpy as np
+
+from image_buffers import BufferPool
+from renderers import Renderer
+from tuning import apply_threads, apply_torch_threads, thread_settings
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 47860
+DEFAULT_READERS = 1
+DEFAULT_PDF_DPI = 200
+# Папка, PDF из которой служба согласна читать (относительно текущей папки)
+DEFAULT_INPUT_DIR = "input"
+
+# Сколько ждать ответа на ping при проверке, запущена ли служба
+CONNECT_TIMEOUT = 0.5
+
+_FRAME = struct.Struct(">II")
+
+
+class ServiceError(Exception):
+    """Служба ответила ошибкой"""
+
+
+def easyocr_engine():
+    """Версия движка для ключа кэша OCR (без импорта easyocr и torch)"""
+    try:
+        version = metadata.version("easyocr")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+    return f"easyocr-{version}-ru"
+
+
+def create_reader(gpu=None, threads=None):
+    """EasyOCR Reader для русского (GPU, если доступен и не запрещен).
+    threads - потоки torch на CPU (tuning.thread_settings), по умолчанию - решает torch"""
+    import easyocr
+    import torch
+    if threads:
+        apply_torch_threads(torch, threads)
+    if gpu is None:
+        gpu = torch.cuda.is_available()
+    if gpu:
+        print(f"[START] Используется GPU: {torch.cuda.get_device_name(0)}")
+    else:
+        print("[CPU] Используется CPU (GPU недоступен)")
+    return easyocr.Reader(['ru'], gpu=gpu, verbose=False)
+
+
+def _jsonable(value):
+    """numpy массивы и числа в ответе EasyOCR - в обычные списки и числа"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} не сериализуется в JSON")
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Соединение со службой OCR закрыто")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_message(sock, header, payload=b""):
+    """Отправляет заголовок и данные одним сообщением"""
+    data = json.dumps(header, ensure_ascii=False, default=_jsonable).encode('utf-8')
+    sock.sendall(_FRAME.pack(len(data), len(payload)) + data)
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_message(sock):
+    """Читает сообщение: (заголовок, данные)"""
+    header_size, payload_size = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    header = json.loads(_recv_exact(sock, header_size).decode('utf-8'))
+    payload = _recv_exact(sock, payload_size) if payload_size else b""
+    return header, payload
+
+
+class OCRService:
+    """Пул прогретых Reader: каждый запрос берет свободный Reader на время распознавания"""
+
+    def __init__(self, readers=DEFAULT_READERS, gpu=None, threads=None, input_dir=DEFAULT_INPUT_DIR):
+        self.engine = easyocr_engine()
+        self.input_dir = Path(input_dir).resolve()
+        self.started = time.time()
+        self.readers = queue.Queue()
+        self.reader_count = max(1, readers)
+        for _ in range(self.reader_count):
+            reader = create_reader(gpu, threads)
+            # Первый вызов Reader заметно дольше - платим за него при запуске
+            reader.readtext(np.full((64, 256), 255, dtype=np.uint8), detail=0)
+            self.readers.put(reader)
+
+        # Статистика
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.busy_time = 0.0
+
+    def readtext(self, image, detail=1):
+        """OCR изображения на свободном Reader"""
+        reader = self.readers.get()
+        start_time = time.time()
+        try:
+            return reader.readtext(image, detail=detail, paragraph=False)
+        finally:
+            self.readers.put(reader)
+            with self.lock:
+                self.requests += 1
+                self.busy_time += time.time() - start_time
+
+    def read_pdf(self, path, dpi=DEFAULT_PDF_DPI):
+        """Текст каждой страницы PDF (рендеринг в сером, без предобработки)"""
+        renderer = Renderer()
+        pool = BufferPool()
+        pages = []
+        try:
+            page_count, _ = renderer.info(path)
+            for page_no in range(page_count):
+                image = renderer.render(path, page_no, dpi, pool)
+                pages.append(" ".join(self.readtext(image, detail=0)))
+                pool.release(image)
+        finally:
+            renderer.close()
+        return pages
+
+    def allowed_path(self, path):
+        """Путь PDF внутри input_dir; любой другой путь на машине служба не открывает"""
+        resolved = Path(path).resolve()
+        if resolved.suffix.lower() != ".pdf" or not resolved.is_relative_to(self.input_dir):
+            raise ServiceError(f"Путь вне папки {self.input_dir} или не PDF: {path}")
+        return resolved
+    
+    def status(self):
+        return {
+            'engine': self.engine,
+            'input_dir': str(self.input_dir),
+            'readers': self.reader_count,
+            'idle_readers': self.readers.qsize(),
+            'uptime': time.time() - self.started,
+            'requests': self.requests,
+            'busy_time': self.busy_time,
+        }
+
+    def handle(self, header, payload):
+        """Ответ на один запрос"""
+        op = header.get('op')
+        if op == 'ping':
+            return self.status()
+        if op == 'readtext':
+            image = np.frombuffer(payload, dtype=header['dtype']).reshape(header['shape'])
+            return {'result': self.readtext(image, detail=header.get('detail', 1))}
+        if op == 'pdf':
+            path = self.allowed_path(header['path'])
+            return {'pages': self.read_pdf(path, dpi=header.get('dpi', DEFAULT_PDF_DPI))}
+        raise ValueError(f"Неизвестная операция {op!r}")
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """Соединение клиента: запросы обрабатываются по очереди, пока клиент не отключится"""
+
+    def handle(self):
+        service = self.server.service
+        while True:
+            try:
+                header, payload = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+
+            if header.get('op') == 'shutdown':
+                send_message(self.request, {'ok': True})
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+            try:
+                reply = dict(service.handle(header, payload), ok=True)
+            except Exception as e:
+                reply = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+            try:
+                send_message(self.request, reply)
+            except OSError:
+                return
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, readers=DEFAULT_READERS, gpu=None, threads=None,
+          input_dir=DEFAULT_INPUT_DIR):
+    """Загружает модели и обслуживает запросы до команды stop"""
+    start_time = time.time()
+    if threads:
+        apply_threads(threads)
+        print(f"[CPU] Потоков на Reader: torch {threads['torch']} (inter-op {threads['interop']})")
+    service = OCRService(readers=readers, gpu=gpu, threads=threads, input_dir=input_dir)
+    print(f"[OK] Загружено Reader: {service.reader_count} ({service.engine}) за {time.time() - start_time:.1f} сек")
+
+    with _Server((host, port), _Handler) as server:
+        server.service = service
+        print(f"[START] Служба OCR слушает {host}:{port} (остановка: python ocr_service.py stop)")
+        print(f"   PDF принимаются только из {service.input_dir}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    print(f"[STATS] Служба OCR остановлена: {service.requests} запросов, "
+          f"OCR {service.busy_time:.1f} сек")
+
+
+class OCRServiceClient:
+    """Клиент службы; у каждого потока свое соединение"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.local = threading.local()
+        self.engine = None
+
+    @classmethod
+    def connect(cls, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Клиент запущенной службы или None, если служба не отвечает"""
+        client = cls(host, port)
+        try:
+            client.engine = client.ping(timeout=CONNECT_TIMEOUT)['engine']
+        except (OSError, ServiceError, ValueError):
+            client.close()
+            return None
+        return client
+
+    def socket(self, timeout=None):
+        if getattr(self.local, 'socket', None) is None:
+            sock = socket.create_connection((self.host, self.port), timeout=timeout or CONNECT_TIMEOUT)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.local.socket = sock
+        self.local.socket.settimeout(timeout)
+        return self.local.socket
+
+    def request(self, header, payload=b"", timeout=None):
+        """Запрос к службе; при обрыве соединение закрывается, ошибка идет вызывающему"""
+        try:
+            sock = self.socket(timeout)
+            send_message(sock, header, payload)
+            reply, _ = recv_message(sock)
+        except OSError:
+            self.close()
+            raise
+        if not reply.get('ok'):
+            raise ServiceError(reply.get('error', 'неизвестная ошибка'))
+        return reply
+
+    def ping(self, timeout=None):
+        return self.request({'op': 'ping'}, timeout=timeout)
+
+    def readtext(self, image, detail=1):
+        """То же, что easyocr.Reader.readtext(image, detail, paragraph=False)"""
+        image = np.ascontiguousarray(image)
+        reply = self.request({'op': 'readtext', 'detail': detail, 'shape': image.shape,
+                              'dtype': image.dtype.str}, image.tobytes())
+        return reply['result']
+
+    def read_pdf(self, path, dpi=DEFAULT_PDF_DPI):
+        """Текст страниц PDF; путь передается службе, она читает файл сама"""
+        return self.request({'op': 'pdf', 'path': str(Path(path).resolve()), 'dpi': dpi})['pages']
+
+    def shutdown(self):
+        self.request({'op': 'shutdown'}, timeout=CONNECT_TIMEOUT * 10)
+        self.close()
+
+    def close(self):
+        """Закрывает соединение текущего потока"""
+        sock = getattr(self.local, 'socket', None)
+        if sock is not None:
+            sock.close()
+            self.local.socket = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная служба OCR")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="запустить службу")
+    serve_parser.add_argument("--readers", type=int, default=DEFAULT_READERS,
+                              help="сколько Reader держать (столько запросов распознаются одновременно)")
+    serve_parser.add_argument("--cpu", action="store_true", help="не использовать GPU")
+    serve_parser.add_argument("--threads", default="auto",
+                              help="потоков torch на Reader (auto - доля ядер на каждый Reader)")
+    serve_parser.add_argument("--input", default=DEFAULT_INPUT_DIR,
+                              help="папка, PDF из которой служба распознает (другие пути отклоняются)")
+
+    commands.add_parser("status", help="запущена ли служба")
+    commands.add_parser("stop", help="остановить службу")
+
+    pdf = commands.add_parser("pdf", help="распознать PDF через службу")
+    pdf.add_argument("path")
+    pdf.add_argument("--dpi", type=int, default=DEFAULT_PDF_DPI)
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        readers = max(1, args.readers)
+        threads = thread_settings({'torch': args.threads, 'interop': 1, 'opencv': args.threads}, readers)
+        serve(port=args.port, readers=readers, gpu=False if args.cpu else None, threads=threads,
+              input_dir=args.input)
+        return
+
+    client = OCRServiceClient.connect(port=args.port)
+    if client is None:
+        print(f"[ERROR] Служба OCR не запущена ({DEFAULT_HOST}:{args.port})")
+        return
+
+    try:
+        if args.command == "status":
+            status = client.ping()
+            print(f"[OK] Служба OCR: {DEFAULT_HOST}:{args.port}, {status['engine']}")
+            print(f"   Reader: {status['readers']} (свободно {status['idle_readers']})")
+            print(f"   PDF из: {status.get('input_dir', '-')}")
+            print(f"   Работает: {status['uptime'] / 60:.1f} мин, запросов {status['requests']}, "
+                  f"OCR {status['busy_time']:.1f} сек")
+
+        elif args.command == "stop":
+            client.shutdown()
+            print("[OK] Служба OCR остановлена")
+
+        elif args.command == "pdf":
+            start_time = time.time()
+            for page_no, text in enumerate(client.read_pdf(args.path, dpi=args.dpi), 1):
+                print(f"--- стр. {page_no}")
+                print(text)
+            print(f"[TIME]  {time.time() - start_time:.1f} сек")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Конвейер из стадий с ограниченными очередями между ними.
+У каждой стадии свои потоки: пока один документ распознается, следующий уже
+рендерится и проходит предобработку. Результаты отдаются в порядке входа.
+По каждой стадии собирается занятость и глубина входной очереди - видно узкое место.
+"""
+
+import queue
+import threading
+import time
+
+DEFAULT_QUEUE_SIZE = 4
+
+# Конец потока заданий
+_STOP = object()
+
+
+class _Failed:
+    """Ошибка на одной из стадий: задание идет дальше без обработки"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class Outcome:
+    """Результат задания с интерфейсом Future.result()"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        if isinstance(self.value, _Failed):
+            raise self.value.error
+        return self.value
+
+
+class Stage:
+    """Стадия конвейера: функция над заданием и число потоков"""
+
+    def __init__(self, name, function, workers=1):
+        self.name = name
+        self.function = function
+        self.workers = max(1, workers)
+        self.input = None
+
+        # Статистика
+        self.lock = threading.Lock()
+        self.items = 0
+        self.busy_time = 0.0
+        self.depth_total = 0
+        self.max_depth = 0
+
+    def record(self, busy_time, depth):
+        """Учитывает одно задание: время работы и глубину очереди перед ним"""
+        with self.lock:
+            self.items += 1
+            self.busy_time += busy_time
+            self.depth_total += depth
+            self.max_depth = max(self.max_depth, depth)
+
+    def average_depth(self):
+        return self.depth_total / self.items if self.items else 0.0
+
+
+class StagedPipeline:
+    """Запускает задания через цепочку стадий"""
+
+    def __init__(self, stages, queue_size=DEFAULT_QUEUE_SIZE):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.wall_time = 0.0
+
+    def window(self):
+        """Сколько заданий одновременно в работе: в очередях, в потоках стадий и в ожидании своей очереди"""
+        return self.queue_size * (len(self.stages) + 1)
+
+    def run(self, items):
+        """Генератор Outcome в порядке items. Новое задание подается, только когда отдано
+        одно из прежних: медленный документ в голове не дает копиться результатам следующих"""
+        items = list(items)
+        for stage in self.stages:
+            stage.input = queue.Queue(maxsize=self.queue_size)
+        # В выходной очереди не больше заданий в работе и метки конца
+        output = queue.Queue(maxsize=self.window() + 1)
+        in_flight = threading.Semaphore(self.window())
+
+        threads = [threading.Thread(target=self._feed, args=(items, in_flight), name="pipeline-feed", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            next_queue = self.stages[index + 1].input if index + 1 < len(self.stages) else output
+            remaining = [stage.workers]
+            for worker in range(stage.workers):
+                threads.append(threading.Thread(target=self._work, args=(stage, next_queue, remaining),
+                                                name=f"pipeline-{stage.name}-{worker}", daemon=True))
+
+        start_time = time.time()
+        for thread in threads:
+            thread.start()
+
+        # Задания завершаются вразнобой - копим их до своей очереди
+        finished = {}
+        next_index = 0
+        while next_index < len(items):
+            item = output.get()
+            if item is _STOP:
+                break
+            index, value = item
+            finished[index] = value
+            while next_index in finished:
+                yield Outcome(finished.pop(next_index))
+                next_index += 1
+                in_flight.release()
+
+        self.wall_time = time.time() - start_time
+        for thread in threads:
+            thread.join()
+
+    def _feed(self, items, in_flight):
+        """Подает задания в первую стадию, пока заданий в работе меньше окна"""
+        first = self.stages[0]
+        for item in enumerate(items):
+            in_flight.acquire()
+            first.input.put(item)
+        for _ in range(first.workers):
+            first.input.put(_STOP)
+
+    def _work(self, stage, next_queue, remaining):
+        """Поток стадии: берет задание, обрабатывает, передает дальше"""
+        while True:
+            depth = stage.input.qsize()
+            item = stage.input.get()
+            if item is _STOP:
+                break
+
+            index, value = item
+            start_time = time.time()
+            if not isinstance(value, _Failed):
+                try:
+                    value = stage.function(value)
+                except Exception as e:
+                    value = _Failed(e)
+            stage.record(time.time() - start_time, depth)
+            next_queue.put((index, value))
+
+        # Последний поток стадии закрывает следующую
+        with stage.lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            next_workers = next((s.workers for s in self.stages if s.input is next_queue), 1)
+            for _ in range(next_workers):
+                next_queue.put(_STOP)
+
+    def report(self, extra=()):
+        """Строки статистики стадий: (имя, потоков, заданий, занятость, очередь)"""
+        lines = []
+        rows = [(stage.name, stage.workers, stage.items, stage.busy_time,
+                 stage.average_depth(), stage.max_depth) for stage in self.stages]
+        rows.extend(extra)
+        for name, workers, items, busy_time, average_depth, max_depth in rows:
+            load = busy_time / max(self.wall_time * workers, 1e-9) * 100
+            lines.append(f"{name:11} {workers:2} пот.  {items:5} док.  занят {busy_time:7.1f} с ({load:3.0f}%)  "
+                         f"очередь {average_depth:4.1f} / макс {max_depth}")
+        return lines
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Профили обработки: именованные наборы настроек, которые выбираются одним
+параметром --profile вместо набора отдельных флагов.
+
+    quality - как раньше: увеличение в 2 раза и fastNlMeansDenoising
+    fast    - шумоподавление медианным фильтром до увеличения,
+              увеличение только для мелкого текста
+    fast-bilateral - как fast, но билатеральный фильтр: медленнее медианного,
+              зато лучше сохраняет края тонких букв на зашумленных сканах
+
+threads - потоки на процесс OCR: torch (intra-op), interop (inter-op) и opencv;
+"auto" - по замеру tuning.py autotune, а без него - поровну делить ядра между процессами
+(inter-op: у одного процесса - как у torch по умолчанию, у нескольких - по одному потоку).
+"""
+
+DEFAULT_PROFILE = "quality"
+
+PROFILES = {
+    "quality": {
+        "preprocess": "quality",
+        "threads": {"torch": "auto", "interop": "auto", "opencv": "auto"},
+    },
+    "fast": {
+        "preprocess": "fast",
+        "threads": {"torch": "auto", "interop": "auto", "opencv": "auto"},
+    },
+    "fast-bilateral": {
+        "preprocess": "fast-bilateral",
+        "threads": {"torch": "auto", "interop": "auto", "opencv": "auto"},
+    },
+}
+
+
+def get_profile(name):
+    """Настройки профиля (копия, чтобы их можно было менять)"""
+    if name not in PROFILES:
+        raise ValueError(f"Неизвестный профиль {name}, доступны: {', '.join(PROFILES)}")
+    return dict(PROFILES[name])
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Рендеринг страниц PDF в 8-битные серые массивы numpy (буферы BufferPool).
+
+    pdfium    - pypdfium2 в этом же процессе: без запуска poppler на каждую
+                страницу и без временных файлов; документ открывается один раз
+    pdftoppm  - poppler в отдельном процессе, PGM читается из канала в буфер
+    pdf2image - как раньше (pdftoppm через временные файлы и PIL)
+    auto      - pdfium, если установлен pypdfium2, затем pdftoppm и pdf2image
+
+Если рендерер не справился с файлом, страница рендерится следующим по списку.
+"""
+
+import re
+import shutil
+import subprocess
+import threading
+from collections import Counter
+
+import numpy as np
+
+from image_buffers import read_pgm
+
+RENDERERS = ("auto", "pdfium", "pdftoppm", "pdf2image")
+DEFAULT_RENDERER = "auto"
+
+# Порядок попыток для каждого выбора; pdf2image - всегда последний запасной вариант
+FALLBACKS = {
+    "auto": ("pdfium", "pdftoppm", "pdf2image"),
+    "pdfium": ("pdfium", "pdf2image"),
+    "pdftoppm": ("pdftoppm", "pdf2image"),
+    "pdf2image": ("pdf2image",),
+}
+
+# PDFium не потокобезопасен: все вызовы в процессе - под одной блокировкой
+_PDFIUM_LOCK = threading.RLock()
+
+
+class RendererUnavailable(Exception):
+    """Рендерер не установлен"""
+
+
+class PdfiumRenderer:
+    """pypdfium2: страницы рендерятся в памяти процесса"""
+    name = "pdfium"
+
+    def __init__(self):
+        try:
+            import pypdfium2
+        except ImportError:
+            raise RendererUnavailable("не установлен pypdfium2 (pip install pypdfium2)")
+        self.pdfium = pypdfium2
+        # Открытый документ: страницы одного файла рендерятся без повторного разбора PDF
+        self.path = None
+        self.document = None
+
+    def open(self, pdf_path):
+        if self.path != str(pdf_path):
+            self.close()
+            self.document = self.pdfium.PdfDocument(str(pdf_path))
+            self.path = str(pdf_path)
+        return self.document
+
+    def info(self, pdf_path):
+        with _PDFIUM_LOCK:
+            document = self.open(pdf_path)
+            page = document[0]
+            try:
+                page_size = tuple(page.get_size())
+            finally:
+                page.close()
+            return len(document), page_size
+
+    def render(self, pdf_path, page_no, dpi, pool):
+        with _PDFIUM_LOCK:
+            page = self.open(pdf_path)[page_no]
+            try:
+                bitmap = page.render(scale=dpi / 72, grayscale=True)
+            finally:
+                page.close()
+            try:
+                pixels = bitmap.to_numpy()
+                if pixels.ndim == 3:
+                    pixels = pixels[:, :, 0]
+                # Единственная копия: из буфера PDFium в буфер пула
+                image = pool.acquire(pixels.shape)
+                np.copyto(image, pixels)
+            finally:
+                bitmap.close()
+        return image
+
+    def close(self):
+        """Закрывает документ (на Windows открытый файл нельзя перенести)"""
+        if self.document is not None:
+            with _PDFIUM_LOCK:
+                self.document.close()
+        self.document = None
+        self.path = None
+
+
+class PdftoppmRenderer:
+    """poppler: pdftoppm -gray пишет PGM в канал, он читается прямо в буфер пула"""
+    name = "pdftoppm"
+
+    def __init__(self):
+        if shutil.which("pdftoppm") is None:
+            raise RendererUnavailable("pdftoppm не найден (poppler не в PATH)")
+
+    def info(self, pdf_path):
+        return pdfinfo(pdf_path)
+
+    def render(self, pdf_path, page_no, dpi, pool):
+        command = ['pdftoppm', '-gray', '-r', str(dpi), '-f', str(page_no + 1), '-l', str(page_no + 1),
+                   str(pdf_path)]
+        with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as process:
+            try:
+                return read_pgm(process.stdout, pool)
+            except ValueError as e:
+                process.kill()
+                raise RuntimeError(f"pdftoppm не отрисовал стр. {page_no + 1}: {e}")
+
+    def close(self):
+        pass
+
+
+class Pdf2ImageRenderer:
+    """pdf2image (как раньше): временные файлы и PIL, затем копия в numpy"""
+    name = "pdf2image"
+
+    def info(self, pdf_path):
+        return pdfinfo(pdf_path)
+
+    def render(self, pdf_path, page_no, dpi, pool):
+        from pdf2image import convert_from_path
+        images = convert_from_path(pdf_path, dpi=dpi, grayscale=True, first_page=page_no + 1, last_page=page_no + 1)
+        image = np.array(images[0])
+        images[0].close()
+        return image
+
+    def close(self):
+        pass
+
+
+def pdfinfo(pdf_path):
+    """(число страниц, размер страницы в пунктах или None) через pdfinfo"""
+    from pdf2image import pdfinfo_from_path
+    info = pdfinfo_from_path(pdf_path)
+    # "595.276 x 841.89 pts (A4)"
+    match = re.match(r'\s*([\d.]+)\s*x\s*([\d.]+)', str(info.get('Page size', '')))
+    page_size = (float(match.group(1)), float(match.group(2))) if match else None
+    return int(info.get('Pages', 0)), page_size
+
+
+RENDERER_CLASSES = {
+    "pdfium": PdfiumRenderer,
+    "pdftoppm": PdftoppmRenderer,
+    "pdf2image": Pdf2ImageRenderer,
+}
+
+
+class Renderer:
+    """Рендереры по порядку попыток: при ошибке файл рендерится следующим"""
+
+    def __init__(self, choice=DEFAULT_RENDERER):
+        if choice not in FALLBACKS:
+            raise ValueError(f"Неизвестный рендерер {choice!r}, допустимы: {', '.join(RENDERERS)}")
+        self.renderers = []
+        for name in FALLBACKS[choice]:
+            try:
+                self.renderers.append(RENDERER_CLASSES[name]())
+            except RendererUnavailable as e:
+                if name == choice:
+                    print(f"[WARNING]  Рендерер {name} недоступен ({e}), используется {FALLBACKS[choice][-1]}")
+
+        # Статистика: страниц по рендерерам
+        self.pages = Counter()
+        self.fallbacks = []
+
+    @property
+    def name(self):
+        return self.renderers[0].name
+
+    def call(self, method, pdf_path, *args):
+        for index, renderer in enumerate(self.renderers):
+            try:
+                return renderer, getattr(renderer, method)(pdf_path, *args)
+            except Exception as e:
+                if index == len(self.renderers) - 1:
+                    raise
+                self.fallbacks.append(f"{renderer.name} -> {pdf_path}: {e}")
+                print(f"    [WARNING]  {renderer.name} не справился ({e}), пробуем {self.renderers[index + 1].name}")
+
+    def info(self, pdf_path):
+        """(число страниц, размер первой страницы в пунктах или None)"""
+        return self.call("info", pdf_path)[1]
+
+    def render(self, pdf_path, page_no, dpi, pool):
+        """Серая страница (uint8, один канал), по возможности - в буфере пула"""
+        renderer, image = self.call("render", pdf_path, page_no, dpi, pool)
+        self.pages[renderer.name] += 1
+        return image
+
+    def close(self):
+        """Закрывает документы, которые держат рендереры"""
+        for renderer in self.renderers:
+            renderer.close()
+
+    def summary(self):
+        """Строка статистики для итогов"""
+        if not self.pages:
+            return None
+        return "Рендеринг: " + ", ".join(f"{name} {count} стр." for name, count in self.pages.most_common())
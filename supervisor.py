@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Сторож обработки: бюджет времени на файл и на стадию.
+
+Каждый файл распознается в процессе-воркере, который сообщает координатору
+о начале и конце интервалов трассировки (render, ocr, ...). Если файл не
+уложился в бюджет или одна стадия - в свой, процесс воркера убивается и
+запускается заново, а файл получает исход timeout: один патологический PDF
+(огромный скан, зависший poppler) больше не останавливает всю пачку.
+"""
+
+import multiprocessing
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+# Бюджеты стадий по умолчанию (имя интервала трассировки=секунд)
+DEFAULT_STAGE_TIMEOUTS = "pdfinfo=30,render=60,ocr=180"
+# Как часто проверять сроки, секунд
+POLL_INTERVAL = 0.5
+# Сколько ждать завершения воркера после команды остановиться
+STOP_TIMEOUT = 5
+
+
+def parse_stage_timeouts(spec):
+    """"render=60,ocr=180" -> {'render': 60.0, 'ocr': 180.0}"""
+    timeouts = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, seconds = item.partition("=")
+        try:
+            timeouts[name.strip()] = float(seconds)
+        except ValueError:
+            raise ValueError(f"Ожидалось стадия=секунд, получено {item!r}")
+    return timeouts
+
+
+def serve(conn, analyze):
+    """Цикл процесса-воркера: получает пути файлов, отправляет результаты (None - выход)"""
+    conn.send(('ready',))
+    while True:
+        try:
+            path = conn.recv()
+        except EOFError:
+            return
+        if path is None:
+            return
+        try:
+            result = analyze(path)
+        except Exception as e:
+            conn.send(('error', str(e)))
+        else:
+            conn.send(('result', result))
+
+
+def stage_reporter(conn, stages):
+    """Слушатель Tracer в воркере: начало и конец интервалов stages (стадий с бюджетом)
+    уходят координатору; остальные интервалы не стоят сообщения"""
+    stages = frozenset(stages)
+    def report(name, started):
+        if name in stages:
+            conn.send(('stage', name, started))
+    return report
+
+
+class _Worker:
+    """Процесс-воркер и файл, который он сейчас распознает"""
+
+    def __init__(self, context, target, args):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=target, args=(child_conn, *args), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.job = None
+        self.started = 0.0
+        # Открытые интервалы: [(имя, начало)]
+        self.stages = []
+
+    def send(self, job):
+        self.job = job
+        self.started = time.monotonic()
+        self.stages = []
+        self.conn.send(str(job[1]))
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class Supervisor:
+    """Пул процессов-воркеров под надзором. target(conn, *args) - точка входа воркера,
+    она вызывает serve(). Просроченный файл - исход timeout, его воркер перезапускается"""
+
+    def __init__(self, target, args, workers=1, file_timeout=None, stage_timeouts=None):
+        self.context = multiprocessing.get_context()
+        self.target = target
+        self.args = tuple(args)
+        self.workers = max(1, workers)
+        self.file_timeout = file_timeout
+        self.stage_timeouts = dict(stage_timeouts or {})
+        self.restarts = 0
+
+    def start_worker(self):
+        return _Worker(self.context, self.target, self.args)
+
+    def overdue(self, worker, now):
+        """Причина, по которой файл воркера просрочен, или None"""
+        if self.file_timeout and now - worker.started > self.file_timeout:
+            return f"файл дольше {self.file_timeout:g} сек"
+        for name, started in worker.stages:
+            limit = self.stage_timeouts.get(name)
+            if limit and now - started > limit:
+                return f"стадия {name} дольше {limit:g} сек"
+        return None
+
+    def replace(self, workers, worker):
+        """Убивает воркер и запускает вместо него новый"""
+        worker.kill()
+        self.restarts += 1
+        workers[workers.index(worker)] = self.start_worker()
+
+    def receive(self, worker, message, outcomes):
+        """Сообщение воркера: готовность, начало или конец стадии, результат файла"""
+        if message[0] == 'ready':
+            worker.ready = True
+        elif message[0] == 'stage':
+            _, name, started = message
+            if started:
+                worker.stages.append((name, time.monotonic()))
+            elif worker.stages:
+                worker.stages.pop()
+        else:
+            index, item = worker.job
+            outcomes[index] = (item, 'ok' if message[0] == 'result' else 'error', message[1],
+                               time.monotonic() - worker.started)
+            worker.job = None
+
+    def run(self, items):
+        """Исходы в порядке items: (item, исход, данные, секунд), исход - 'ok' (данные - результат),
+        'timeout' или 'error' (данные - причина)"""
+        queue = deque(enumerate(items))
+        outcomes = {}
+        next_index = 0
+        workers = [self.start_worker() for _ in range(min(self.workers, len(queue)))]
+        try:
+            while next_index < len(items):
+                for worker in workers:
+                    if worker.ready and worker.job is None and queue:
+                        worker.send(queue.popleft())
+
+                connections = {worker.conn: worker for worker in workers}
+                for conn in wait(list(connections), timeout=POLL_INTERVAL):
+                    worker = connections[conn]
+                    try:
+                        # Все накопившиеся сообщения, чтобы сроки проверялись по свежим стадиям
+                        while conn.poll():
+                            self.receive(worker, conn.recv(), outcomes)
+                    except (EOFError, OSError):
+                        # Процесс упал сам (например, не хватило памяти)
+                        worker.process.join(STOP_TIMEOUT)
+                        code = worker.process.exitcode
+                        if not worker.ready:
+                            raise RuntimeError(f"Процесс воркера не запустился (код {code})")
+                        if worker.job:
+                            index, item = worker.job
+                            outcomes[index] = (item, 'error', f"процесс воркера завершился (код {code})",
+                                               time.monotonic() - worker.started)
+                        self.replace(workers, worker)
+
+                # Сроки проверяются после чтения сообщений: готовый результат не считается просроченным
+                now = time.monotonic()
+                for worker in list(workers):
+                    reason = worker.job and self.overdue(worker, now)
+                    if reason:
+                        index, item = worker.job
+                        outcomes[index] = (item, 'timeout', reason, now - worker.started)
+                        print(f"[WARNING]  {getattr(item, 'name', item)}: {reason}, процесс воркера перезапущен")
+                        self.replace(workers, worker)
+
+                while next_index in outcomes:
+                    yield outcomes.pop(next_index)
+                    next_index += 1
+        finally:
+            for worker in workers:
+                worker.stop()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Хранилище распознанного текста: один дописываемый файл сжатых записей
+(debug/ocr_text.store) и индекс смещений по sha256 PDF (debug/ocr_text.idx).
+Заменяет тысячи файлов debug/<имя>_ocr_text.txt.
+
+Запись: заголовок (сигнатура, кодек, sha256, длины), имя файла и текст,
+сжатый zstd (если установлен zstandard) или zlib. Записи пишет фоновый поток,
+обработка их не ждет. Индекс можно восстановить из самого хранилища;
+оборванная при сбое последняя запись отбрасывается.
+
+    python text_store.py stats
+    python text_store.py get <файл.pdf | имя файла | sha256>
+    python text_store.py grep <регулярное выражение> [-i]
+"""
+
+import argparse
+import json
+import os
+import queue
+import re
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+from ocr_cache import file_sha256
+
+DEFAULT_STORE_PATH = Path("debug") / "ocr_text.store"
+
+MAGIC = b"OCRT"
+# Сигнатура, кодек, sha256, длина имени, длина сжатого текста
+_HEADER = struct.Struct(">4s1s32sHI")
+CODEC_ZLIB = b"z"
+CODEC_ZSTD = b"s"
+
+# Конец очереди фонового писателя
+_STOP = object()
+
+
+def compress(text):
+    """(кодек, сжатые данные)"""
+    data = text.encode('utf-8')
+    if ZSTD_AVAILABLE:
+        return CODEC_ZSTD, zstandard.ZstdCompressor(level=3).compress(data)
+    return CODEC_ZLIB, zlib.compress(data, 6)
+
+
+def decompress(codec, data):
+    if codec == CODEC_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Запись сжата zstd, установите zstandard")
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    return zlib.decompress(data).decode('utf-8')
+
+
+class OCRTextStore:
+    """Дописываемое хранилище текстов с индексом по хэшу PDF"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH, background=True):
+        self.path = Path(path)
+        self.index_path = self.path.with_suffix(".idx")
+        # sha256 -> последняя запись индекса
+        self.index = {}
+        self.load_index()
+
+        self.file = None
+        self.index_file = None
+        self.queue = None
+        self.thread = None
+        self.written = 0
+        self.skipped = 0
+        if background:
+            self.queue = queue.Queue()
+            self.thread = threading.Thread(target=self._writer, name="text-store", daemon=True)
+            self.thread.start()
+
+    def load_index(self):
+        """Читает индекс и доиндексирует записи хранилища, не попавшие в него (сбой)"""
+        end = 0
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.index[entry['hash']] = entry
+                    end = max(end, entry['offset'] + entry['length'])
+        if self.path.exists() and self.path.stat().st_size > end:
+            self.recover(end)
+
+    def recover(self, offset):
+        """Индексирует целые записи после offset, оборванный хвост отрезает"""
+        with open(self.path, 'r+b') as store, open(self.index_path, 'a', encoding='utf-8') as index_file:
+            store.seek(offset)
+            while True:
+                header = store.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                magic, codec, digest, name_size, data_size = _HEADER.unpack(header)
+                name = store.read(name_size)
+                data = store.read(data_size)
+                if magic != MAGIC or len(name) < name_size or len(data) < data_size:
+                    break
+                try:
+                    text = decompress(codec, data)
+                except Exception:
+                    break
+                entry = self.entry(digest.hex(), name.decode('utf-8', 'replace'), offset, store.tell() - offset,
+                                   codec, text)
+                index_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                self.index[entry['hash']] = entry
+                offset = store.tell()
+            store.truncate(offset)
+
+    @staticmethod
+    def entry(pdf_hash, name, offset, length, codec, text):
+        return {
+            'hash': pdf_hash,
+            'file': name,
+            'offset': offset,
+            'length': length,
+            'codec': codec.decode('ascii'),
+            'chars': len(text),
+            'crc': zlib.crc32(text.encode('utf-8')),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    def put(self, pdf_hash, name, text):
+        """Сохраняет текст документа (в фоне, если хранилище создано с background)"""
+        if self.queue is not None:
+            self.queue.put((pdf_hash, name, text))
+        else:
+            self.append(pdf_hash, name, text)
+
+    def append(self, pdf_hash, name, text):
+        """Дописывает запись, если такого текста этого PDF еще нет"""
+        known = self.index.get(pdf_hash)
+        if known and known['crc'] == zlib.crc32(text.encode('utf-8')) and known['chars'] == len(text):
+            self.skipped += 1
+            return
+
+        if self.file is None:
+            self.file = open(self.path, 'ab')
+            self.index_file = open(self.index_path, 'a', encoding='utf-8')
+
+        codec, data = compress(text)
+        name_bytes = name.encode('utf-8')[:0xFFFF]
+        offset = self.file.seek(0, os.SEEK_END)
+        record = _HEADER.pack(MAGIC, codec, bytes.fromhex(pdf_hash), len(name_bytes), len(data)) + name_bytes + data
+        self.file.write(record)
+        self.file.flush()
+
+        entry = self.entry(pdf_hash, name, offset, len(record), codec, text)
+        self.index_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.index_file.flush()
+        self.index[pdf_hash] = entry
+        self.written += 1
+
+    def _writer(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            try:
+                self.append(*item)
+            except Exception as e:
+                print(f"[WARNING]  Текст {item[1]} не сохранен в {self.path}: {e}")
+
+    def get(self, pdf_hash):
+        """Текст документа по sha256 (None, если его нет)"""
+        entry = self.index.get(pdf_hash)
+        if entry is None:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(entry['offset'])
+            record = f.read(entry['length'])
+        _, codec, _, name_size, data_size = _HEADER.unpack_from(record)
+        start = _HEADER.size + name_size
+        return decompress(codec, record[start:start + data_size])
+
+    def resolve(self, key):
+        """sha256 по пути к PDF, имени файла или самому хэшу"""
+        if Path(key).is_file():
+            return [file_sha256(key)]
+        if re.fullmatch(r'[0-9a-f]{64}', key.lower()):
+            return [key.lower()]
+        name = Path(key).name
+        return [entry['hash'] for entry in self.index.values() if entry['file'] == name]
+
+    def records(self):
+        """(запись индекса, текст) по всем документам - по одной записи, без распаковки всего сразу"""
+        entries = sorted(self.index.values(), key=lambda entry: entry['offset'])
+        with open(self.path, 'rb') as f:
+            for entry in entries:
+                f.seek(entry['offset'])
+                record = f.read(entry['length'])
+                _, codec, _, name_size, data_size = _HEADER.unpack_from(record)
+                start = _HEADER.size + name_size
+                yield entry, decompress(codec, record[start:start + data_size])
+
+    def close(self):
+        """Дожидается записи очереди и сбрасывает файлы на диск"""
+        if self.thread is not None:
+            self.queue.put(_STOP)
+            self.thread.join()
+            self.thread = None
+        for f in (self.file, self.index_file):
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+        self.file = self.index_file = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Хранилище распознанного текста")
+    parser.add_argument("--store", default=str(DEFAULT_STORE_PATH), help="путь к хранилищу")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("stats", help="сводка по хранилищу")
+
+    get = commands.add_parser("get", help="показать текст документа")
+    get.add_argument("key", help="путь к PDF, имя файла или sha256")
+
+    grep = commands.add_parser("grep", help="найти документы, в тексте которых есть совпадение")
+    grep.add_argument("pattern", help="регулярное выражение")
+    grep.add_argument("-i", "--ignore-case", action="store_true")
+
+    args = parser.parse_args()
+
+    if not Path(args.store).exists():
+        print(f"[ERROR] Хранилище {args.store} не найдено!")
+        return
+
+    store = OCRTextStore(args.store, background=False)
+
+    if args.command == "stats":
+        chars = sum(entry['chars'] for entry in store.index.values())
+        size = store.path.stat().st_size
+        print(f"[STATS] Хранилище текста: {store.path}")
+        print(f"   Документов: {len(store.index)}")
+        print(f"   Текст: {chars / 1e6:.1f} млн символов, файл {size / 1024 / 1024:.1f} МБ")
+        codecs = sorted({entry['codec'] for entry in store.index.values()})
+        print(f"   Сжатие: {', '.join('zstd' if codec == 's' else 'zlib' for codec in codecs)}")
+
+    elif args.command == "get":
+        hashes = store.resolve(args.key)
+        found = [(pdf_hash, store.get(pdf_hash)) for pdf_hash in hashes]
+        found = [(pdf_hash, text) for pdf_hash, text in found if text is not None]
+        if not found:
+            print(f"[ERROR] Документ {args.key} не найден в хранилище")
+            return
+        for pdf_hash, text in found:
+            print(f"[PDF] {store.index[pdf_hash]['file']} ({pdf_hash})")
+            print(text)
+
+    elif args.command == "grep":
+        pattern = re.compile(args.pattern, re.IGNORECASE if args.ignore_case else 0)
+        matches = 0
+        for entry, text in store.records():
+            match = pattern.search(text)
+            if match:
+                matches += 1
+                start, end = max(0, match.start() - 40), min(len(text), match.end() + 40)
+                print(f"{entry['file']}: ...{text[start:end]}...")
+        print(f"[STATS] Документов с совпадением: {matches} из {len(store.index)}")
+
+
+if __name__ == "__main__":
+    main()
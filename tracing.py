@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Трассировка обработки: вложенные интервалы (файл > страница > вариант > стадия).
+Интервал наследует имя файла от родителя, поэтому время любой стадии
+можно сложить по файлам. Выгрузка в JSON lines и в формат Chrome trace
+(открывается в chrome://tracing или https://ui.perfetto.dev).
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+PERCENTILES = (50, 90, 99)
+
+
+class Tracer:
+    """Сборщик интервалов; потокобезопасен, стек вложенности - свой у каждого потока"""
+
+    def __init__(self):
+        self.spans = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        # listener(имя, начало) - вызывается в начале (True) и в конце (False) интервала
+        self.listener = None
+
+    def stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    @contextmanager
+    def span(self, name, cat="stage", **args):
+        """Интервал трассировки; аргументы попадают в args, file наследуется от родителя"""
+        stack = self.stack()
+        if stack and 'file' not in args and 'file' in stack[-1]['args']:
+            args['file'] = stack[-1]['args']['file']
+
+        record = {
+            'name': name,
+            'cat': cat,
+            'ts': time.time() * 1e6,
+            'dur': 0.0,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'depth': len(stack),
+            'args': args,
+        }
+        start = time.perf_counter()
+        stack.append(record)
+        if self.listener:
+            self.listener(name, True)
+        try:
+            yield record
+        finally:
+            stack.pop()
+            if self.listener:
+                self.listener(name, False)
+            record['dur'] = (time.perf_counter() - start) * 1e6
+            with self.lock:
+                self.spans.append(record)
+
+    def drain(self, file_name):
+        """Забирает интервалы файла (для передачи из воркера координатору)"""
+        with self.lock:
+            taken = [span for span in self.spans if span['args'].get('file') == file_name]
+            self.spans = [span for span in self.spans if span['args'].get('file') != file_name]
+        return taken
+
+    def extend(self, spans):
+        """Добавляет интервалы, записанные в другом процессе или потоке"""
+        with self.lock:
+            self.spans.extend(spans)
+
+    def stage_totals(self):
+        """{стадия: [секунд на файл]} - сумма одноименных интервалов внутри каждого файла"""
+        totals = defaultdict(lambda: defaultdict(float))
+        with self.lock:
+            for span in self.spans:
+                file_name = span['args'].get('file')
+                if file_name is not None:
+                    totals[span['name']][file_name] += span['dur'] / 1e6
+        return {name: list(files.values()) for name, files in totals.items()}
+
+    def file_durations(self):
+        """{файл: секунд} по интервалам верхнего уровня file"""
+        with self.lock:
+            return {span['args']['file']: span['dur'] / 1e6 for span in self.spans if span['name'] == 'file'}
+
+    def write_jsonl(self, path):
+        """Интервал на строку"""
+        with self.lock:
+            spans = sorted(self.spans, key=lambda span: span['ts'])
+        with open(path, 'w', encoding='utf-8') as f:
+            for span in spans:
+                f.write(json.dumps(span, ensure_ascii=False) + "\n")
+
+    def write_chrome(self, path):
+        """Формат Chrome trace: события "X" с началом и длительностью в микросекундах"""
+        with self.lock:
+            events = [{
+                'name': span['name'],
+                'cat': span['cat'],
+                'ph': 'X',
+                'ts': span['ts'],
+                'dur': span['dur'],
+                'pid': span['pid'],
+                'tid': span['tid'],
+                'args': span['args'],
+            } for span in self.spans]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+
+def percentiles(values):
+    """Среднее, перцентили PERCENTILES и максимум"""
+    values = np.asarray(values, dtype=float)
+    return (values.mean(), *np.percentile(values, PERCENTILES), values.max())
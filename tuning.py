@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Настройка потоков для работы на CPU. torch, OpenCV и EasyOCR заводят свои пулы
+потоков по числу ядер; при нескольких процессах OCR они мешают друг другу.
+Число потоков torch (intra-op и inter-op) и OpenCV на процесс берется из профиля
+(profiles.py); "auto" - доля ядер на процесс или замер autotune для этой машины.
+
+Подбор числа процессов и потоков на процесс замером на своих файлах:
+    python tuning.py autotune [--files 8]
+    python tuning.py show
+    python tuning.py reset
+
+Лучшая комбинация сохраняется в debug/tuning.json и используется следующими
+запусками 1.new2.py, если --workers не задан явно.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TUNING_FILE = "tuning.json"
+SCRIPT = Path(__file__).resolve().parent / "1.new2.py"
+
+# Замер autotune на меньшем числе файлов слишком шумный - он не сохраняется и не используется
+MIN_TUNING_FILES = 4
+
+# Переменные окружения, по которым пулы OpenMP/MKL выбирают число потоков при импорте torch
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def cpu_count():
+    return os.cpu_count() or 1
+
+
+def load_tuning(debug_dir):
+    """Сохраненный замер autotune (None, если его нет, он сделан на машине с другим числом ядер
+    или меньше чем на MIN_TUNING_FILES файлах)"""
+    path = Path(debug_dir) / TUNING_FILE
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            tuning = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if tuning.get('cpu_count') != cpu_count() or tuning.get('files', 0) < MIN_TUNING_FILES:
+        return None
+    return tuning
+
+
+def default_interop(workers):
+    """Потоки inter-op по умолчанию: один процесс - как у torch без настройки (по числу ядер),
+    несколько - по одному, чтобы пулы процессов не мешали друг другу"""
+    return cpu_count() if workers <= 1 else 1
+
+
+def save_tuning(debug_dir, tuning):
+    path = Path(debug_dir) / TUNING_FILE
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(tuning, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def thread_settings(spec, workers, tuning=None):
+    """Потоки на процесс по настройкам профиля: {'torch': N, 'interop': N, 'opencv': N}.
+    "auto" - из замера autotune для того же числа процессов, иначе доля ядер"""
+    share = max(1, cpu_count() // max(1, workers))
+    measured = tuning if tuning and tuning.get('workers') == workers else {}
+    defaults = {'torch': share, 'interop': default_interop(workers), 'opencv': share}
+
+    settings = {}
+    for key, default in defaults.items():
+        value = spec.get(key, "auto")
+        if value == "auto":
+            value = measured.get('threads', {}).get(key, default)
+        settings[key] = max(1, int(value))
+    return settings
+
+
+def apply_threads(settings):
+    """Потоки OpenCV и OpenMP/MKL этого процесса (torch - apply_torch_threads)"""
+    import cv2
+    cv2.setNumThreads(settings['opencv'])
+    # Действует на torch, если он еще не импортирован
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(settings['torch'])
+    if 'torch' in sys.modules:
+        apply_torch_threads(sys.modules['torch'], settings)
+
+
+def apply_torch_threads(torch, settings):
+    """Потоки torch: intra-op и inter-op (последнее можно задать только до первой параллельной работы)"""
+    torch.set_num_threads(settings['torch'])
+    try:
+        torch.set_num_interop_threads(settings['interop'])
+    except RuntimeError:
+        pass
+
+
+def combinations(max_workers):
+    """Пары (процессов, потоков на процесс) степенями двойки, не больше числа ядер"""
+    cores = cpu_count()
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    return [(workers, threads) for workers in counts if workers <= max_workers
+            for threads in counts if workers * threads <= cores]
+
+
+def measure(pdf_files, workers, threads, extra_args):
+    """Файлов в минуту в установившемся режиме: по моментам раскладки, без загрузки модели"""
+    with tempfile.TemporaryDirectory(prefix="pdf_organizer_tune_") as base_dir:
+        input_dir = Path(base_dir) / "input"
+        input_dir.mkdir()
+        for pdf_file in pdf_files:
+            shutil.copy2(pdf_file, input_dir / pdf_file.name)
+
+        command = [sys.executable, str(SCRIPT), "--workers", str(workers),
+                   "--torch-threads", str(threads), "--opencv-threads", str(threads),
+                   "--no-cache", "--no-service", "--no-text-store"] + list(extra_args)
+        start_time = time.time()
+        completed = subprocess.run(command, cwd=base_dir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                   text=True, encoding='utf-8', errors='replace')
+        wall_time = time.time() - start_time
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "ошибка")
+
+        trace_path = Path(base_dir) / "debug" / "trace.jsonl"
+        finished = []
+        if trace_path.exists():
+            with open(trace_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    span = json.loads(line)
+                    if span['name'] == 'filing':
+                        finished.append((span['ts'] + span['dur']) / 1e6)
+        finished.sort()
+
+    if len(finished) >= 2 and finished[-1] > finished[0]:
+        rate = (len(finished) - 1) / (finished[-1] - finished[0]) * 60
+    else:
+        rate = len(pdf_files) / wall_time * 60
+    return {'workers': workers, 'threads': threads, 'files_per_minute': rate, 'wall_seconds': wall_time}
+
+
+def autotune(input_dir, debug_dir, files, max_workers, extra_args):
+    """Перебирает комбинации и сохраняет самую быструю"""
+    pdf_files = sorted(Path(input_dir).glob("*.pdf"))[:files]
+    if len(pdf_files) < MIN_TUNING_FILES:
+        print(f"[ERROR] Для замера нужно хотя бы {MIN_TUNING_FILES} PDF в {input_dir} (--files)")
+        return None
+
+    grid = combinations(max_workers)
+    print(f"[START] Autotune: {len(pdf_files)} файлов, {len(grid)} комбинаций, ядер: {cpu_count()}")
+    results = []
+    for workers, threads in grid:
+        try:
+            result = measure(pdf_files, workers, threads, extra_args)
+        except RuntimeError as e:
+            print(f"   {workers} x {threads}: [ERROR] {e}")
+            continue
+        results.append(result)
+        print(f"   {workers} проц. x {threads} пот.: {result['files_per_minute']:6.1f} файлов/мин "
+              f"(запуск {result['wall_seconds']:.0f} сек)")
+
+    if not results:
+        return None
+
+    best = max(results, key=lambda result: result['files_per_minute'])
+    tuning = {
+        'cpu_count': cpu_count(),
+        'workers': best['workers'],
+        'threads': {'torch': best['threads'], 'interop': default_interop(best['workers']),
+                    'opencv': best['threads']},
+        'files': len(pdf_files),
+        'files_per_minute': best['files_per_minute'],
+        'args': list(extra_args),
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'results': results,
+    }
+    path = save_tuning(debug_dir, tuning)
+    print(f"[OK] Лучше всего: {best['workers']} процессов x {best['threads']} потоков "
+          f"({best['files_per_minute']:.1f} файлов/мин), сохранено в {path}")
+    return tuning
+
+
+def main():
+    argv = sys.argv[1:]
+    extra_args = []
+    if "--" in argv:
+        extra_args = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+
+    parser = argparse.ArgumentParser(description="Настройка потоков torch/OpenCV для CPU")
+    parser.add_argument("--debug-dir", default="debug", help="куда сохранить tuning.json")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    tune = commands.add_parser("autotune", help="замерить комбинации процессов и потоков "
+                                                "(параметры после -- передаются 1.new2.py)")
+    tune.add_argument("--input", default="input", help="папка с PDF для замера")
+    tune.add_argument("--files", type=int, default=8, help="сколько файлов брать")
+    tune.add_argument("--max-workers", type=int, default=cpu_count(), help="предел числа процессов")
+
+    commands.add_parser("show", help="показать сохраненную настройку")
+    commands.add_parser("reset", help="удалить сохраненную настройку")
+
+    args = parser.parse_args(argv)
+    debug_dir = Path(args.debug_dir)
+
+    if args.command == "autotune":
+        debug_dir.mkdir(exist_ok=True)
+        autotune(args.input, debug_dir, args.files, args.max_workers, extra_args)
+
+    elif args.command == "show":
+        tuning = load_tuning(debug_dir)
+        if not tuning:
+            print(f"[WARNING]  Настройки для этой машины нет, потоки делятся поровну: "
+                  f"{cpu_count()} ядер / число процессов")
+            return
+        threads = tuning['threads']
+        print(f"[CPU] {tuning['workers']} процессов, torch {threads['torch']} (inter-op {threads['interop']}), "
+              f"OpenCV {threads['opencv']} потоков; {tuning['files_per_minute']:.1f} файлов/мин ({tuning['date']})")
+
+    elif args.command == "reset":
+        path = debug_dir / TUNING_FILE
+        if path.exists():
+            path.unlink()
+        print("[DELETE]  Настройка удалена")
+
+
+if __name__ == "__main__":
+    main()